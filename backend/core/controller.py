@@ -4,7 +4,7 @@ from datetime import datetime
 import os
 import re
 from typing import List, Optional
-from PyQt6.QtCore import QMutexLocker, QObject, pyqtSignal, QTimer, QThread
+from PyQt6.QtCore import QMutexLocker, QObject, pyqtSignal, QTimer, QThread, Qt
 import cloudscraper
 
 # --- INFRAESTRUCTURA Y WORKERS ---
@@ -14,22 +14,27 @@ from backend.services.alerts_service import AlertsService
 from backend.utils.logger_text import LoggerText
 from backend.utils.paths import get_cache_path
 from backend.core.kick_bot import KickBotWorker   
+from backend.core.kick.outbox import PRIORITY_MODERATION, PRIORITY_ALERT, PRIORITY_COMMAND, PRIORITY_TIMER
+from backend.workers.chat_worker import ChatProcessingWorker
 from backend.workers.redemption_worker import RedemptionWorker
 from backend.workers.spotify_worker import SpotifyWorker
 from backend.workers.tts_worker import TTSWorker   
 from backend.workers.unified_server import UnifiedOverlayWorker
 from backend.workers.update_worker import UpdateCheckerWorker, UpdateDownloaderWorker
-from backend.workers.kick_worker import FollowMonitorWorker
+from backend.workers.kick_worker import FollowMonitorWorker, DEFAULT_MONITOR_INTERVAL, RECONCILE_MONITOR_INTERVAL
 from backend.services.commands_service import CommandsService
 from backend.handlers.chat_handler import ChatHandler
 from backend.handlers.music_handler import MusicHandler
 from backend.handlers.triggers_handler import TriggerHandler
 from frontend.dialogs.update_modal import UpdateModal
 
+LEDGER_FLUSH_MS = 500
+CHAT_QUEUE_MAX = 2000
+
 class MainController(QObject):
     """Controlador Principal (Facade Pattern)."""
     log_signal = pyqtSignal(str)
-    chat_signal = pyqtSignal(str, str, str)
+    chat_batch_signal = pyqtSignal(list)
     status_signal = pyqtSignal(str)
     connection_changed = pyqtSignal(bool)
     user_info_signal = pyqtSignal(str, int, str)
@@ -38,10 +43,12 @@ class MainController(QObject):
 
     def __init__(self):
         super().__init__()       
+        # Servicio de base de datos único del proceso: se inyecta en todos los workers
         self.db = DBHandler()
         self.shared_scraper = cloudscraper.create_scraper()
         self._ignored_users_cache = set()
         self._update_ignored_users_cache()
+        self.db.subscribe_settings(lambda k, v: self._update_ignored_users_cache(), keys={"chat_ignored_users"})
         self.cmd_service = CommandsService(self.db)     
 
         self._init_spotify()
@@ -53,9 +60,11 @@ class MainController(QObject):
         self.music_handler = MusicHandler(self.db, self.spotify)
         self.trigger_handler = TriggerHandler(self.db, self.unified_server, self.shared_scraper)
         self.antibot = AntibotHandler(self.db)
+        self._init_chat_worker()
 
         self.worker: Optional[KickBotWorker] = None          
         self.monitor_worker: Optional[FollowMonitorWorker] = None
+        self._push_events_active = False
         self.redemption_worker: Optional[RedemptionWorker] = None
         self.tts_enabled = False
         self.command_only = False       
@@ -77,17 +86,52 @@ class MainController(QObject):
         self.msg_timer = QTimer()
         self.msg_timer.timeout.connect(self._check_timers_execution)
         self.msg_timer.start(60000)
+
+        # Volcado write-behind del ledger de economía (puntos, roles, last_seen)
+        self.ledger_timer = QTimer()
+        self.ledger_timer.timeout.connect(self.db.flush_economy)
+        self.ledger_timer.start(LEDGER_FLUSH_MS)
         
+    def _init_chat_worker(self):
+        # El pipeline de chat corre fuera del hilo de la GUI
+        self.chat_worker = ChatProcessingWorker(self.process_chat_batch, max_queue=CHAT_QUEUE_MAX)
+        self.chat_worker.error_signal.connect(self.emit_log)
+        self.chat_worker.start()
+
     def _init_unified_server(self):
-        self.unified_server = UnifiedOverlayWorker()
+        self.unified_server = UnifiedOverlayWorker(self.db)
         self.unified_server.log_signal.connect(self.emit_log)
         self.unified_server.error_occurred.connect(self.emit_log)
         self.unified_server.start()
     # =========================================================================
     # REGIÓN 1: PIPELINE DE PROCESAMIENTO DE CHAT
     # =========================================================================
-    def on_chat_received(self, user, content, badges, timestamp):
-        """Recibe datos limpios y los procesa a través de la cadena de responsabilidad."""
+    def process_chat_batch(self, messages):
+        """
+        Procesa un lote [(user, content, badges, timestamp, channel), ...] en el hilo de ChatProcessingWorker.
+        La GUI y el overlay reciben una sola entrega por lote.
+        """
+        ui_rows, overlay_msgs = [], []
+        main_channel = (self.db.get("kick_username") or "").lower()
+        for user, content, badges, timestamp, channel in messages:
+            try:
+                if channel and channel != main_channel:
+                    self._on_partner_chat(user, content, badges, timestamp, channel, ui_rows, overlay_msgs)
+                    continue
+                self.on_chat_received(user, content, badges, timestamp, ui_rows, overlay_msgs, channel)
+            except Exception as e:
+                self.emit_log(LoggerText.error(f"Error procesando mensaje de {user}: {e}"))
+
+        if ui_rows:
+            self.chat_batch_signal.emit(ui_rows)
+        if overlay_msgs:
+            self.unified_server.send_chat_batch_to_overlay(overlay_msgs)
+
+    def on_chat_received(self, user, content, badges, timestamp, ui_rows, overlay_msgs, channel=""):
+        """
+        Recibe datos limpios y los procesa a través de la cadena de responsabilidad.
+        Lo que va a la GUI y al overlay se acumula en ui_rows / overlay_msgs.
+        """
         msg_lower = content.strip().lower()
         
         # 1. ANTIBOT: Bloqueo total (spam malicioso se ignora por completo)
@@ -95,7 +139,7 @@ class MainController(QObject):
             return
 
         # 2. UI LOCAL: Siempre mostramos los mensajes en el historial de tu app de escritorio
-        self._update_ui_chat(timestamp, user, content)
+        ui_rows.append((timestamp, user, self.chat_handler.format_for_ui(content), ""))
 
         # 3. PUNTOS Y ROLES: Actualiza en BD (tu chat_handler ya sabe no dar puntos a bots)
         self.chat_handler.process_points(user, msg_lower, badges)
@@ -132,12 +176,20 @@ class MainController(QObject):
                 user_color = "#53fc18" if is_streamer else "#{:06x}".format(random.randint(0, 0xFFFFFF))
                 self.db.set_user_color(user, user_color)
 
-            # Enviamos al servidor web (OBS)
-            self.unified_server.send_chat_message_to_overlay(
-                sender=user, content=content, badges=badges,
-                user_color=user_color,
-                timestamp=timestamp
-            )
+            # Se envía al servidor web (OBS) junto con el resto del lote
+            overlay_msgs.append({
+                "sender": user, "content": content, "badges": badges,
+                "user_color": user_color, "timestamp": timestamp, "channel": channel
+            })
+
+    def _on_partner_chat(self, user, content, badges, timestamp, channel, ui_rows, overlay_msgs):
+        """Mensajes de canales adicionales: solo se muestran (sin puntos, comandos, TTS ni antibot)."""
+        ui_rows.append((timestamp, user, self.chat_handler.format_for_ui(content), channel))
+        if self._should_send_to_overlay(user, content):
+            overlay_msgs.append({
+                "sender": user, "content": content, "badges": badges,
+                "user_color": self.db.get_user_color(user) or "#FFFFFF", "timestamp": timestamp, "channel": channel
+            })
 
     def _update_ignored_users_cache(self):
         """Actualiza la caché de usuarios ignorados una sola vez."""
@@ -152,14 +204,13 @@ class MainController(QObject):
         return user.lower() not in self._ignored_users_cache
 
     def _ban_user(self, username: str):
-        if not self.worker: return
-        if hasattr(self.worker, 'ban_user'):
-            self.worker.ban_user(username)
+        # Corre en el hilo de ChatProcessingWorker: stop_bot puede anular self.worker entretanto
+        worker = self.worker
+        if not worker: return
+        if hasattr(worker, 'ban_user'):
+            worker.ban_user(username)
         else:
-            self.worker.send_chat_message(f"/ban {username}")
-
-    def _update_ui_chat(self, timestamp, user, content):
-        self.chat_signal.emit(timestamp, user, self.chat_handler.format_for_ui(content))
+            worker.send_chat_message(f"/ban {username}", PRIORITY_MODERATION)
 
     # =========================================================================
     # REGIÓN 2: LÓGICA AUXILIAR DE CHAT
@@ -283,8 +334,10 @@ class MainController(QObject):
         self.status_signal.emit("Conectando.")
         self.toast_signal.emit("Iniciando", "Autenticando.", "info")
         
-        self.worker = KickBotWorker(config)
-        self.worker.chat_received.connect(self.on_chat_received)
+        self.worker = KickBotWorker(config, self.db)
+        # Conexión directa: el hilo del bot solo encola, el procesado ocurre en chat_worker
+        self.worker.chat_batch_received.connect(self.chat_worker.submit_batch, Qt.ConnectionType.DirectConnection)
+        self.worker.channel_event.connect(self.on_channel_event)
         self.worker.log_received.connect(self.emit_log)
         self.worker.disconnected_signal.connect(self.on_disconnected)
         self.worker.user_info_signal.connect(lambda u, f, p: (self.user_info_signal.emit(u, f, p), self.force_user_refresh_ui()))
@@ -296,6 +349,9 @@ class MainController(QObject):
             self.redemption_worker = RedemptionWorker(self.db, self.shared_scraper)
             self.redemption_worker.log_signal.connect(self.emit_log)
             self.redemption_worker.redemption_detected.connect(self.on_redemption_received)
+            # Conexión directa: ingest_event solo encola el canje en el ejecutor del worker,
+            # así ni la GUI ni el loop de aiohttp esperan a la DB
+            self.unified_server.redemption_event.connect(self.redemption_worker.ingest_event, Qt.ConnectionType.DirectConnection)
             self.redemption_worker.finished.connect(self.redemption_worker.deleteLater)
             self.redemption_worker.start()
 
@@ -312,7 +368,9 @@ class MainController(QObject):
             w_instance = getattr(self, w_attr, None)
             if w_instance:
                 if w_attr == 'worker': 
-                    self.safe_disconnect(w_instance.chat_received)
+                    self.safe_disconnect(w_instance.chat_batch_received)
+                elif w_attr == 'redemption_worker':
+                    self.safe_disconnect(self.unified_server.redemption_event)
 
                 w_instance.stop()
                 
@@ -324,6 +382,7 @@ class MainController(QObject):
                     
         if not (self.worker and self.worker.isRunning()):
              self.worker = None
+        self._push_events_active = False
 
         self.status_signal.emit("Desconectado")
         self.connection_changed.emit(False)
@@ -347,11 +406,21 @@ class MainController(QObject):
                 self.spotify_thread.wait(1000)
         except RuntimeError:
             pass
+        # 5. Detener el pipeline de chat antes de volcar lo que haya escrito
+        if hasattr(self, 'chat_worker') and self.chat_worker:
+            self.chat_worker.stop()
+        # 6. Volcar a disco la economía pendiente del ledger
+        if hasattr(self, 'ledger_timer'):
+            self.ledger_timer.stop()
+        self.db.flush_economy()
+        self.db.close()
             
         self.emit_log(LoggerText.system("Backend apagado correctamente. Todos los hilos cerrados."))
 
     def on_disconnected(self): 
         if self.worker: self.worker.deleteLater(); self.worker = None
+        self._push_events_active = False
+        if self.monitor_worker: self.monitor_worker.interval = DEFAULT_MONITOR_INTERVAL
         self.status_signal.emit("Desconectado")
         self.connection_changed.emit(False)
 
@@ -365,7 +434,8 @@ class MainController(QObject):
 
     def _start_monitor(self, username):
         if not self.monitor_worker:
-            self.monitor_worker = FollowMonitorWorker(username, self.shared_scraper)
+            interval = RECONCILE_MONITOR_INTERVAL if self._push_events_active else DEFAULT_MONITOR_INTERVAL
+            self.monitor_worker = FollowMonitorWorker(username, self.shared_scraper, interval)
             self.monitor_worker.new_follower.connect(self.on_new_follower)
             self.monitor_worker.start()
 
@@ -383,7 +453,44 @@ class MainController(QObject):
         )
         
         if final_msg:
-            self.send_msg(final_msg)
+            self.send_msg(final_msg, PRIORITY_ALERT)
+
+    def on_channel_event(self, event_type, username, extra):
+        """Eventos push del canal (Pusher): follows, subs, regalos y hosts sin polling HTTP."""
+        if event_type == "subscribed":
+            # Con channel.{id} suscrito, el polling de seguidores pasa a ser reconciliación lenta
+            if username.startswith("channel."):
+                self._push_events_active = True
+                if self.monitor_worker: self.monitor_worker.interval = RECONCILE_MONITOR_INTERVAL
+            return
+
+        if event_type == "follow":
+            count = extra.get("count", 0)
+            if self.monitor_worker: self.monitor_worker.sync_count(count)
+            if extra.get("followed", True) and username:
+                self.on_new_follower(count, 1, username)
+            return
+
+        if event_type == "subscription":
+            toast, tts_text = f"{username} se suscribió", f"Gracias {username} por la suscripción."
+            alert_type = "subscription"
+        elif event_type == "gift":
+            toast, tts_text = f"{username} regaló {extra.get('count', 1)} subs", f"Gracias {username} por regalar suscripciones."
+            alert_type = "subscription"
+        elif event_type == "host":
+            toast, tts_text = f"{username} hostea con {extra.get('viewers', 0)}", f"Gracias {username} por el host."
+            alert_type = "host"
+        else:
+            return
+
+        self.toast_signal.emit("¡NUEVO!", toast, "status_success")
+        self.emit_log(LoggerText.success(f"EVENTO {event_type.upper()}: {toast}"))
+        if self.tts_enabled:
+            self.tts.add_message(tts_text)
+
+        final_msg = self.alerts_service.trigger_alert(event_type=alert_type, username=username, extra_data=extra)
+        if final_msg:
+            self.send_msg(final_msg, PRIORITY_ALERT)
 
     def force_user_refresh_ui(self):
         username = self.db.get("kick_username")
@@ -402,8 +509,10 @@ class MainController(QObject):
         else:
             self.user_info_signal.emit("Streamer", 0, "")
 
-    def send_msg(self, text): 
-        if self.worker: self.worker.send_chat_message(text)
+    def send_msg(self, text, priority=PRIORITY_COMMAND): 
+        # Se llama desde ChatProcessingWorker: una sola lectura de self.worker (la GUI puede anularlo)
+        worker = self.worker
+        if worker: worker.send_chat_message(text, priority)
     
     def emit_log(self, text): self.log_signal.emit(text)
     
@@ -424,7 +533,7 @@ class MainController(QObject):
         now = time.time()
         for name, msg in self.db.get_due_timers(now):
             if msg:
-                self.send_msg(msg)
+                self.send_msg(msg, PRIORITY_TIMER)
                 self.emit_log(LoggerText.system(f"Timer automático: '{name}'"))
                 self.db.update_timer_run(name, now)
 
@@ -491,6 +600,17 @@ class MainController(QObject):
                 f.write(f"{clean_msg}\n")
         except: pass
 
+    def get_chat_stats(self) -> dict:
+        """Profundidad de cola y latencias del pipeline de chat, más Pusher, el outbox y las salas del overlay."""
+        stats = self.chat_worker.stats()
+        stats["overlay"] = self.unified_server.get_broadcast_stats()
+        worker = self.worker
+        if worker and worker.chat:
+            stats["pusher"] = worker.chat.get_stats()
+        if worker and worker.api:
+            stats["outbox"] = worker.api.outbox.get_stats()
+        return stats
+
     def set_debug_mode(self, enabled: bool):
         self.debug_enabled = enabled
         self.db.set("debug_mode", enabled)
@@ -7,6 +7,10 @@ from PyQt6.QtCore import QMutexLocker
 
 # --- INFRAESTRUCTURA ---
 from backend.database.connection import DatabaseConnection
+from backend.database.ledger import EconomyLedger
+from backend.database.settings_store import SettingsStore
+from backend.database.migrations import run_migrations
+from backend.database.redemption_store import RedemptionDedupStore
 from backend.database.repositories import (
     SettingsRepository, UsersRepository, 
     EconomyRepository, TriggersRepository,
@@ -37,9 +41,11 @@ class DBHandler:
             username TEXT PRIMARY KEY, points INTEGER DEFAULT 0, 
             last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP, 
             is_paused INTEGER DEFAULT 0, is_muted INTEGER DEFAULT 0,
-            role TEXT DEFAULT '', color TEXT DEFAULT ''
+            role TEXT DEFAULT '', color TEXT DEFAULT '',
+            watch_minutes INTEGER DEFAULT 0
         """,
         "custom_commands": "trigger TEXT PRIMARY KEY, response TEXT, is_active INTEGER DEFAULT 1, cooldown INTEGER DEFAULT 5, aliases TEXT DEFAULT '', cost INTEGER DEFAULT 0",
+        "command_aliases": "alias TEXT PRIMARY KEY, trigger TEXT NOT NULL",
         "stream_alerts": """
             event_type TEXT PRIMARY KEY, title_template TEXT, message_template TEXT, 
             is_active INTEGER DEFAULT 1, image_url TEXT, sound_url TEXT, 
@@ -47,6 +53,7 @@ class DBHandler:
             layout_style TEXT, animation TEXT
         """,
         "timers": "name TEXT PRIMARY KEY, message TEXT, interval INTEGER DEFAULT 15, is_active INTEGER DEFAULT 0, last_run REAL DEFAULT 0",
+        "processed_redemptions": "id TEXT PRIMARY KEY, processed_at REAL NOT NULL, awaiting_accept INTEGER NOT NULL DEFAULT 0",
     }
     
     DEFAULT_SETTINGS = {
@@ -57,6 +64,14 @@ class DBHandler:
         "spotify_enabled": "0", "spotify_client_id": "", "spotify_secret": "", "spotify_redirect_uri": "http://127.0.0.1:8888",
         "music_cmd_song": "!song", "music_cmd_skip": "!skip", "music_cmd_pause": "!pause", "music_cmd_request": "!sr",
         "auto_connect": "0", "minimize_to_tray": "0","app_language": "es", "date_format": "24h", "debug_mode": "0",
+        "chat_batch_latency_ms": "25", "chat_batch_max": "100",
+        "chat_outbox_rate": "1", "chat_outbox_burst": "3", "chat_outbox_coalesce": "0",
+        "extra_channels": "",
+        "overlay_client_queue": "256", "overlay_slow_policy": "drop_oldest", "overlay_chat_batch_ms": "50",
+        "overlay_playback_limits": "video=1,audio=1,image=1", "overlay_priority_cost": "1000",
+        "kick_webhook_enabled": "0", "kick_webhook_public_key": "", "redemption_reconcile_s": "15",
+        "redemption_dedup_max": "4096", "redemption_dedup_ttl_h": "168", "redemption_store_seeded": "0",
+        "redemption_refund_stale": "0",
     }
 
     # =========================================================================
@@ -64,17 +79,23 @@ class DBHandler:
     # =========================================================================
     def __init__(self, db_name: str = "kick_data.db"):
         self.conn_handler = DatabaseConnection(db_name)     
+        self.ledger = EconomyLedger(self.conn_handler)
         
         self.settings = SettingsRepository(self.conn_handler)
         self.users = UsersRepository(self.conn_handler)
-        self.economy = EconomyRepository(self.conn_handler)
+        self.economy = EconomyRepository(self.conn_handler, self.ledger)
         self.triggers = TriggersRepository(self.conn_handler)
+        self._trigger_subscribers = []
         self.commands = ChatCommandsRepository(self.conn_handler)
         self.automations = AutomationsRepository(self.conn_handler)
-        self._settings_cache = {}
         
         self._init_db()
         self._run_migrations()
+        # Precarga completa de settings: lecturas sin SQL ni candados en el hot path
+        self.settings_store = SettingsStore(self.settings)
+        # Canjes ya procesados: LRU en memoria + tabla con TTL (sobrevive a reinicios)
+        self.redemptions = RedemptionDedupStore(
+            self.conn_handler, self.get_int("redemption_dedup_max", 4096), self.get_int("redemption_dedup_ttl_h", 168) * 3600)
 
     def _init_db(self):
         """Crea tablas y configuración por defecto."""
@@ -92,54 +113,26 @@ class DBHandler:
                 print(f"[DB_DEBUG] Error Init: {e}")
 
     def _run_migrations(self):
-        """Verifica y crea columnas faltantes en DB existente."""
-        migrations = {
-            "kick_streamer": [
-                ("bio", "TEXT DEFAULT ''"), ("can_host", "INTEGER DEFAULT 0"),
-                ("verified", "INTEGER DEFAULT 0"), ("subscription_enabled", "INTEGER DEFAULT 0"),
-                ("vod_enabled", "INTEGER DEFAULT 0"), ("is_banned", "INTEGER DEFAULT 0"),
-                ("user_id", "INTEGER")
-            ],
-            "triggers": [
-                ("duration", "INTEGER DEFAULT 0"), ("scale", "REAL DEFAULT 1.0"),
-                ("is_active", "INTEGER DEFAULT 1"), ("cost", "INTEGER DEFAULT 0"),
-                ("volume", "INTEGER DEFAULT 100"), ("pos_x", "INTEGER DEFAULT 0"), 
-                ("pos_y", "INTEGER DEFAULT 0"), ("color", "TEXT DEFAULT '#53fc18'"),
-                ("description", "TEXT DEFAULT 'Trigger KickMonitor'"),
-                ("path", "TEXT DEFAULT ''"), ("random_pos", "INTEGER DEFAULT 0")
-            ],
-            "data_users": [("is_paused", "INTEGER DEFAULT 0"), ("is_muted", "INTEGER DEFAULT 0"), ("role", "TEXT DEFAULT ''"), ("color", "TEXT DEFAULT ''")],
-            "custom_commands": [("cooldown", "INTEGER DEFAULT 5"), ("aliases", "TEXT DEFAULT ''"), ("cost", "INTEGER DEFAULT 0")],
-            "timers": [("interval", "INTEGER DEFAULT 15"), ("last_run", "REAL DEFAULT 0")]
-        }
-        
+        """Aplica una sola vez los pasos pendientes según PRAGMA user_version."""
         with QMutexLocker(self.conn_handler.mutex):
-            cursor = self.conn_handler.conn.cursor()
-            for table, cols in migrations.items():
-                try:
-                    cursor.execute(f"PRAGMA table_info({table})")
-                    existing_cols = {row['name'] for row in cursor.fetchall()}                  
-                    missing_cols = [col for col in cols if col[0] not in existing_cols]
-                    
-                    for col_name, col_def in missing_cols:
-                        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_def}")
-                        
-                except Exception as e:
-                    print(f"[DB_DEBUG] Error migrando {table}: {e}")
-            self.conn_handler.conn.commit()
+            run_migrations(self.conn_handler.conn)
 
     # =========================================================================
     # REGIÓN 3: FACHADA - CONFIGURACIÓN (SETTINGS)
     # =========================================================================
     def get(self, key: str, default: str = "") -> str: 
-        if key not in self._settings_cache:
-            self._settings_cache[key] = self.settings.get(key, default)
-            
-        return self._settings_cache[key]
+        return self.settings_store.get(key, default)
 
-    def set(self, key: str, val: Any): 
-        self.settings.set(key, val)
-        self._settings_cache[key] = str(val)
+    def set(self, key: str, val: Any) -> bool: 
+        return self.settings_store.set(key, val)
+
+    def subscribe_settings(self, callback, keys=None):
+        """Registra callback(key, value) para cambios de configuración."""
+        self.settings_store.subscribe(callback, keys)
+
+    @property
+    def settings_version(self) -> int:
+        return self.settings_store.version
         
     def get_bool(self, key: str) -> bool: 
         return self.get(key) == "1"       
@@ -149,11 +142,24 @@ class DBHandler:
             return int(self.get(key, str(default)))
         return default
 
+    # --- Modo multicanal: settings con espacio de nombres channel.{slug}.{clave} ---
+    def get_extra_channels(self) -> List[str]:
+        """Canales adicionales (co-streams) a escuchar con el mismo socket, en minúsculas."""
+        main = (self.get("kick_username") or "").lower()
+        slugs = [s.strip().lower() for s in (self.get("extra_channels") or "").split(",") if s.strip()]
+        return [s for s in dict.fromkeys(slugs) if s != main]
+
+    def get_channel_setting(self, slug: str, key: str, default: str = "") -> str:
+        return self.get(f"channel.{slug.lower()}.{key}", default)
+
+    def set_channel_setting(self, slug: str, key: str, val: Any):
+        self.set(f"channel.{slug.lower()}.{key}", val)
+
     # =========================================================================
     # REGIÓN 4: FACHADA - USUARIOS KICK
     # =========================================================================
-    def save_kick_user(self, slug, username, followers, pic, chat_id, user_id=None):
-        return self.users.save_user(slug, username, followers, pic, chat_id, user_id)    
+    def save_kick_user(self, slug, username, followers, pic, chat_id, user_id=None, kick_id=None):
+        return self.users.save_user(slug, username, followers, pic, chat_id, user_id, kick_id)    
     def get_kick_user(self, slug: str) -> Optional[Dict]:
         return self.users.get_user(slug)
 
@@ -162,16 +168,23 @@ class DBHandler:
     # =========================================================================
     def add_points(self, user: str, amount: int) -> int: return self.economy.add_points(user, amount)
     def spend_points(self, user: str, cost: int) -> bool: return self.economy.spend_points(user, cost)
+    def apply_point_charges(self, charges: List[tuple]) -> List[tuple]: return self.economy.apply_charges(charges)
     def get_points(self, user: str) -> int: return self.economy.get_points(user)
     
     def get_all_points(self) -> List: return self.economy.get_all_users_points()
+    def get_users_page(self, search: str = "", filter_mode: str = "Todos", order_by: str = "points", descending: bool = True, limit: int = 200, offset: int = 0) -> List:
+        return self.economy.query_users_page(search, filter_mode, order_by, descending, limit, offset)
+    def count_users(self, search: str = "", filter_mode: str = "Todos") -> int: return self.economy.count_users(search, filter_mode)
     def delete_user_points(self, user: str): return self.economy.delete_user(user)
-    def add_points_to_active_users(self, amount: int, minutes: int = 10): return self.economy.add_points_periodic(amount, minutes)
+    def credit_active_viewers(self, users: List[str], amount: int, minutes: int = 1): return self.economy.credit_active_users(users, amount, minutes)
+    def get_recent_viewers(self, minutes: int = 10): return self.economy.get_recent_users(minutes)
     
     def set_user_paused(self, user: str, paused: bool): return self.economy.set_paused(user, paused)
     def set_user_muted(self, user: str, muted: bool): return self.economy.set_muted(user, muted)
     def is_muted(self, user: str) -> bool: return self.economy.is_muted(user)
     def update_user_role(self, user: str, role: str): return self.economy.update_role(user, role)
+    def record_chat_activity(self, user: str, role: str, points: int = 0, touch: bool = False): return self.economy.record_activity(user, role, points, touch)
+    def flush_economy(self) -> bool: return self.ledger.flush()
 
     def set_user_color(self, user: str, color: str): return self.economy.set_color(user, color)
     def get_user_color(self, user: str) -> str: return self.economy.get_color(user)
@@ -182,15 +195,35 @@ class DBHandler:
     # REGIÓN 6: FACHADA - CARACTERÍSTICAS (COMMANDS, OVERLAY, ALERTS)
     # =========================================================================
     def set_trigger(self, cmd, file, ftype, dur=0, sc=1.0, act=1, cost=0, vol=100, pos_x=0, pos_y=0, color="#53fc18", description="Trigger KickMonitor", path="", random_pos=0):
-        return self.triggers.save_trigger(cmd, file, ftype, dur, sc, act, cost, vol, pos_x, pos_y, color, description, path, random_pos)
-    def update_active_state(self, filename: str, is_active: bool): return self.triggers.update_active_state(filename, is_active)    
+        return self._triggers_changed(self.triggers.save_trigger(cmd, file, ftype, dur, sc, act, cost, vol, pos_x, pos_y, color, description, path, random_pos))
+    def update_active_state(self, filename: str, is_active: bool): return self._triggers_changed(self.triggers.update_active_state(filename, is_active))
     def get_trigger_file(self, cmd: str): return self.triggers.get_trigger(cmd)
-    def delete_triggers_by_filename(self, fname: str): return self.triggers.delete_triggers_by_filename(fname)
+    def delete_trigger(self, cmd: str): return self._triggers_changed(self.triggers.delete_by_command(cmd))
+    def delete_triggers_by_filename(self, fname: str): return self._triggers_changed(self.triggers.delete_triggers_by_filename(fname))
     def get_all_triggers(self) -> Dict: return self.triggers.get_all()
-    def clear_all_triggers(self): return self.triggers.clear_all()
+    def get_trigger_media_paths(self) -> Dict[str, str]: return self.triggers.get_media_paths()
+    def clear_all_triggers(self): return self._triggers_changed(self.triggers.clear_all())
+
+    def subscribe_triggers(self, callback):
+        """Registra callback() para cualquier cambio en la tabla triggers; se invoca en el hilo que escribió."""
+        self._trigger_subscribers.append(callback)
+
+    def _triggers_changed(self, result):
+        for callback in list(self._trigger_subscribers):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[DB_ERROR] Suscriptor de triggers falló: {e}")
+        return result
     def get_active_shop_items(self) -> List: return self.triggers.get_shop_items()
 
+    def claim_redemptions(self, ids, awaiting_accept: bool = False) -> List[str]: return self.redemptions.claim(ids, awaiting_accept)
+    def awaiting_redemptions(self, ids) -> List[str]: return self.redemptions.awaiting(ids)
+    def resolve_redemptions(self, ids): return self.redemptions.resolve(ids)
+    def prune_redemptions(self): return self.redemptions.prune()
+
     def add_command(self, trig, resp, cd=5, aliases="", cost=0): return self.commands.add_command(trig, resp, cd, aliases, cost)
+    def find_command_conflicts(self, trig, aliases="", ignore=None): return self.commands.find_conflicts(trig, aliases, ignore)
     def get_command_by_trigger_or_alias(self, cmd: str): return self.commands.get_details_by_trigger_or_alias(cmd)
     def get_command_details(self, trig: str): return self.commands.get_details(trig)
     def get_all_commands(self) -> List: return self.commands.get_all()
@@ -211,6 +244,10 @@ class DBHandler:
     def get_db_path(self) -> str:
         return os.path.abspath(self.conn_handler.db_path)
 
+    def close(self):
+        """Cierra el escritor y todos los lectores por hilo (al apagar la app)."""
+        self.conn_handler.close()
+
     def factory_reset_user(self):
         keys_to_wipe = [
             ("kick_username",), ("chatroom_id",), ("client_id",), ("client_secret",), 
@@ -220,9 +257,10 @@ class DBHandler:
             self.conn_handler.conn.executemany("UPDATE settings SET value='' WHERE key=?", keys_to_wipe)
             self.conn_handler.conn.execute("DELETE FROM kick_streamer")
             self.conn_handler.conn.commit()
-        self._settings_cache.clear()
+        self.settings_store.reload()
 
     def wipe_economy_data(self):
+        self.ledger.discard()
         with QMutexLocker(self.conn_handler.mutex):
             self.conn_handler.conn.execute("UPDATE data_users SET points = 0")
             self.conn_handler.conn.commit()
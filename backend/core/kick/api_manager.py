@@ -2,6 +2,7 @@
 
 import cloudscraper
 from backend.utils.logger_text import LoggerText
+from backend.core.kick.outbox import ChatOutbox, PRIORITY_COMMAND
 
 class KickAPIManager:
     def __init__(self, auth_manager, http_session, loop, db, config, log_callback, user_info_signal):
@@ -16,6 +17,25 @@ class KickAPIManager:
         
         self.chatroom_id = str(self.config.get('chatroom_id', ''))
         self.broadcaster_user_id = None
+        self.channel_id = None
+
+        # Todo envío al chat pasa por la cola con token bucket y prioridades
+        self.outbox = ChatOutbox(
+            self.send_message, loop, log_callback,
+            rate=self._get_float("chat_outbox_rate", 1.0),
+            burst=self.db.get_int("chat_outbox_burst", 3),
+            coalesce=self.db.get_bool("chat_outbox_coalesce")
+        )
+
+    def _get_float(self, key, default):
+        try:
+            return float(self.db.get(key, str(default)))
+        except (TypeError, ValueError):
+            return default
+
+    def queue_message(self, text, priority=PRIORITY_COMMAND):
+        """Encola un mensaje desde cualquier hilo; el outbox decide cuándo sale."""
+        self.outbox.enqueue_threadsafe(text, priority)
 
     async def detect_user_and_channel(self):
         target_user = self.config.get('kick_username') 
@@ -79,20 +99,50 @@ class KickAPIManager:
             self.log(LoggerText.warning("⚠️ La respuesta de Kick no incluyó un ID de sala de chat (chatroom_id)."))
         uid = data.get('user_id') or data.get('id') or data.get('user', {}).get('id')
         if uid: self.broadcaster_user_id = uid
+        # 'id' de /api/v1/channels es el ID del canal (topic channel.{id} de Pusher)
+        if data.get('id'): self.channel_id = data['id']
 
         username = data.get('username') or data.get('user', {}).get('username') or target_user
         slug = data.get('slug') or target_user
         pic = data.get('profile_pic') or data.get('user', {}).get('profile_pic') or ""
         followers = data.get('followersCount') or data.get('followers_count') or 0
 
-        self.db.save_kick_user(slug, username, followers, pic, self.chatroom_id, self.broadcaster_user_id)
+        self.db.save_kick_user(slug, username, followers, pic, self.chatroom_id, self.broadcaster_user_id, self.channel_id)
         self.user_info_signal.emit(username, followers, pic)
         self.log(LoggerText.success(f"Datos actualizados para: {username}"))
 
+    async def resolve_channel(self, slug):
+        """
+        (chatroom_id, channel_id) de un canal adicional. Se cachea en settings con espacio
+        de nombres (channel.{slug}.*) sin tocar la configuración del canal principal.
+        """
+        chatroom_id = self.db.get_channel_setting(slug, "chatroom_id")
+        if chatroom_id:
+            return chatroom_id, self.db.get_channel_setting(slug, "channel_id")
+        try:
+            resp = await self.loop.run_in_executor(
+                None, lambda: self.scraper.get(f"https://kick.com/api/v1/channels/{slug}", timeout=10)
+            )
+            if resp.status_code != 200:
+                self.log(LoggerText.warning(f"Canal adicional '{slug}' no encontrado (HTTP {resp.status_code})."))
+                return None
+            data = resp.json()
+            chatroom_id = str(data.get('chatroom', {}).get('id', ''))
+            if not chatroom_id:
+                return None
+            self.db.set_channel_setting(slug, "chatroom_id", chatroom_id)
+            self.db.set_channel_setting(slug, "channel_id", data.get('id') or "")
+            return chatroom_id, str(data.get('id') or "")
+        except Exception as e:
+            self.log(LoggerText.error(f"Error resolviendo canal adicional '{slug}': {e}"))
+            return None
+
     def _load_from_cache(self, target_user):
         cached = self.db.get_kick_user(target_user)
-        if cached and cached.get('user_id'):
+        # Sin kick_id (caché de versiones anteriores) refrescamos una vez desde la API
+        if cached and cached.get('user_id') and cached.get('kick_id'):
             self.broadcaster_user_id = cached['user_id']
+            self.channel_id = cached['kick_id']
             chat_id_db = self.db.get("chatroom_id")
             if chat_id_db:
                 self.chatroom_id = chat_id_db
@@ -101,13 +151,14 @@ class KickAPIManager:
         return False
 
     async def send_message(self, text, retry=True):
+        """POST directo a la API de chat. Devuelve (status HTTP, Retry-After en segundos); 0 si no se envió."""
         if not self.auth.access_token: 
             self.log(LoggerText.warning("No se puede enviar el mensaje: Falta el token de acceso."))
-            return
+            return 0, 0.0
             
         if not self.broadcaster_user_id:
             self.log(LoggerText.error("No se puede enviar el mensaje: Falta el ID del canal (broadcaster_user_id)."))
-            return
+            return 0, 0.0
 
         # --- NUEVO: LÍMITE ESTRICTO DE KICK (500 CARACTERES) ---
         if len(text) > 500:
@@ -122,8 +173,16 @@ class KickAPIManager:
                 if resp.status == 401 and retry:
                     self.log(LoggerText.warning("Token expirado al enviar. Renovando."))
                     if await self.auth.refresh_token_silently():
-                        await self.send_message(text, retry=False)
+                        return await self.send_message(text, retry=False)
+                elif resp.status == 429:
+                    try:
+                        retry_after = float(resp.headers.get("Retry-After", 1))
+                    except ValueError:
+                        retry_after = 1.0
+                    return 429, retry_after
                 elif resp.status != 200:
                     self.log(LoggerText.error(f"Error enviando mensaje: Status {resp.status}"))
+                return resp.status, 0.0
         except Exception as e:
-            self.log(LoggerText.error(f"Excepción al enviar mensaje: {e}"))
\ No newline at end of file
+            self.log(LoggerText.error(f"Excepción al enviar mensaje: {e}"))
+        return 0, 0.0
@@ -2,63 +2,185 @@
 
 import asyncio
 import json
+import random
 import aiohttp
 from datetime import datetime
 from backend.utils.logger_text import LoggerText
+from backend.utils.metrics import REGISTRY
+
+# Métricas del socket y del despacho por lotes (se exponen en /metrics del overlay)
+CHAT_RECEIVED = REGISTRY.counter("kickmonitor_chat_messages_received_total", "Mensajes de chat entregados al pipeline")
+CHAT_BATCH_SIZE = REGISTRY.histogram("kickmonitor_chat_batch_size", "Mensajes por lote entregado al pipeline",
+                                     buckets=(1, 5, 10, 25, 50, 100, 200))
+CHAT_BOT_QUEUE = REGISTRY.gauge("kickmonitor_chat_bot_queue_depth", "Mensajes esperando lote en el loop del bot")
+PUSHER_RTT = REGISTRY.histogram("kickmonitor_pusher_rtt_seconds", "RTT ping/pong con Pusher")
+PUSHER_CONNECTED = REGISTRY.gauge("kickmonitor_pusher_connected", "1 si el socket de Pusher está conectado")
+PUSHER_EVENTS = REGISTRY.counter("kickmonitor_pusher_events_total", "Conexiones, reconexiones, bloqueos e intentos fallidos",
+                                 labels=("event",))
+
+# Supervisor de conexión: backoff exponencial con jitter y detector de bloqueos
+RECONNECT_BASE_S = 1.0
+RECONNECT_MAX_S = 30.0
+DEFAULT_ACTIVITY_TIMEOUT_S = 120
+PONG_TIMEOUT_S = 10
+HEARTBEAT_CHECK_S = 1.0
 
 class KickChatManager:
-    def __init__(self, http_session, loop, log_callback, chat_callback):
+    def __init__(self, http_session, loop, log_callback, chat_batch_callback, batch_latency_ms=25, batch_max=100, event_callback=None):
         self.session = http_session
         self.loop = loop
         self.log = log_callback
-        self.emit_chat = chat_callback
+        self.emit_batch = chat_batch_callback
+        # event_callback(tipo, usuario, extra): follow / subscription / gift / host / subscribed
+        self.emit_event = event_callback or (lambda *args: None)
         self.ws_connection = None
         self.is_running = True
 
         self.message_queue = asyncio.Queue()
         self.queue_task = None
+        self.supervisor_task = None
+        # Lote adaptativo: se emite al llenarse o al agotar la latencia objetivo
+        self.batch_latency = max(0, batch_latency_ms) / 1000
+        self.batch_max = max(1, batch_max)
         
         self.pusher_key = "32cbd69e4b950bf97679"
         self.pusher_cluster = "us2"
+        self.pusher_url = f"wss://ws-{self.pusher_cluster}.pusher.com/app/{self.pusher_key}?protocol=7&client=js&version=7.6.0&flash=false"
+        self.channels = []
+        # Topic de Pusher -> slug del canal con el que se etiqueta cada mensaje
+        self.channel_tags = {}
+        self.main_tag = ""
+        self.username = ""
+
+        # Estado del heartbeat de la conexión actual
+        self.activity_timeout = DEFAULT_ACTIVITY_TIMEOUT_S
+        self._last_rx = 0.0
+        self._ping_sent_at = None
+        self._last_ping_at = 0.0
+
+        # Métricas del supervisor
+        self.stats = {
+            "connects": 0, "reconnects": 0, "stalls": 0, "failed_attempts": 0,
+            "last_rtt_ms": 0.0, "avg_rtt_ms": 0.0, "max_gap_s": 0.0,
+            "last_downtime_s": 0.0, "connected": False
+        }
+        CHAT_BOT_QUEUE.set_function(self.message_queue.qsize)
+        PUSHER_CONNECTED.set_function(lambda: int(self.stats["connected"]))
+        PUSHER_EVENTS.set_function(lambda: {(k,): self.stats[k] for k in ("connects", "reconnects", "stalls", "failed_attempts")})
 
-    async def connect(self, chatroom_id, username):
+    # =========================================================================
+    # REGIÓN 1: CONEXIÓN Y SUPERVISOR
+    # =========================================================================
+    async def connect(self, chatroom_id, username, channel_id=None, extra_rooms=None):
+        """extra_rooms: [(slug, chatroom_id)] de canales adicionales escuchados por el mismo socket."""
         if not chatroom_id: 
             self.log(LoggerText.error("Error Fatal: Chatroom ID no encontrado."))
             return False
             
         self.log(LoggerText.debug(f"Conectando a sala de chat: {chatroom_id}"))
-        pusher_url = f"wss://ws-{self.pusher_cluster}.pusher.com/app/{self.pusher_key}?protocol=7&client=js&version=7.6.0&flash=false"
+        main_topic = f"chatrooms.{chatroom_id}.v2"
+        self.channels = [main_topic]
+        self.main_tag = (username or "").lower()
+        self.channel_tags = {main_topic: self.main_tag}
+        # Follows y demás eventos del canal llegan por el mismo socket (sin polling HTTP)
+        if channel_id:
+            self.channels.append(f"channel.{channel_id}")
+        for slug, room_id in extra_rooms or []:
+            topic = f"chatrooms.{room_id}.v2"
+            if topic not in self.channel_tags:
+                self.channels.append(topic)
+                self.channel_tags[topic] = slug.lower()
+                self.log(LoggerText.info(f"Canal adicional: {slug}"))
+        self.username = username
 
         try:
-            self.ws_connection = await self.session.ws_connect(pusher_url)
-            subscribe_msg = {
-                "event": "pusher:subscribe",
-                "data": {"auth": "", "channel": f"chatrooms.{chatroom_id}.v2"}
-            }
-            await self.ws_connection.send_json(subscribe_msg)
-
-            self.loop.create_task(self._listen())
-            self.queue_task = self.loop.create_task(self._process_message_queue())
-            
-            self.log(LoggerText.success(f"CHAT CONECTADO: {username}"))
-            return True
+            await self._open_socket()
         except Exception as e:
             self.log(LoggerText.error(f"Fallo conexión WebSocket nativa: {e}"))
             return False
 
+        self.supervisor_task = self.loop.create_task(self._supervise())
+        self.queue_task = self.loop.create_task(self._process_message_queue())
+        self.log(LoggerText.success(f"CHAT CONECTADO: {username}"))
+        return True
+
+    async def _open_socket(self):
+        """Abre el WebSocket y (re)suscribe todos los canales."""
+        self.ws_connection = await self.session.ws_connect(self.pusher_url)
+        now = self.loop.time()
+        self._last_rx = now
+        self._last_ping_at = now
+        self._ping_sent_at = None
+        for channel in self.channels:
+            await self.ws_connection.send_json({"event": "pusher:subscribe", "data": {"auth": "", "channel": channel}})
+        self.stats["connects"] += 1
+        self.stats["connected"] = True
+
+    async def _supervise(self):
+        """Mantiene la conexión viva: escucha, y si el socket cae o se bloquea, reconecta con backoff."""
+        while self.is_running:
+            heartbeat = self.loop.create_task(self._heartbeat())
+            try:
+                await self._listen()
+            finally:
+                heartbeat.cancel()
+            self.stats["connected"] = False
+            if not self.is_running:
+                break
+
+            down_since = self.loop.time()
+            attempt = 0
+            while self.is_running:
+                # Jitter completo: evita que muchas instancias reconecten a la vez
+                delay = random.uniform(0, min(RECONNECT_MAX_S, RECONNECT_BASE_S * (2 ** attempt)))
+                self.log(LoggerText.warning(f"Reconectando chat en {delay:.1f}s (intento {attempt + 1})..."))
+                await asyncio.sleep(delay)
+                try:
+                    await self._open_socket()
+                    break
+                except Exception as e:
+                    attempt += 1
+                    self.stats["failed_attempts"] += 1
+                    self.log(LoggerText.error(f"Fallo al reconectar el chat: {e}"))
+
+            if self.stats["connected"]:
+                self.stats["reconnects"] += 1
+                self.stats["last_downtime_s"] = self.loop.time() - down_since
+                self.log(LoggerText.success(f"CHAT RECONECTADO: {self.username} ({self.stats['last_downtime_s']:.1f}s sin conexión)"))
+
+    async def _heartbeat(self):
+        """Ping de cliente periódico (mide RTT) y cierre forzado si el pong no llega a tiempo."""
+        while self.is_running:
+            await asyncio.sleep(HEARTBEAT_CHECK_S)
+            ws = self.ws_connection
+            if not ws or ws.closed: return
+            now = self.loop.time()
+
+            if self._ping_sent_at is not None:
+                if now - self._ping_sent_at > PONG_TIMEOUT_S:
+                    self.stats["stalls"] += 1
+                    self.log(LoggerText.warning(f"Chat bloqueado: sin pong en {PONG_TIMEOUT_S}s, forzando reconexión."))
+                    await ws.close()
+                    return
+            elif now - self._last_ping_at >= min(self.activity_timeout, 30) or now - self._last_rx >= self.activity_timeout:
+                self._ping_sent_at = self._last_ping_at = now
+                try:
+                    await ws.send_json({"event": "pusher:ping", "data": {}})
+                except Exception:
+                    return  # El socket ya cayó: _listen termina y el supervisor reconecta
+
     async def _listen(self):
         try:
             async for msg in self.ws_connection:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    data = json.loads(msg.data)
-                    if data.get("event") == "pusher:ping":
-                        await self.ws_connection.send_json({
-                            "event": "pusher:pong",
-                            "data": {}
-                        })
+                    now = self.loop.time()
+                    self.stats["max_gap_s"] = max(self.stats["max_gap_s"], now - self._last_rx)
+                    self._last_rx = now
+                    try:
+                        data = json.loads(msg.data)
+                    except ValueError:
                         continue
-                    if data.get("event") == "App\\Events\\ChatMessageEvent":
-                        self._parse_message(json.loads(data.get("data", "{}")))
+                    await self._handle_frame(data, now)
                 elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                     break
         except Exception as e:
@@ -67,7 +189,66 @@ class KickChatManager:
         finally:
             self.log(LoggerText.warning("Conexión WebSocket cerrada."))
 
-    def _parse_message(self, chat_data):
+    async def _handle_frame(self, data, now):
+        event = data.get("event")
+        if event == "pusher:ping":
+            await self.ws_connection.send_json({"event": "pusher:pong", "data": {}})
+        elif event == "pusher:pong":
+            if self._ping_sent_at is not None:
+                rtt_ms = (now - self._ping_sent_at) * 1000
+                avg = self.stats["avg_rtt_ms"]
+                self.stats["last_rtt_ms"] = rtt_ms
+                self.stats["avg_rtt_ms"] = rtt_ms if not avg else avg * 0.8 + rtt_ms * 0.2
+                PUSHER_RTT.observe(rtt_ms / 1000)
+                self._ping_sent_at = None
+        elif event == "pusher:connection_established":
+            info = json.loads(data.get("data") or "{}")
+            self.activity_timeout = info.get("activity_timeout") or DEFAULT_ACTIVITY_TIMEOUT_S
+        elif event == "pusher:error":
+            self.log(LoggerText.warning(f"Pusher error: {data.get('data')}"))
+        elif event == "pusher_internal:subscription_succeeded":
+            self.emit_event("subscribed", data.get("channel", ""), {})
+        elif event == "App\\Events\\ChatMessageEvent":
+            self._parse_message(json.loads(data.get("data", "{}")), self.channel_tags.get(data.get("channel"), ""))
+        elif event in self.CHANNEL_EVENTS and self.channel_tags.get(data.get("channel"), self.main_tag) == self.main_tag:
+            # Solo eventos del canal principal (su sala o channel.{id}); los de salas adicionales se ignoran
+            self._parse_channel_event(event, json.loads(data.get("data") or "{}"))
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+    # =========================================================================
+    # REGIÓN 2: EVENTOS DEL CANAL (FOLLOWS, SUBS, REGALOS, HOSTS)
+    # =========================================================================
+    CHANNEL_EVENTS = {
+        "App\\Events\\FollowersUpdated": "follow",
+        "App\\Events\\SubscriptionEvent": "subscription",
+        "App\\Events\\GiftedSubscriptionsEvent": "gift",
+        "App\\Events\\StreamHostEvent": "host",
+    }
+
+    def _parse_channel_event(self, event, payload):
+        try:
+            kind = self.CHANNEL_EVENTS[event]
+            if kind == "follow":
+                # También llega al dejar de seguir (followed=false): solo sincroniza el contador
+                extra = {"count": payload.get("followersCount", 0), "followed": payload.get("followed", True)}
+                self.emit_event("follow", payload.get("username") or "", extra)
+            elif kind == "subscription":
+                for user in payload.get("usernames") or [payload.get("username", "")]:
+                    if user: self.emit_event("subscription", user, {"months": payload.get("months", 1)})
+            elif kind == "gift":
+                gifted = payload.get("gifted_usernames") or []
+                self.emit_event("gift", payload.get("gifter_username") or "Anónimo", {"count": len(gifted), "gifted": gifted})
+            elif kind == "host":
+                self.emit_event("host", payload.get("host_username", ""), {"viewers": payload.get("number_viewers", 0)})
+        except Exception as e:
+            self.log(LoggerText.error(f"Error parseando evento del canal ({event}): {e}"))
+
+    # =========================================================================
+    # REGIÓN 3: MENSAJES DE CHAT Y ENTREGA POR LOTES
+    # =========================================================================
+    def _parse_message(self, chat_data, channel=""):
         try:
             content = chat_data.get('content', '')
             if not content: return
@@ -76,17 +257,32 @@ class KickChatManager:
             sender = sender_info.get('username', 'Desconocido')
             badges = [b.get('type') for b in sender_info.get('identity', {}).get('badges', []) if isinstance(b, dict)]
             timestamp = datetime.now().strftime("%H:%M:%S")
-            self.message_queue.put_nowait((sender, content, badges, timestamp))
+            self.message_queue.put_nowait((sender, content, badges, timestamp, channel))
         except Exception as e:
             self.log(LoggerText.error(f"Error parseando mensaje: {e}"))
 
     async def _process_message_queue(self):
-        """Consumidor: Extrae mensajes y los despacha dando un respiro a la UI."""
+        """Consumidor: drena lo disponible hasta batch_max o hasta la latencia objetivo y lo emite en un solo lote."""
         while self.is_running:
             try:
-                sender, content, badges, timestamp = await self.message_queue.get()
-                self.emit_chat(sender, content, badges, timestamp)                
-                await asyncio.sleep(0.015)                 
+                batch = [await self.message_queue.get()]
+                deadline = self.loop.time() + self.batch_latency
+
+                while len(batch) < self.batch_max:
+                    if not self.message_queue.empty():
+                        batch.append(self.message_queue.get_nowait())
+                        continue
+                    remaining = deadline - self.loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.message_queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                CHAT_RECEIVED.inc(len(batch))
+                CHAT_BATCH_SIZE.observe(len(batch))
+                self.emit_batch(batch)
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -94,8 +290,9 @@ class KickChatManager:
 
     async def disconnect(self):
         self.is_running = False
-        if self.queue_task and not self.queue_task.done():
-            self.queue_task.cancel()
+        for task in (self.supervisor_task, self.queue_task):
+            if task and not task.done():
+                task.cancel()
             
         if self.ws_connection and not self.ws_connection.closed:
             await self.ws_connection.close()
\ No newline at end of file
@@ -0,0 +1,170 @@
+# backend/core/kick/outbox.py
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Tuple
+
+from backend.utils.logger_text import LoggerText
+
+# Clases de prioridad (menor número = sale antes)
+PRIORITY_MODERATION = 0
+PRIORITY_ALERT = 1
+PRIORITY_COMMAND = 2
+PRIORITY_TIMER = 3
+
+KICK_MAX_CHARS = 500
+COALESCE_SEPARATOR = " | "
+COALESCE_MAX_PART = 200
+
+class ChatOutbox:
+    """
+    Cola de salida del chat con token bucket y prioridades.
+    Todos los envíos pasan por aquí: se descartan líneas idénticas pendientes, las
+    respuestas cortas de comandos pueden agruparse en un solo mensaje (< 500 caracteres,
+    opcional: chat_outbox_coalesce)
+    y un 429 de Kick pausa la cola durante el Retry-After indicado.
+    Vive en el loop asyncio del bot; desde otros hilos se usa enqueue_threadsafe().
+    """
+    LATENCY_WINDOW = 256
+
+    def __init__(self, send_fn: Callable[[str], Awaitable[Tuple[int, float]]], loop, log_callback,
+                 rate: float = 1.0, burst: int = 3, coalesce: bool = False, max_pending: int = 100):
+        self.send_fn = send_fn
+        self.loop = loop
+        self.log = log_callback
+        self.rate = max(0.05, rate)
+        self.burst = max(1, burst)
+        self.coalesce = coalesce
+        self.max_pending = max_pending
+
+        self._queues = {p: deque() for p in (PRIORITY_MODERATION, PRIORITY_ALERT, PRIORITY_COMMAND, PRIORITY_TIMER)}
+        self._pending_texts = set()
+        self._wakeup = asyncio.Event()
+        self._tokens = float(self.burst)
+        self._last_refill = loop.time()
+        self._paused_until = 0.0
+        self.task = None
+
+        self.stats = {"sent": 0, "failed": 0, "deduplicated": 0, "dropped": 0, "coalesced": 0, "rate_limited": 0}
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    # =========================================================================
+    # REGIÓN 1: ENTRADA
+    # =========================================================================
+    def start(self):
+        if not self.task or self.task.done():
+            self.task = self.loop.create_task(self._run())
+
+    def enqueue_threadsafe(self, text: str, priority: int = PRIORITY_COMMAND):
+        self.loop.call_soon_threadsafe(self.enqueue, text, priority)
+
+    def enqueue(self, text: str, priority: int = PRIORITY_COMMAND):
+        """Solo desde el hilo del loop."""
+        text = (text or "").strip()
+        if not text: return
+        if text in self._pending_texts:
+            self.stats["deduplicated"] += 1
+            return
+        if self.pending() >= self.max_pending and not self._drop_lowest(priority):
+            self.stats["dropped"] += 1
+            return
+
+        self._queues.setdefault(priority, deque()).append((text, time.perf_counter()))
+        self._pending_texts.add(text)
+        self._wakeup.set()
+
+    def _drop_lowest(self, priority: int) -> bool:
+        """Hace sitio descartando el mensaje más antiguo de menor prioridad que la entrante."""
+        for p in sorted(self._queues, reverse=True):
+            if p <= priority: break
+            if self._queues[p]:
+                text, _ = self._queues[p].popleft()
+                self._pending_texts.discard(text)
+                self.stats["dropped"] += 1
+                return True
+        return False
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    # =========================================================================
+    # REGIÓN 2: DESPACHO
+    # =========================================================================
+    def _next_message(self):
+        """Saca el siguiente mensaje por prioridad; agrupa respuestas cortas de comandos."""
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            if not queue: continue
+
+            text, enqueued_at = queue.popleft()
+            self._pending_texts.discard(text)
+            parts = [(text, enqueued_at)]
+
+            if self.coalesce and priority == PRIORITY_COMMAND and len(text) <= COALESCE_MAX_PART:
+                length = len(text)
+                while queue and len(queue[0][0]) <= COALESCE_MAX_PART and \
+                        length + len(COALESCE_SEPARATOR) + len(queue[0][0]) <= KICK_MAX_CHARS:
+                    extra, extra_at = queue.popleft()
+                    self._pending_texts.discard(extra)
+                    length += len(COALESCE_SEPARATOR) + len(extra)
+                    parts.append((extra, extra_at))
+                self.stats["coalesced"] += len(parts) - 1
+
+            return COALESCE_SEPARATOR.join(p[0] for p in parts), [p[1] for p in parts], priority
+        return None, [], None
+
+    async def _acquire_token(self):
+        while True:
+            now = self.loop.time()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _run(self):
+        while True:
+            try:
+                if not self.pending():
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                await self._acquire_token()
+
+                text, enqueued, priority = self._next_message()
+                if text is None: continue
+
+                status, retry_after = await self.send_fn(text)
+                if status == 429:
+                    # Kick nos limita: pausamos y devolvemos el mensaje al frente de su cola
+                    self.stats["rate_limited"] += 1
+                    retry_after = retry_after if retry_after > 0 else 1.0
+                    self._paused_until = self.loop.time() + retry_after
+                    self._tokens = 0
+                    self._queues[priority].appendleft((text, enqueued[0]))
+                    self._pending_texts.add(text)
+                    self.log(LoggerText.warning(f"Kick limitó el envío (429). Reintentando en {retry_after:.1f}s."))
+                    continue
+
+                now = time.perf_counter()
+                if 200 <= status < 300:
+                    self.stats["sent"] += 1
+                    self._latencies.extend(now - t for t in enqueued)
+                else:
+                    self.stats["failed"] += 1
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.log(LoggerText.error(f"Error en la cola de salida del chat: {e}"))
+
+    # =========================================================================
+    # REGIÓN 3: MÉTRICAS
+    # =========================================================================
+    def get_stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        pick = lambda pct: latencies[min(len(latencies) - 1, int(len(latencies) * pct))] * 1000 if latencies else 0.0
+        return self.stats | {"pending": self.pending(), "latency_p50_ms": pick(0.50), "latency_p99_ms": pick(0.99)}
@@ -6,26 +6,27 @@ from typing import Dict, Any, Optional
 from PyQt6.QtCore import QThread, pyqtSignal
 
 # Módulos Internos
-from backend.core.db_controller import DBHandler 
 from backend.utils.logger_text import LoggerText
 
 # Nuevos Gestores Separados
 from backend.core.kick.auth_manager import KickAuthManager
 from backend.core.kick.api_manager import KickAPIManager
 from backend.core.kick.chat_manager import KickChatManager
+from backend.core.kick.outbox import PRIORITY_COMMAND
 
 class KickBotWorker(QThread):
     # --- SEÑALES UI ---
-    chat_received = pyqtSignal(str, str, list, str)         
+    chat_batch_received = pyqtSignal(list)         
+    channel_event = pyqtSignal(str, str, dict)
     log_received = pyqtSignal(str)               
     disconnected_signal = pyqtSignal()           
     user_info_signal = pyqtSignal(str, int, str)
     username_required = pyqtSignal() 
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], db_handler):
         super().__init__()
         self.config = config
-        self.db = DBHandler()  
+        self.db = db_handler
         self._is_running = True
         self.loop: Optional[asyncio.AbstractEventLoop] = None
         self.http_session: Optional[aiohttp.ClientSession] = None
@@ -55,7 +56,13 @@ class KickBotWorker(QThread):
         # Instanciar Gestores
         self.auth = KickAuthManager(self.config, self.http_session, self.log_received.emit)
         self.api = KickAPIManager(self.auth, self.http_session, self.loop, self.db, self.config, self.log_received.emit, self.user_info_signal)
-        self.chat = KickChatManager(self.http_session, self.loop, self.log_received.emit, self.chat_received.emit)
+        self.api.outbox.start()
+        self.chat = KickChatManager(
+            self.http_session, self.loop, self.log_received.emit, self.chat_batch_received.emit,
+            batch_latency_ms=self.db.get_int("chat_batch_latency_ms", 25),
+            batch_max=self.db.get_int("chat_batch_max", 100),
+            event_callback=self.channel_event.emit
+        )
 
         # 1. Autenticación
         if not await self.auth.ensure_authentication():
@@ -67,8 +74,12 @@ class KickBotWorker(QThread):
             self.username_required.emit()
             return
             
-        # 3. Conexión al Chat (Pusher WebSocket)
-        if not await self.chat.connect(self.api.chatroom_id, self.config.get('kick_username')):
+        # 3. Conexión al Chat (Pusher WebSocket): canal principal + canales adicionales en el mismo socket
+        extra_rooms = []
+        for slug in self.db.get_extra_channels():
+            if resolved := await self.api.resolve_channel(slug):
+                extra_rooms.append((slug, resolved[0]))
+        if not await self.chat.connect(self.api.chatroom_id, self.config.get('kick_username'), self.api.channel_id, extra_rooms):
             return
             
         # 4. Bucle principal
@@ -78,10 +89,10 @@ class KickBotWorker(QThread):
         except asyncio.CancelledError:
             pass
 
-    def send_chat_message(self, text: str):
-        """Llamado desde el Frontend para responder comandos"""
+    def send_chat_message(self, text: str, priority: int = PRIORITY_COMMAND):
+        """Llamado desde cualquier hilo: el mensaje entra al outbox con su prioridad."""
         if self.loop and self._is_running and self.api:
-            asyncio.run_coroutine_threadsafe(self.api.send_message(text), self.loop)
+            self.api.queue_message(text, priority)
 
     def stop(self):
         """Detiene el bot y despierta el loop de asyncio inmediatamente."""
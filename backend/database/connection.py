@@ -2,71 +2,188 @@
 
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 from PyQt6.QtCore import QMutex, QMutexLocker
 from backend.utils.paths import get_config_path
+from backend.utils.metrics import REGISTRY
+
+# Las esperas por el mutex suelen ser de microsegundos: buckets más finos que los por defecto
+DB_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+DB_LOCK_WAIT = REGISTRY.histogram("kickmonitor_db_lock_wait_seconds", "Espera por el mutex del escritor SQLite",
+                                  labels=("op",), buckets=DB_BUCKETS)
+DB_WRITE_TIME = REGISTRY.histogram("kickmonitor_db_write_seconds", "Duración de escrituras con el mutex tomado (incluye COMMIT)",
+                                   labels=("op",), buckets=DB_BUCKETS)
+DB_ERRORS = REGISTRY.counter("kickmonitor_db_errors_total", "Escrituras o lecturas SQLite fallidas", labels=("op",))
 
 class DatabaseConnection:
+    """
+    Conexión única del proceso: un escritor serializado por mutex y una
+    conexión de solo lectura por hilo (WAL permite leer sin bloquear al escritor).
+    """
     def __init__(self, db_name="kick_data.db"):
         self.db_path = os.path.join(get_config_path(), db_name)
         self.mutex = QMutex()
-        
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._shared_reads = False
+
         try:
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
-            self.conn.row_factory = sqlite3.Row 
+            self.conn.row_factory = sqlite3.Row
             self._init_wal()
         except sqlite3.OperationalError as e:
             print(f"[DB_CRITICAL] No se pudo abrir {self.db_path}: {e}")
             self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            # Una base en memoria no se puede abrir dos veces: leemos por el escritor
+            self._shared_reads = True
 
     def _init_wal(self):
         with QMutexLocker(self.mutex):
             try:
                 self.conn.execute("PRAGMA journal_mode=WAL;")
+                self.conn.execute("PRAGMA synchronous=NORMAL;")
                 self.conn.commit()
             except Exception as e:
                 print(f"[DB_ERROR] Fallo al iniciar WAL: {e}")
+                self._shared_reads = True
 
-    def execute_query(self, sql, params=()):
+    @contextmanager
+    def _locked(self, op: str):
+        """Toma el mutex del escritor midiendo la espera y el tiempo retenido."""
+        started = time.perf_counter()
         with QMutexLocker(self.mutex):
+            acquired = time.perf_counter()
+            DB_LOCK_WAIT.observe(acquired - started, op=op)
+            try:
+                yield
+            finally:
+                DB_WRITE_TIME.observe(time.perf_counter() - acquired, op=op)
+
+    def _reader(self):
+        """Devuelve (creando si hace falta) la conexión de lectura del hilo actual."""
+        reader = getattr(self._local, "conn", None)
+        if reader is None:
+            reader = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            reader.row_factory = sqlite3.Row
+            reader.execute("PRAGMA query_only=1;")
+            self._local.conn = reader
+            with self._readers_lock:
+                # Cerramos los lectores de hilos que ya terminaron (reconexiones del bot)
+                alive = []
+                for thread, conn in self._readers:
+                    if thread.is_alive():
+                        alive.append((thread, conn))
+                    else:
+                        conn.close()
+                self._readers = alive + [(threading.current_thread(), reader)]
+        return reader
+
+    def _read(self, sql, params, fetch_all):
+        if self._shared_reads:
+            with self._locked("read"):
+                cur = self.conn.execute(sql, params)
+                try:
+                    return cur.fetchall() if fetch_all else cur.fetchone()
+                finally:
+                    cur.close()
+
+        # Cerramos el cursor para no retener el snapshot de lectura del WAL
+        cur = self._reader().execute(sql, params)
+        try:
+            return cur.fetchall() if fetch_all else cur.fetchone()
+        finally:
+            cur.close()
+
+    def execute_query(self, sql, params=()):
+        with self._locked("query"):
             try:
                 self.conn.execute(sql, params)
                 self.conn.commit()
                 return True
-            except Exception as e: 
+            except Exception as e:
+                DB_ERRORS.inc(op="query")
                 print(f"[DB_ERROR] Fallo en execute_query: {e} | SQL: {sql}")
                 return False
 
     def execute_transaction(self, queries_and_params):
         """NUEVO: Ejecuta múltiples consultas en un solo acceso a disco (Rendimiento Extremo)"""
-        with QMutexLocker(self.mutex):
+        with self._locked("transaction"):
             try:
                 for sql, params in queries_and_params:
                     self.conn.execute(sql, params)
                 self.conn.commit()
                 return True
             except Exception as e:
+                DB_ERRORS.inc(op="transaction")
                 print(f"[DB_ERROR] Fallo en transacción, revirtiendo: {e}")
                 self.conn.rollback()
                 return False
 
-    def fetch_one(self, sql, params=()):
-        with QMutexLocker(self.mutex):
+    def execute_batch(self, statements):
+        """Ejecuta varios executemany [(sql, [params, ...]), ...] en una sola transacción."""
+        with self._locked("batch"):
             try:
-                return self.conn.execute(sql, params).fetchone()
+                for sql, rows in statements:
+                    if rows:
+                        self.conn.executemany(sql, rows)
+                self.conn.commit()
+                return True
             except Exception as e:
-                print(f"[DB_ERROR] Fallo en fetch_one: {e} | SQL: {sql}")
-                return None
+                DB_ERRORS.inc(op="batch")
+                print(f"[DB_ERROR] Fallo en lote, revirtiendo: {e}")
+                self.conn.rollback()
+                return False
 
-    def fetch_all(self, sql, params=()):
-        with QMutexLocker(self.mutex):
+    def execute_returning(self, statements):
+        """
+        Ejecuta [(sql, params), ...] en una sola transacción y devuelve la primera fila de
+        cada sentencia (útil con UPDATE ... RETURNING). None si la transacción falló.
+        """
+        with self._locked("returning"):
             try:
-                return self.conn.execute(sql, params).fetchall()
+                results = []
+                for sql, params in statements:
+                    cur = self.conn.execute(sql, params)
+                    results.append(cur.fetchone())
+                    cur.close()
+                self.conn.commit()
+                return results
             except Exception as e:
-                print(f"[DB_ERROR] Fallo en fetch_all: {e} | SQL: {sql}")
-                return []
+                DB_ERRORS.inc(op="returning")
+                print(f"[DB_ERROR] Fallo en transacción RETURNING, revirtiendo: {e}")
+                self.conn.rollback()
+                return None
+
+    def fetch_one(self, sql, params=()):
+        try:
+            return self._read(sql, params, fetch_all=False)
+        except Exception as e:
+            DB_ERRORS.inc(op="fetch_one")
+            print(f"[DB_ERROR] Fallo en fetch_one: {e} | SQL: {sql}")
+            return None
+
+    def fetch_all(self, sql, params=()):
+        try:
+            return self._read(sql, params, fetch_all=True)
+        except Exception as e:
+            DB_ERRORS.inc(op="fetch_all")
+            print(f"[DB_ERROR] Fallo en fetch_all: {e} | SQL: {sql}")
+            return []
 
     def close(self):
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for _, reader in readers:
+            try:
+                reader.close()
+            except Exception as e:
+                print(f"[DB_ERROR] Fallo al cerrar lector: {e}")
+        self._local = threading.local()
         try:
             self.conn.close()
         except Exception as e:
-            print(f"[DB_ERROR] Fallo al cerrar conexión: {e}")
\ No newline at end of file
+            print(f"[DB_ERROR] Fallo al cerrar conexión: {e}")
@@ -0,0 +1,94 @@
+# backend/database/ledger.py
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from PyQt6.QtCore import QRecursiveMutex, QMutexLocker
+
+# Tope de la caché de roles ya persistidos (LRU): un chat grande no la hace crecer sin límite
+KNOWN_ROLES_MAX = 4096
+
+class EconomyLedger:
+    """
+    Libro mayor en memoria (write-behind) para la actividad del chat.
+    Acumula deltas de puntos, cambios de rol y last_seen por usuario y los
+    vuelca a SQLite en una sola transacción (executemany) cada pocos cientos de ms.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        # Recursivo: get_points/spend_points leen la DB y el pendiente bajo el mismo candado
+        self.mutex = QRecursiveMutex()
+        self._points: Dict[str, int] = {}
+        self._seen: Dict[str, str] = {}
+        self._roles: Dict[str, str] = {}
+        self._known_roles: OrderedDict = OrderedDict()
+
+    # =========================================================================
+    # REGIÓN 1: ACUMULACIÓN (HOT PATH DEL CHAT)
+    # =========================================================================
+    def record(self, username: str, role: Optional[str] = None, points: int = 0, touch: bool = False):
+        """Registra la actividad de un mensaje sin tocar el disco."""
+        user = username.lower()
+        with QMutexLocker(self.mutex):
+            if role:
+                self._remember_role(user, role)
+            if points:
+                self._points[user] = self._points.get(user, 0) + points
+            if touch:
+                self._seen[user] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _remember_role(self, user: str, role: str):
+        """Encola el rol solo si cambió; lo ya conocido sube al frente de la LRU."""
+        if self._known_roles.get(user) == role:
+            self._known_roles.move_to_end(user)
+            return
+        self._roles[user] = role
+        self._known_roles[user] = role
+        self._known_roles.move_to_end(user)
+        if len(self._known_roles) > KNOWN_ROLES_MAX:
+            self._known_roles.popitem(last=False)
+
+    def pending_points(self, username: str) -> int:
+        with QMutexLocker(self.mutex):
+            return self._points.get(username.lower(), 0)
+
+    def discard(self, username: str = None):
+        """Descarta deltas pendientes (de un usuario o de todos) tras un borrado o reset."""
+        with QMutexLocker(self.mutex):
+            if username is None:
+                self._points.clear()
+                return
+            user = username.lower()
+            self._points.pop(user, None)
+            self._seen.pop(user, None)
+            self._roles.pop(user, None)
+            self._known_roles.pop(user, None)
+
+    def has_pending(self) -> bool:
+        with QMutexLocker(self.mutex):
+            return bool(self._points or self._seen or self._roles)
+
+    # =========================================================================
+    # REGIÓN 2: VOLCADO A DISCO
+    # =========================================================================
+    def flush(self) -> bool:
+        """Escribe todo lo pendiente en una única transacción. Si falla, conserva los datos."""
+        with QMutexLocker(self.mutex):
+            if not (self._points or self._seen or self._roles):
+                return True
+
+            users = set(self._points) | set(self._seen) | set(self._roles)
+            activity = [
+                (self._points.get(u, 0), self._seen.get(u), u)
+                for u in users if u in self._points or u in self._seen
+            ]
+            ok = self.conn.execute_batch([
+                ("INSERT OR IGNORE INTO data_users (username) VALUES (?)", [(u,) for u in users]),
+                ("UPDATE data_users SET role = ? WHERE username = ?", [(r, u) for u, r in self._roles.items()]),
+                ("UPDATE data_users SET points = points + ?, last_seen = COALESCE(?, last_seen) WHERE username = ? AND is_paused = 0", activity),
+            ])
+            if ok:
+                self._points.clear()
+                self._seen.clear()
+                self._roles.clear()
+            return ok
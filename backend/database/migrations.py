@@ -0,0 +1,111 @@
+# backend/database/migrations.py
+
+from typing import Callable, List, Tuple
+
+# =========================================================================
+# PASOS DE MIGRACIÓN (se ejecutan una sola vez, en orden, según PRAGMA user_version)
+# =========================================================================
+LEGACY_COLUMNS = {
+    "kick_streamer": [
+        ("bio", "TEXT DEFAULT ''"), ("can_host", "INTEGER DEFAULT 0"),
+        ("verified", "INTEGER DEFAULT 0"), ("subscription_enabled", "INTEGER DEFAULT 0"),
+        ("vod_enabled", "INTEGER DEFAULT 0"), ("is_banned", "INTEGER DEFAULT 0"),
+        ("user_id", "INTEGER")
+    ],
+    "triggers": [
+        ("duration", "INTEGER DEFAULT 0"), ("scale", "REAL DEFAULT 1.0"),
+        ("is_active", "INTEGER DEFAULT 1"), ("cost", "INTEGER DEFAULT 0"),
+        ("volume", "INTEGER DEFAULT 100"), ("pos_x", "INTEGER DEFAULT 0"),
+        ("pos_y", "INTEGER DEFAULT 0"), ("color", "TEXT DEFAULT '#53fc18'"),
+        ("description", "TEXT DEFAULT 'Trigger KickMonitor'"),
+        ("path", "TEXT DEFAULT ''"), ("random_pos", "INTEGER DEFAULT 0")
+    ],
+    "data_users": [("is_paused", "INTEGER DEFAULT 0"), ("is_muted", "INTEGER DEFAULT 0"), ("role", "TEXT DEFAULT ''"), ("color", "TEXT DEFAULT ''")],
+    "custom_commands": [("cooldown", "INTEGER DEFAULT 5"), ("aliases", "TEXT DEFAULT ''"), ("cost", "INTEGER DEFAULT 0")],
+    "timers": [("interval", "INTEGER DEFAULT 15"), ("last_run", "REAL DEFAULT 0")]
+}
+
+def _add_legacy_columns(cursor):
+    """Crea columnas que faltan en bases de datos de versiones antiguas."""
+    for table, cols in LEGACY_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing_cols = {row[1] for row in cursor.fetchall()}
+        for col_name, col_def in cols:
+            if col_name not in existing_cols:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_def}")
+
+def _backfill_command_aliases(cursor):
+    """Rellena la tabla normalizada command_aliases desde la columna legacy 'aliases'."""
+    rows = cursor.execute("SELECT trigger, aliases FROM custom_commands WHERE aliases != ''").fetchall()
+    pairs = [
+        (alias, trig)
+        for trig, aliases in rows
+        for alias in (a.strip().lower() for a in (aliases or "").split(',') if a.strip())
+        if alias != trig
+    ]
+    cursor.executemany("INSERT OR REPLACE INTO command_aliases (alias, trigger) VALUES (?, ?)", pairs)
+
+def _create_indexes(cursor):
+    """Índices para los pagos periódicos, el ranking de puntos y las búsquedas por archivo."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_users_last_seen ON data_users(last_seen)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_users_points ON data_users(points)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_triggers_filename ON triggers(filename)")
+    cursor.execute("ANALYZE")
+
+def _add_watch_minutes(cursor):
+    """Minutos vistos acumulados por el pago periódico de espectadores activos."""
+    cursor.execute("PRAGMA table_info(data_users)")
+    if "watch_minutes" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE data_users ADD COLUMN watch_minutes INTEGER DEFAULT 0")
+
+def _add_kick_id(cursor):
+    """ID del canal (kick_id) para suscribirse a los eventos channel.{id} de Pusher."""
+    cursor.execute("PRAGMA table_info(kick_streamer)")
+    if "kick_id" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE kick_streamer ADD COLUMN kick_id INTEGER")
+
+def _create_processed_redemptions(cursor):
+    """Canjes ya procesados (deduplicación persistente con poda por antigüedad)."""
+    cursor.execute("CREATE TABLE IF NOT EXISTS processed_redemptions (id TEXT PRIMARY KEY, processed_at REAL NOT NULL)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_processed_redemptions_at ON processed_redemptions(processed_at)")
+
+def _add_awaiting_accept(cursor):
+    """Canjes disparados que aún no constan como aceptados en Kick (se reintentan tras reiniciar)."""
+    cursor.execute("PRAGMA table_info(processed_redemptions)")
+    if "awaiting_accept" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE processed_redemptions ADD COLUMN awaiting_accept INTEGER NOT NULL DEFAULT 0")
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "Columnas legacy", _add_legacy_columns),
+    (2, "Alias normalizados de comandos", _backfill_command_aliases),
+    (3, "Índices de data_users y triggers", _create_indexes),
+    (4, "Minutos vistos por usuario", _add_watch_minutes),
+    (5, "ID de canal de Kick", _add_kick_id),
+    (6, "Canjes procesados", _create_processed_redemptions),
+    (7, "Canjes pendientes de aceptar", _add_awaiting_accept),
+]
+
+# =========================================================================
+# EJECUTOR
+# =========================================================================
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn) -> int:
+    """Aplica en orden los pasos pendientes, cada uno en su propia transacción. Devuelve la versión final."""
+    current = get_schema_version(conn)
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            current = version
+        except Exception as e:
+            conn.rollback()
+            print(f"[DB_DEBUG] Error en migración {version} ({description}): {e}")
+            break
+    return current
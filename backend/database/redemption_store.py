@@ -0,0 +1,111 @@
+# backend/database/redemption_store.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List
+
+# Tope de la consulta IN (...) por sentencia (SQLITE_MAX_VARIABLE_NUMBER antiguo = 999)
+LOOKUP_CHUNK = 500
+
+class RedemptionDedupStore:
+    """
+    IDs de canjes ya procesados, para no disparar dos veces el mismo canje.
+    En memoria vive una LRU acotada con los más recientes; todo ID nuevo se anota además en
+    processed_redemptions, que se poda por antigüedad (TTL). Un fallo de la LRU consulta la
+    tabla, así que tras reiniciar la app se retoma justo donde quedó y la memoria no crece.
+    Seguro entre hilos: el polling y los webhooks (hilo del servidor) reclaman a la vez.
+
+    Reclamar solo evita disparar dos veces. Los canjes disparados que siguen pendientes en Kick
+    quedan con awaiting_accept = 1 hasta que el committer confirma la aceptación, así el polling
+    puede volver a aceptarlos tras un fallo o un reinicio.
+    """
+    def __init__(self, conn, max_memory: int = 4096, ttl_s: float = 7 * 86400):
+        self.conn = conn
+        self.max_memory = max(64, max_memory)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._recent: OrderedDict = OrderedDict()
+        self._awaiting = set()
+        self._warm()
+
+    def _warm(self):
+        rows = self.conn.fetch_all(
+            "SELECT id FROM processed_redemptions ORDER BY processed_at DESC LIMIT ?", (self.max_memory,))
+        for row in reversed(rows):
+            self._recent[row['id']] = True
+        rows = self.conn.fetch_all("SELECT id FROM processed_redemptions WHERE awaiting_accept = 1")
+        self._awaiting.update(row['id'] for row in rows)
+
+    # =========================================================================
+    # REGIÓN 1: RECLAMO (POLLING Y WEBHOOKS)
+    # =========================================================================
+    def claim(self, ids: Iterable[str], awaiting_accept: bool = False) -> List[str]:
+        """
+        Marca los IDs como procesados y devuelve, en orden, solo los que no se habían visto.
+        Con awaiting_accept, los nuevos quedan además a la espera de aceptarse en Kick.
+        """
+        with self._lock:
+            unknown = []
+            for red_id in dict.fromkeys(str(i) for i in ids if i):
+                if red_id in self._recent:
+                    self._recent.move_to_end(red_id)
+                else:
+                    unknown.append(red_id)
+            if not unknown: return []
+
+            stored = self._lookup(unknown)
+            new_ids = [red_id for red_id in unknown if red_id not in stored]
+            for red_id in unknown:
+                self._remember(red_id)
+            if new_ids:
+                now = time.time()
+                # Si la escritura falla, la LRU evita repetirlos al menos en esta sesión
+                self.conn.execute_batch([(
+                    "INSERT OR IGNORE INTO processed_redemptions (id, processed_at, awaiting_accept) VALUES (?, ?, ?)",
+                    [(red_id, now, int(awaiting_accept)) for red_id in new_ids])])
+                if awaiting_accept:
+                    self._awaiting.update(new_ids)
+            return new_ids
+
+    def awaiting(self, ids: Iterable[str]) -> List[str]:
+        """De los IDs dados, los ya disparados que aún no constan como aceptados en Kick."""
+        with self._lock:
+            return [red_id for red_id in dict.fromkeys(str(i) for i in ids) if red_id in self._awaiting]
+
+    def resolve(self, ids: Iterable[str]) -> bool:
+        """Quita la espera de aceptación (Kick la confirmó o el canje ya no está pendiente)."""
+        with self._lock:
+            done = [red_id for red_id in dict.fromkeys(str(i) for i in ids) if red_id in self._awaiting]
+            if not done: return True
+            self._awaiting.difference_update(done)
+            return self.conn.execute_batch([(
+                "UPDATE processed_redemptions SET awaiting_accept = 0 WHERE id = ?", [(red_id,) for red_id in done])])
+
+    def _lookup(self, ids: List[str]) -> set:
+        found = set()
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.fetch_all(f"SELECT id FROM processed_redemptions WHERE id IN ({placeholders})", tuple(chunk))
+            found.update(row['id'] for row in rows)
+        return found
+
+    def _remember(self, red_id: str):
+        self._recent[red_id] = True
+        if len(self._recent) > self.max_memory:
+            self._recent.popitem(last=False)
+
+    # =========================================================================
+    # REGIÓN 2: MANTENIMIENTO
+    # =========================================================================
+    def prune(self) -> bool:
+        """
+        Borra de la tabla los IDs más viejos que el TTL (la LRU ya los habrá soltado).
+        Los que esperan aceptación se conservan: un canje ya disparado no debe perderse.
+        """
+        return self.conn.execute_query(
+            "DELETE FROM processed_redemptions WHERE processed_at < ? AND awaiting_accept = 0", (time.time() - self.ttl_s,))
+
+    def __len__(self) -> int:
+        return len(self._recent)
@@ -1,6 +1,9 @@
 # backend/database/repositories.py
 
+import threading
 from typing import Dict, List, Optional, Tuple, Any
+from PyQt6.QtCore import QMutexLocker
+from backend.database.settings_store import to_setting_str
 
 class SettingsRepository:
     def __init__(self, conn): self.conn = conn
@@ -9,33 +12,42 @@ class SettingsRepository:
         row = self.conn.fetch_one("SELECT value FROM settings WHERE key=?", (key,))
         return row['value'] if row else default
 
-    def set(self, key: str, value: Any):
-        val_str = "1" if value is True else "0" if value is False else str(value)
-        self.conn.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, val_str))
+    def get_all(self) -> Dict[str, str]:
+        return {row['key']: row['value'] for row in self.conn.fetch_all("SELECT key, value FROM settings")}
+
+    def set(self, key: str, value: Any) -> bool:
+        return self.conn.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, to_setting_str(value)))
 
 class UsersRepository:
     def __init__(self, conn): self.conn = conn
 
     def get_user(self, slug: str) -> Optional[Dict]:
-        query = "SELECT username, followers_count AS followers, profile_pic, user_id FROM kick_streamer WHERE slug=?"
+        query = "SELECT username, followers_count AS followers, profile_pic, user_id, kick_id FROM kick_streamer WHERE slug=?"
         row = self.conn.fetch_one(query, (slug.lower(),))
         return dict(row) if row else None
 
-    def save_user(self, slug, username, followers, pic, chat_id, user_id=None):
+    def save_user(self, slug, username, followers, pic, chat_id, user_id=None, kick_id=None):
         slug = slug.lower()
         query = """
             INSERT OR REPLACE INTO kick_streamer 
-            (slug, username, followers_count, profile_pic, chatroom_id, is_banned, playback_url, user_id) 
+            (slug, username, followers_count, profile_pic, chatroom_id, is_banned, playback_url, user_id, kick_id) 
             VALUES (?, ?, ?, ?, ?, 
                 COALESCE((SELECT is_banned FROM kick_streamer WHERE slug=?), 0), 
                 COALESCE((SELECT playback_url FROM kick_streamer WHERE slug=?), ''), 
-                COALESCE(?, (SELECT user_id FROM kick_streamer WHERE slug=?))
+                COALESCE(?, (SELECT user_id FROM kick_streamer WHERE slug=?)),
+                COALESCE(?, (SELECT kick_id FROM kick_streamer WHERE slug=?))
             )
         """
-        return self.conn.execute_query(query, (slug, username, followers, pic, chat_id, slug, slug, user_id, slug))
+        return self.conn.execute_query(query, (slug, username, followers, pic, chat_id, slug, slug, user_id, slug, kick_id, slug))
 
 class EconomyRepository:
-    def __init__(self, conn): self.conn = conn
+    def __init__(self, conn, ledger):
+        self.conn = conn
+        self.ledger = ledger
+
+    def record_activity(self, username: str, role: str, points: int = 0, touch: bool = False):
+        """Hot path del chat: rol, puntos y last_seen se acumulan en el ledger (write-behind)."""
+        self.ledger.record(username, role=role, points=points, touch=touch)
 
     def add_points(self, username: str, amount: int) -> int:
         user = username.lower()
@@ -45,21 +57,95 @@ class EconomyRepository:
         ])
         return self.get_points(user)
 
+    SPEND_SQL = "UPDATE data_users SET points = points - ? WHERE username = ? AND points >= ? RETURNING points"
+    CREDIT_SQL = "UPDATE data_users SET points = points + ? WHERE username = ? RETURNING points"
+
     def spend_points(self, username: str, cost: int) -> bool:
         if cost <= 0: return True
-        user = username.lower()
-        if self.get_points(user) >= cost:
-            self.conn.execute_query("UPDATE data_users SET points = points - ? WHERE username = ?", (cost, user))
-            return True
-        return False
+        # Consolidamos lo pendiente antes de cobrar para no gastar puntos "en vuelo"
+        self.ledger.flush()
+        # Comprobación y cobro en una sola sentencia: sin carreras entre hilos
+        result = self.conn.execute_returning([(self.SPEND_SQL, (cost, username.lower(), cost))])
+        return bool(result and result[0] is not None)
+
+    def apply_charges(self, charges: List[Tuple[str, int]]) -> List[Tuple[str, bool, int]]:
+        """
+        Aplica muchos cargos/abonos en una transacción: amount < 0 cobra solo si alcanza,
+        amount > 0 acredita (reembolsos, premios; ignora la pausa).
+        Devuelve [(user, ok, saldo)] en el orden recibido; el saldo de un cobro fallido es el final.
+        """
+        if not charges: return []
+        self.ledger.flush()
+
+        statements, slots = [], []
+        for username, amount in charges:
+            user = username.lower()
+            if amount < 0:
+                statements.append((self.SPEND_SQL, (-amount, user, -amount)))
+            else:
+                statements.append(("INSERT OR IGNORE INTO data_users (username) VALUES (?)", (user,)))
+                statements.append((self.CREDIT_SQL, (amount, user)))
+            slots.append((user, len(statements) - 1))
+
+        rows = self.conn.execute_returning(statements)
+        if rows is None:
+            return [(user, False, self.get_points(user)) for user, _ in slots]
+
+        results = []
+        for user, idx in slots:
+            row = rows[idx]
+            results.append((user, True, row['points']) if row is not None else (user, False, self.get_points(user)))
+        return results
 
     def get_points(self, username: str) -> int:
-        res = self.conn.fetch_one("SELECT points FROM data_users WHERE username=?", (username.lower(),))
-        return res['points'] if res else 0
+        user = username.lower()
+        with QMutexLocker(self.ledger.mutex):
+            res = self.conn.fetch_one("SELECT points, is_paused FROM data_users WHERE username=?", (user,))
+            stored = res['points'] if res else 0
+            # Los usuarios pausados no acumulan: su delta pendiente se descarta al volcar
+            if res and res['is_paused']:
+                return stored
+            return stored + self.ledger.pending_points(user)
 
     def get_all_users_points(self) -> List:
         return self.conn.fetch_all("SELECT username, points, last_seen, is_paused, is_muted, role, color FROM data_users ORDER BY points DESC")
 
+    # Columnas ordenables de la tabla de usuarios (lista blanca: nunca interpolamos texto del usuario)
+    USER_SORT_COLUMNS = {
+        "username": "username", "color": "color", "points": "points", "last_seen": "last_seen",
+        "is_paused": "is_paused", "is_muted": "is_muted"
+    }
+    # Los bots cuentan siempre como pausados y silenciados
+    _IS_BOT = "LOWER(TRIM(COALESCE(role, ''))) = 'bot'"
+
+    def _users_filter(self, search: str, filter_mode: str) -> Tuple[str, tuple]:
+        clauses, params = [], []
+        if search:
+            clauses.append("instr(username, ?) > 0")
+            params.append(search.lower().strip())
+        if filter_mode == "Pausados":
+            clauses.append(f"(is_paused = 1 OR {self._IS_BOT})")
+        elif filter_mode == "Silenciados":
+            clauses.append(f"(is_muted = 1 OR {self._IS_BOT})")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", tuple(params)
+
+    def query_users_page(self, search: str = "", filter_mode: str = "Todos", order_by: str = "points",
+                         descending: bool = True, limit: int = 200, offset: int = 0) -> List:
+        """Página de la tabla de usuarios con búsqueda, filtro y orden resueltos en SQLite."""
+        where, params = self._users_filter(search, filter_mode)
+        column = self.USER_SORT_COLUMNS.get(order_by, "points")
+        direction = "DESC" if descending else "ASC"
+        query = (
+            "SELECT username, points, last_seen, is_paused, is_muted, role, color FROM data_users"
+            f"{where} ORDER BY {column} {direction}, username ASC LIMIT ? OFFSET ?"
+        )
+        return self.conn.fetch_all(query, params + (int(limit), int(offset)))
+
+    def count_users(self, search: str = "", filter_mode: str = "Todos") -> int:
+        where, params = self._users_filter(search, filter_mode)
+        res = self.conn.fetch_one(f"SELECT COUNT(*) FROM data_users{where}", params)
+        return res[0] if res else 0
+
     def set_color(self, username: str, color: str):
         user = username.lower()
         self.conn.execute_transaction([
@@ -71,9 +157,25 @@ class EconomyRepository:
         res = self.conn.fetch_one("SELECT color FROM data_users WHERE username=?", (username.lower(),))
         return res['color'] if res and res['color'] else ""
 
-    def add_points_periodic(self, amount: int, minutes_window=10):
-        query = f"UPDATE data_users SET points = points + ? WHERE last_seen >= datetime('now', '-{minutes_window} minutes') AND is_paused = 0"
-        return self.conn.execute_query(query, (amount,))
+    def credit_active_users(self, usernames: List[str], amount: int, minutes: int = 1) -> bool:
+        """Pago periódico en un solo executemany: O(activos) en vez de recorrer toda la tabla."""
+        if not usernames: return True
+        self.ledger.flush()
+        query = """
+            UPDATE data_users SET watch_minutes = watch_minutes + ?,
+                points = points + CASE WHEN is_paused = 0 THEN ? ELSE 0 END
+            WHERE username = ?
+        """
+        return self.conn.execute_batch([(query, [(minutes, amount, u.lower()) for u in usernames])])
+
+    def get_recent_users(self, minutes_window: int = 10) -> List[Tuple[str, float]]:
+        """[(username, segundos desde last_seen)] dentro de la ventana; usa idx_data_users_last_seen."""
+        rows = self.conn.fetch_all(
+            "SELECT username, (julianday('now') - julianday(last_seen)) * 86400 AS age FROM data_users "
+            "WHERE last_seen >= datetime('now', ?)",
+            (f"-{int(minutes_window)} minutes",)
+        )
+        return [(r['username'], r['age'] or 0) for r in rows]
 
     def set_paused(self, username: str, is_paused: bool): 
         return self.conn.execute_query("UPDATE data_users SET is_paused = ? WHERE username = ?", (int(is_paused), username.lower()))
@@ -98,6 +200,7 @@ class EconomyRepository:
         ])
 
     def delete_user(self, username: str): 
+        self.ledger.discard(username)
         return self.conn.execute_query("DELETE FROM data_users WHERE username=?", (username,))
     
     def bulk_import_users(self, users_data: List[Dict], mutex) -> bool:
@@ -112,9 +215,10 @@ class EconomyRepository:
                 role = COALESCE(:role, role),
                 color = COALESCE(:color, color)
         """
+        # Volcamos lo pendiente primero: la importación sobrescribe los puntos
+        self.ledger.flush()
+
         # Usamos el mutex de PyQt6 que pasaremos desde el controlador
-        from PyQt6.QtCore import QMutexLocker 
-        
         with QMutexLocker(mutex):
             try:
                 self.conn.conn.executemany(query, users_data)
@@ -159,41 +263,137 @@ class TriggersRepository:
             }
         return data
 
+    def get_media_paths(self) -> Dict[str, str]:
+        """filename -> ruta en disco, solo de los triggers con archivo configurado."""
+        return {r[0]: r[1] for r in self.conn.fetch_all("SELECT filename, path FROM triggers WHERE path != ''")}
+
+    def delete_by_command(self, command: str):
+        return self.conn.execute_query("DELETE FROM triggers WHERE command IN (?, ?)", (command, f"!{command}"))
     def delete_triggers_by_filename(self, filename: str): return self.conn.execute_query("DELETE FROM triggers WHERE filename=?", (filename,))
     def clear_all(self): return self.conn.execute_query("DELETE FROM triggers")
     def get_shop_items(self) -> List[Tuple[str, int]]: return self.conn.fetch_all("SELECT command, cost FROM triggers WHERE is_active = 1 ORDER BY cost ASC")
     def update_active_state(self, filename: str, is_active: bool): return self.conn.execute_query("UPDATE triggers SET is_active = ? WHERE filename = ?", (int(is_active), filename))
 
 class ChatCommandsRepository:
-    def __init__(self, conn): self.conn = conn
+    COLUMNS = "trigger, response, is_active, cooldown, aliases, cost"
 
-    def add_command(self, trigger, response, cooldown=5, aliases="", cost=0):
+    def __init__(self, conn):
+        self.conn = conn
+        # Índice hash {trigger|alias: registro}; se construye una vez y se parchea en cada cambio
+        self._index: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def split_aliases(aliases: str) -> List[str]:
+        return [a.strip().lower() for a in (aliases or "").split(',') if a.strip()]
+
+    @staticmethod
+    def normalize_trigger(trigger: str) -> str:
         trig = trigger.lower().strip()
-        trig = trig if trig.startswith("!") else f"!{trig}"
-        return self.conn.execute_query(
-            "INSERT OR REPLACE INTO custom_commands (trigger, response, is_active, cooldown, aliases, cost) VALUES (?, ?, 1, ?, ?, ?)", 
-            (trig, response, cooldown, aliases, cost)
+        return trig if trig.startswith("!") else f"!{trig}"
+
+    # =========================================================================
+    # REGIÓN 1: ÍNDICE EN MEMORIA
+    # =========================================================================
+    def _build_index(self) -> Dict[str, Dict]:
+        rows = self.conn.fetch_all(
+            "SELECT c.trigger, c.response, c.is_active, c.cooldown, c.aliases, c.cost, a.alias "
+            "FROM custom_commands c LEFT JOIN command_aliases a ON a.trigger = c.trigger"
         )
+        records, aliases = {}, []
+        for row in rows:
+            r = dict(row)
+            alias = r.pop('alias')
+            records.setdefault(r['trigger'], r)
+            if alias: aliases.append((alias, r['trigger']))
+
+        # Los triggers principales tienen prioridad sobre cualquier alias
+        index = dict(records)
+        for alias, trig in aliases:
+            index.setdefault(alias, records[trig])
+        return index
+
+    def _get_index(self) -> Dict[str, Dict]:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+                index = self._index
+        return index
+
+    def _patch_index(self, record: Dict):
+        with self._lock:
+            if self._index is None: return
+            trig = record['trigger']
+            for key in [k for k, r in self._index.items() if r['trigger'] == trig]:
+                del self._index[key]
+            self._index[trig] = record
+            for alias in self.split_aliases(record['aliases']):
+                current = self._index.get(alias)
+                if current is None or current['trigger'] != alias:
+                    self._index[alias] = record
+
+    def invalidate_index(self):
+        with self._lock:
+            self._index = None
+
+    # =========================================================================
+    # REGIÓN 2: CRUD
+    # =========================================================================
+    def find_conflicts(self, trigger: str, aliases: str = "", ignore: Optional[str] = None) -> List[Tuple[str, str]]:
+        """[(nombre, trigger dueño)] de los nombres del comando que ya usa otro (como alias o como trigger)."""
+        trig = self.normalize_trigger(trigger)
+        names = list(dict.fromkeys([trig] + self.split_aliases(aliases)))
+        placeholders = ",".join("?" * len(names))
+        rows = self.conn.fetch_all(
+            f"SELECT alias AS name, trigger FROM command_aliases WHERE alias IN ({placeholders}) "
+            f"UNION ALL SELECT trigger AS name, trigger FROM custom_commands WHERE trigger IN ({placeholders})",
+            tuple(names) * 2)
+        own = {trig, ignore}
+        return [(r['name'], r['trigger']) for r in rows if r['trigger'] not in own]
+
+    def add_command(self, trigger, response, cooldown=5, aliases="", cost=0):
+        trig = self.normalize_trigger(trigger)
+        alias_list = list(dict.fromkeys(a for a in self.split_aliases(aliases) if a != trig))
+        # Un alias nunca se le quita a otro comando: el conflicto se informa y no se guarda nada
+        conflicts = self.find_conflicts(trig, aliases)
+        if conflicts:
+            print(f"[DB_ERROR] Nombres ya usados por otros comandos: {conflicts}")
+            return False
+        ok = self.conn.execute_batch([
+            ("INSERT OR REPLACE INTO custom_commands (trigger, response, is_active, cooldown, aliases, cost) VALUES (?, ?, 1, ?, ?, ?)",
+             [(trig, response, cooldown, aliases, cost)]),
+            ("DELETE FROM command_aliases WHERE trigger = ?", [(trig,)]),
+            ("INSERT INTO command_aliases (alias, trigger) VALUES (?, ?)", [(a, trig) for a in alias_list])
+        ])
+        if ok:
+            self._patch_index({"trigger": trig, "response": response, "is_active": 1, "cooldown": cooldown, "aliases": aliases, "cost": cost})
+        return ok
 
     def get_details_by_trigger_or_alias(self, cmd: str) -> Optional[Dict]:
-        """Busca un comando verificando tanto su trigger principal como sus alias."""
-        cmd_lower = cmd.lower().strip()
-        rows = self.conn.fetch_all("SELECT trigger, response, is_active, cooldown, aliases, cost FROM custom_commands")
-        
-        for row in rows:
-            # Coincidencia exacta con el trigger
-            if row['trigger'] == cmd_lower:
-                return dict(row)
-            
-            # Coincidencia con algún alias
-            aliases_list = [a.strip().lower() for a in row['aliases'].split(',') if a.strip()]
-            if cmd_lower in aliases_list:
-                return dict(row)         
-        return None
-
-    def get_all(self): return self.conn.fetch_all("SELECT trigger, response, is_active, cooldown, aliases, cost FROM custom_commands")
-    def delete(self, trigger): return self.conn.execute_query("DELETE FROM custom_commands WHERE trigger = ?", (trigger,))
-    def toggle_active(self, trigger, is_active): return self.conn.execute_query("UPDATE custom_commands SET is_active = ? WHERE trigger = ?", (int(is_active), trigger))
+        """Busca un comando por su trigger principal o por cualquiera de sus alias (O(1))."""
+        record = self._get_index().get(cmd.lower().strip())
+        return dict(record) if record else None
+
+    def get_all(self): return self.conn.fetch_all(f"SELECT {self.COLUMNS} FROM custom_commands")
+
+    def delete(self, trigger):
+        ok = self.conn.execute_transaction([
+            ("DELETE FROM custom_commands WHERE trigger = ?", (trigger,)),
+            ("DELETE FROM command_aliases WHERE trigger = ?", (trigger,))
+        ])
+        # Un alias pudo estar tapando a otro comando: reconstruimos en la próxima búsqueda
+        self.invalidate_index()
+        return ok
+
+    def toggle_active(self, trigger, is_active):
+        ok = self.conn.execute_query("UPDATE custom_commands SET is_active = ? WHERE trigger = ?", (int(is_active), trigger))
+        with self._lock:
+            record = self._index.get(trigger) if self._index is not None else None
+            if ok and record and record['trigger'] == trigger:
+                record['is_active'] = int(is_active)
+        return ok
 
 class AutomationsRepository:
     def __init__(self, conn): self.conn = conn
@@ -0,0 +1,83 @@
+# backend/database/settings_store.py
+
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+def to_setting_str(value: Any) -> str:
+    """Normaliza un valor al formato guardado en la tabla settings."""
+    return "1" if value is True else "0" if value is False else str(value)
+
+class SettingsStore:
+    """
+    Caché coherente de la tabla settings para todo el proceso.
+    Se precarga con una sola consulta; las lecturas no toman candados (snapshot inmutable)
+    y cada escritura publica un nuevo snapshot, sube la versión y avisa a los suscriptores.
+    """
+    def __init__(self, repository):
+        self.repo = repository
+        self._write_lock = threading.Lock()
+        self._snapshot = MappingProxyType({})
+        self._subscribers: List[Tuple[Callable[[str, str], None], Optional[Set[str]]]] = []
+        self.version = 0
+        self.reload()
+
+    # =========================================================================
+    # REGIÓN 1: LECTURA (SIN CANDADOS)
+    # =========================================================================
+    def get(self, key: str, default: str = "") -> str:
+        return self._snapshot.get(key, default)
+
+    def snapshot(self) -> MappingProxyType:
+        return self._snapshot
+
+    # =========================================================================
+    # REGIÓN 2: ESCRITURA Y RECARGA
+    # =========================================================================
+    def set(self, key: str, value: Any) -> bool:
+        """Persiste el valor; solo si la escritura fue bien se publica el snapshot y se avisa."""
+        val_str = to_setting_str(value)
+        with self._write_lock:
+            if not self.repo.set(key, val_str):
+                return False
+            if self._snapshot.get(key) == val_str:
+                return True
+            data = dict(self._snapshot)
+            data[key] = val_str
+            self._snapshot = MappingProxyType(data)
+            self.version += 1
+        self._notify({key: val_str})
+        return True
+
+    def reload(self):
+        """Relee la tabla completa (arranque, reset de fábrica) y avisa de lo que cambió."""
+        with self._write_lock:
+            fresh = self.repo.get_all()
+            old = self._snapshot
+            changed = {k: v for k, v in fresh.items() if old.get(k) != v}
+            changed.update({k: "" for k in old if k not in fresh})
+            self._snapshot = MappingProxyType(fresh)
+            if changed:
+                self.version += 1
+        if changed:
+            self._notify(changed)
+
+    # =========================================================================
+    # REGIÓN 3: SUSCRIPCIONES
+    # =========================================================================
+    def subscribe(self, callback: Callable[[str, str], None], keys: Optional[Set[str]] = None):
+        """callback(key, value) se invoca en el hilo que escribió; debe ser ligero."""
+        self._subscribers.append((callback, set(keys) if keys else None))
+
+    def unsubscribe(self, callback: Callable[[str, str], None]):
+        self._subscribers = [(cb, k) for cb, k in self._subscribers if cb != callback]
+
+    def _notify(self, changes: Dict[str, str]):
+        for callback, keys in list(self._subscribers):
+            for key, value in changes.items():
+                if keys is not None and key not in keys:
+                    continue
+                try:
+                    callback(key, value)
+                except Exception as e:
+                    print(f"[DB_ERROR] Suscriptor de settings falló ({key}): {e}")
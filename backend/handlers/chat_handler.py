@@ -4,6 +4,10 @@ import re
 import random
 from datetime import datetime
 from typing import List, Dict, Any
+from backend.utils.active_viewers import ActiveViewerTracker
+
+ACTIVE_WINDOW_MIN = 10
+PAYOUT_INTERVAL_MIN = 1
 
 class ChatHandler:
     """
@@ -15,6 +19,10 @@ class ChatHandler:
         self.re_emote_clean = re.compile(r'\[emote:\d+:[^\]]+\]')
         self.re_url = re.compile(r'http\S+|www\.\S+') 
 
+        # Espectadores activos en memoria; se siembra con los vistos antes de arrancar
+        self.viewers = ActiveViewerTracker(window_seconds=ACTIVE_WINDOW_MIN * 60)
+        self.viewers.seed(self.db.get_recent_viewers(ACTIVE_WINDOW_MIN))
+
     # =========================================================================
     # REGIÓN 1: PARSING Y ANÁLISIS DE ENTRADA
     # =========================================================================
@@ -51,21 +59,24 @@ class ChatHandler:
             elif "subscriber" in badges_lower or "founder" in badges_lower:
                 new_role = "subscriber"
 
-        # 2. Guardar el rol en la base de datos
-        self.db.update_user_role(user, new_role)
-        
-        # 3. Lógica de puntos (los bots y los comandos no dan puntos)
-        if new_role == "bot" or msg.startswith("!"):
-            return
-            
-        points = self.db.get_int("points_per_msg", 10)
-        self.db.add_points(user, points)
+        # 2. Lógica de puntos (los bots y los comandos no dan puntos)
+        points = 0
+        # last_seen se actualiza en todo mensaje elegible, aunque points_per_msg sea 0
+        eligible = new_role != "bot" and not msg.startswith("!")
+        if eligible:
+            points = self.db.get_int("points_per_msg", 10)
+            self.viewers.touch(user)
+
+        # 3. Rol, puntos y last_seen van al ledger; se vuelcan a la DB en lote
+        self.db.record_chat_activity(user, new_role, points, touch=eligible)
 
     def distribute_periodic_points(self):
-        """Timer: Reparte puntos a usuarios activos recientemente."""
-        amount = self.db.get_int("points_per_min", 0)
-        if amount > 0:
-            self.db.add_points_to_active_users(amount, minutes=10)
+        """Timer (cada minuto): reparte puntos y minutos vistos solo a los activos de la ventana."""
+        active_users = self.viewers.active()
+        if not active_users:
+            return
+        amount = max(0, self.db.get_int("points_per_min", 0))
+        self.db.credit_active_viewers(active_users, amount, minutes=PAYOUT_INTERVAL_MIN)
 
     # =========================================================================
     # REGIÓN 3: FORMATO Y SALIDA DE TEXTO
@@ -16,6 +16,8 @@ class MusicHandler:
             "pause": "music_cmd_pause",
             "req": "music_cmd_request"
         }
+        self._config = {}
+        self._config_version = -1
 
     # =========================================================================
     # REGIÓN 1: UTILIDADES PÚBLICAS
@@ -26,6 +28,18 @@ class MusicHandler:
             return self.spotify.get_current_track_text() or "Ninguna canción"
         return "(Spotify desconectado)"
 
+    def _get_config(self) -> dict:
+        """Triggers y estados de los comandos; se recalcula solo si cambió algún setting."""
+        if self._config_version != self.db.settings_version:
+            defaults = {"song": "!song", "req": "!sr", "skip": "!skip", "pause": "!pause"}
+            self._config = {
+                "triggers": {k: (self.db.get(self.keys[k]) or d).lower() for k, d in defaults.items()},
+                "active": {k: self.db.get(f"{self.keys[k]}_active") != "0" for k in self.keys},
+                "streamer": (self.db.get("kick_username") or "").lower()
+            }
+            self._config_version = self.db.settings_version
+        return self._config
+
     # =========================================================================
     # REGIÓN 2: PROCESAMIENTO DE COMANDOS
     # =========================================================================
@@ -38,16 +52,16 @@ class MusicHandler:
         # Si Spotify no está activo, abortamos inmediatamente
         if not self.spotify.is_active:
             return False
-        # Helpers para lectura limpia de configuración
-        def is_active(k): return self.db.get(f"{self.keys[k]}_active") != "0"
-        def get_trigger(k, default): return (self.db.get(self.keys[k]) or default).lower()
+        # Configuración cacheada por versión del store de settings
+        config = self._get_config()
+        def is_active(k): return config["active"][k]
 
-        cmd_song = get_trigger("song", "!song")
-        cmd_req = get_trigger("req", "!sr")
-        cmd_skip = get_trigger("skip", "!skip")
-        cmd_pause = get_trigger("pause", "!pause")
+        cmd_song = config["triggers"]["song"]
+        cmd_req = config["triggers"]["req"]
+        cmd_skip = config["triggers"]["skip"]
+        cmd_pause = config["triggers"]["pause"]
         
-        streamer_name = (self.db.get("kick_username") or "").lower()
+        streamer_name = config["streamer"]
 
         # CASO A: Mostrar canción actual (!song)
         if is_active("song") and msg_lower == cmd_song:
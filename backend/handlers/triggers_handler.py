@@ -15,7 +15,7 @@ class TriggerHandler:
     def __init__(self, db_handler, overlay_worker, shared_scraper=None):
         self.db = db_handler
         self.server = overlay_worker
-        self.rewards_api = RewardsService(shared_scraper) 
+        self.rewards_api = RewardsService(db_handler, shared_scraper) 
 
     def handle_redemption(self, user: str, reward_title: str, user_input: str, log_callback: Callable) -> bool:
         """
@@ -42,6 +42,7 @@ class TriggerHandler:
             pos_y = trigger_data['pos_y'] or 0
             file_path = trigger_data['path'] or ""
             random_pos = bool(trigger_data['random_pos'])
+            cost = trigger_data['cost'] or 0
             
         except Exception as e:
             log_callback(LoggerText.error(f"Error de base de datos leyendo el trigger: {e}"))
@@ -50,11 +51,18 @@ class TriggerHandler:
         if not is_active:
             return False
 
-        if not file_path or not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path) if file_path else None
+        except OSError:
+            st = None
+        if st is None:
             log_callback(LoggerText.error(f"Archivo 404 o no configurado correctamente: {filename}"))
             return False
         
-        file_url = f"http://127.0.0.1:8081/media/{quote(filename)}"
+        # URL con hash del manifiesto (inmutable, ya precargada por el overlay); si aún no se
+        # calculó, la versión por mtime/tamaño también cambia al reemplazar el archivo
+        file_url = self.server.media_url(filename) or \
+            f"http://127.0.0.1:8081/media/{quote(filename)}?v={st.st_mtime_ns:x}-{st.st_size:x}"
 
         payload = {
             "url": file_url,
@@ -70,7 +78,8 @@ class TriggerHandler:
             "input_text": user_input
         }     
 
-        self.server.send_event("play_media", payload)
+        # El overlay los reproduce de a uno por tipo; los canjes caros pasan delante
+        self.server.play_media(payload, cost=cost)
         
         return True
 
@@ -105,8 +114,7 @@ class TriggerHandler:
 
     def delete_trigger(self, title: str, delete_in_kick: bool = True) -> bool:
         db_key = title.strip().lower()
-        self.db.conn_handler.execute_query("DELETE FROM triggers WHERE command=?", (db_key,))
-        self.db.conn_handler.execute_query("DELETE FROM triggers WHERE command=?", (f"!{db_key}",))
+        self.db.delete_trigger(db_key)
 
         if delete_in_kick:
             self.rewards_api.delete_reward_by_title(title)
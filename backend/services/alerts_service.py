@@ -61,9 +61,13 @@ class AlertsService:
         if not config.get("is_active"):
             return None
             
-        # Formatear textos
+        # Formatear textos ({user} y variables del evento como {viewers}, {count} o {months})
         final_msg = config["message_template"].replace("{user}", username)
         final_title = config["title_template"].replace("{user}", username)
+        for key, value in extra_data.items():
+            if isinstance(value, (str, int, float)):
+                final_msg = final_msg.replace(f"{{{key}}}", str(value))
+                final_title = final_title.replace(f"{{{key}}}", str(value))
         
         # Enviar al worker
         if self.alert_worker:
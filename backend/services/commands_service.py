@@ -19,8 +19,8 @@ class CommandsService:
         """Obtiene la lista completa de comandos para la frontend."""
         return self.db.get_all_commands()
 
-    def add_or_update_command(self, trigger: str, response: str, cooldown: int = 5, aliases: str = "", cost: int = 0) -> bool:
-        """Crea o actualiza un comando asegurando el formato correcto."""
+    @staticmethod
+    def _clean(trigger: str, aliases: str) -> Tuple[str, str]:
         clean_trig = trigger.strip().lower()
         if not clean_trig.startswith("!"):
             clean_trig = "!" + clean_trig          
@@ -30,8 +30,17 @@ class CommandsService:
             if a_strip:
                 if not a_strip.startswith("!"): a_strip = "!" + a_strip
                 clean_aliases.append(a_strip)
-                
-        return self.db.add_command(clean_trig, response, cooldown, ",".join(clean_aliases), cost)
+        return clean_trig, ",".join(clean_aliases)
+
+    def add_or_update_command(self, trigger: str, response: str, cooldown: int = 5, aliases: str = "", cost: int = 0) -> bool:
+        """Crea o actualiza un comando asegurando el formato correcto."""
+        clean_trig, clean_aliases = self._clean(trigger, aliases)
+        return self.db.add_command(clean_trig, response, cooldown, clean_aliases, cost)
+
+    def find_conflicts(self, trigger: str, aliases: str = "", original: str = None) -> List[Tuple[str, str]]:
+        """Alias o trigger que ya pertenecen a otro comando: [(nombre, comando dueño)]."""
+        clean_trig, clean_aliases = self._clean(trigger, aliases)
+        return self.db.find_command_conflicts(clean_trig, clean_aliases, original or None)
 
     def delete_command(self, trigger: str) -> bool:
         """Elimina un comando de la base de datos."""
@@ -0,0 +1,95 @@
+# backend/services/kick_events.py
+
+import base64
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:
+    serialization = None
+
+# Eventos de Kick por webhook (requiere el scope events:subscribe)
+EVENT_REDEMPTION = "channel.reward.redemption.updated"
+URL_PUBLIC_KEY = "https://api.kick.com/public/v1/public-key"
+
+# Se rechazan entregas con la marca de tiempo fuera de esta ventana (reenvíos capturados)
+MAX_EVENT_AGE_S = 300
+SEEN_MESSAGES_MAX = 1024
+
+class KickEventVerifier:
+    """
+    Verifica los webhooks firmados de Kick: firma RSA (PKCS#1 v1.5 + SHA-256, en base64)
+    sobre "<message_id>.<timestamp>.<body>", antigüedad del mensaje y reentregas del mismo id.
+    La clave pública se toma de Kick o, para pruebas locales, de kick_webhook_public_key.
+    Sin el paquete 'cryptography' no se puede verificar y todos los eventos se rechazan.
+    """
+    def __init__(self, public_key_pem: Optional[str] = None):
+        self._key = None
+        self._seen: OrderedDict = OrderedDict()
+        if public_key_pem: self.load_key(public_key_pem)
+
+    @property
+    def available(self) -> bool:
+        return serialization is not None
+
+    @property
+    def has_key(self) -> bool:
+        return self._key is not None
+
+    def load_key(self, public_key_pem: str) -> bool:
+        if not self.available or not public_key_pem: return False
+        try:
+            self._key = serialization.load_pem_public_key(public_key_pem.strip().encode())
+            return True
+        except ValueError as e:
+            print(f"[EVENTS_ERROR] Clave pública inválida: {e}")
+            return False
+
+    def verify(self, headers, body: bytes) -> Optional[str]:
+        """Devuelve None si el evento es válido y nuevo, o el motivo del rechazo."""
+        if not self.available: return "cryptography no instalado"
+        if self._key is None: return "sin clave pública"
+
+        message_id = headers.get("Kick-Event-Message-Id", "")
+        timestamp = headers.get("Kick-Event-Message-Timestamp", "")
+        signature = headers.get("Kick-Event-Signature", "")
+        if not (message_id and timestamp and signature): return "faltan cabeceras"
+
+        try:
+            self._key.verify(base64.b64decode(signature), f"{message_id}.{timestamp}.".encode() + body,
+                             padding.PKCS1v15(), hashes.SHA256())
+        except (InvalidSignature, ValueError):
+            return "firma inválida"
+
+        sent_at = parse_timestamp(timestamp)
+        if sent_at is None or abs(time.time() - sent_at) > MAX_EVENT_AGE_S: return "mensaje caducado"
+
+        if message_id in self._seen: return "duplicado"
+        self._seen[message_id] = True
+        if len(self._seen) > SEEN_MESSAGES_MAX: self._seen.popitem(last=False)
+        return None
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """RFC 3339 de Kick ('2025-01-01T12:00:00.123Z') a epoch; None si no se entiende."""
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def parse_redemption(data: Dict) -> Optional[Dict]:
+    """Normaliza un channel.reward.redemption.updated al formato que usa RedemptionWorker."""
+    red_id = data.get("id")
+    if not red_id: return None
+    redeemer = data.get("redeemer") or {}
+    return {
+        "id": str(red_id),
+        "status": (data.get("status") or "pending").lower(),
+        "username": redeemer.get("username") or redeemer.get("slug") or "Anonimo",
+        "title": (data.get("reward") or {}).get("title", ""),
+        "user_input": data.get("user_input") or "",
+    }
@@ -0,0 +1,123 @@
+# backend/services/media_manifest.py
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+HASH_CHUNK = 1024 * 1024
+DIGEST_LEN = 16
+
+class MediaManifest:
+    """
+    Manifiesto de la multimedia de los triggers activos, direccionada por contenido.
+    Cada archivo se identifica por su sha256 (se recalcula solo si cambian mtime o tamaño),
+    así que la URL /media/h/<hash> es inmutable y los triggers que comparten archivo
+    comparten una sola entrada. build() lee disco: llamarlo fuera del loop del servidor.
+    """
+    def __init__(self, db_handler):
+        self.db = db_handler
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, tuple] = {}       # ruta -> (mtime_ns, tamaño, hash)
+        self._urls: Dict[str, str] = {}           # filename -> URL con hash
+        self._files: Dict[str, tuple] = {}        # hash -> (ruta, mtime_ns, tamaño)
+        self._manifest = None
+        self._generation = 0
+        self.version = 0
+
+    # =========================================================================
+    # REGIÓN 1: CONSTRUCCIÓN
+    # =========================================================================
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._manifest = None
+
+    def get(self) -> dict:
+        """Devuelve el manifiesto vigente, reconstruyéndolo si los triggers cambiaron."""
+        with self._lock:
+            manifest = self._manifest
+        return manifest if manifest is not None else self.build()
+
+    def build(self) -> dict:
+        with self._lock:
+            generation = self._generation
+        entries, urls, files = {}, {}, {}
+        for filename, config in self.db.get_all_triggers().items():
+            path = config.get("path") or ""
+            if not config.get("active") or not path:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            digest = self._digest(path, st)
+            if digest is None:
+                continue
+
+            entry = entries.get(digest)
+            if entry is None:
+                ext = os.path.splitext(filename)[1].lower()
+                entry = entries[digest] = {
+                    "hash": digest, "url": f"/media/h/{digest}{ext}", "type": config.get("type") or "audio",
+                    "size": st.st_size, "duration": int(float(config.get("dur") or 0) * 1000), "triggers": []
+                }
+                files[digest] = (str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+            entry["triggers"].append(config.get("cmd") or filename)
+            urls[filename] = entry["url"]
+
+        with self._lock:
+            self.version += 1
+            self._urls, self._files = urls, files
+            manifest = {"version": self.version, "media": list(entries.values())}
+            # Si los triggers cambiaron mientras leíamos, el siguiente get() vuelve a construir
+            if generation == self._generation:
+                self._manifest = manifest
+            return manifest
+
+    def _digest(self, path: str, st) -> Optional[str]:
+        cached = self._hashes.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        try:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                while chunk := f.read(HASH_CHUNK):
+                    h.update(chunk)
+        except OSError as e:
+            print(f"[MEDIA_ERROR] No se pudo leer {path}: {e}")
+            return None
+        digest = h.hexdigest()[:DIGEST_LEN]
+        self._hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    # =========================================================================
+    # REGIÓN 2: CONSULTAS (SIN DISCO, SOLO LO YA CALCULADO)
+    # =========================================================================
+    @property
+    def needs_rebuild(self) -> bool:
+        return self._manifest is None
+
+    def url_for(self, filename: str) -> Optional[str]:
+        """URL con hash de un trigger activo; None si aún no está en el manifiesto o el archivo cambió."""
+        with self._lock:
+            url = self._urls.get(filename)
+        if url is None: return None
+        return url if self.path_for(url.rsplit("/", 1)[-1].split(".", 1)[0]) else None
+
+    def path_for(self, digest: str) -> Optional[Path]:
+        """Ruta del archivo con ese hash, solo si no cambió en disco desde que se calculó."""
+        with self._lock:
+            info = self._files.get(digest)
+        if info is None: return None
+        path, mtime_ns, size = info
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+            # Se reemplazó en disco sin tocar el trigger: el hash ya no vale
+            self.invalidate()
+            return None
+        return Path(path)
@@ -10,6 +10,12 @@ class PointsService:
     def get_users_data(self) -> List[Any]:
         return self.db.get_all_points()
 
+    def get_users_page(self, search: str, filter_mode: str, order_by: str, descending: bool, limit: int, offset: int) -> List[Any]:
+        return self.db.get_users_page(search, filter_mode, order_by, descending, limit, offset)
+
+    def count_users(self, search: str, filter_mode: str) -> int:
+        return self.db.count_users(search, filter_mode)
+
     def toggle_pause(self, username: str, is_paused: bool) -> bool:
         return self.db.set_user_paused(username, is_paused)
 
@@ -4,19 +4,20 @@ import json
 import os
 import random
 import time
+from typing import Optional
 import cloudscraper
 from backend.utils.paths import get_config_path
-from backend.core.db_controller import DBHandler
 
 # CONSTANTES
 URL_REWARDS = "https://api.kick.com/public/v1/channels/rewards"
 URL_REDEMPTIONS = "https://api.kick.com/public/v1/channels/rewards/redemptions"
 URL_TOKEN = "https://id.kick.com/oauth/token"
+URL_EVENT_SUBSCRIPTIONS = "https://api.kick.com/public/v1/events/subscriptions"
 
 class RewardsService:
-    def __init__(self, shared_scraper=None):
+    def __init__(self, db_handler, shared_scraper=None):
         self.scraper = shared_scraper if shared_scraper else cloudscraper.create_scraper()
-        self.db = DBHandler()
+        self.db = db_handler
         
         # [OPTIMIZACIÓN]: Caché en memoria para evitar leer el disco duro en cada petición.
         self._access_token = None
@@ -151,16 +152,38 @@ class RewardsService:
         if target_id:
             self._make_request("DELETE", f"{URL_REWARDS}/{target_id}")
 
-    def get_redemptions(self, status: str) -> list:
+    def get_redemptions(self, status: str) -> Optional[list]:
+        """Grupos de canjes por recompensa; None si la consulta falló (distinto de 'no hay canjes')."""
         url = f"{URL_REDEMPTIONS}?status={status}"
         resp = self._make_request("GET", url)
-        if not resp: return []
+        if not resp: return None
         if resp.status_code == 200: return resp.json().get("data", [])
         elif resp.status_code == 429: time.sleep(2)
-        return []
+        return None
+
+    def subscribe_events(self, events: list) -> bool:
+        """Suscribe el webhook de la app a los eventos que aún no tenga (scope events:subscribe)."""
+        resp = self._make_request("GET", URL_EVENT_SUBSCRIPTIONS)
+        if not resp or resp.status_code != 200: return False
+        current = {sub.get("event") for sub in resp.json().get("data", [])}
+        missing = [name for name in events if name not in current]
+        if not missing: return True
+
+        payload = {"events": [{"name": name, "version": 1} for name in missing], "method": "webhook"}
+        resp = self._make_request("POST", URL_EVENT_SUBSCRIPTIONS, json_data=payload)
+        if not resp or resp.status_code not in [200, 201]: return False
+        return not any(item.get("error") for item in resp.json().get("data", []))
 
     def accept_redemptions(self, red_ids: list):
-        if not red_ids: return
-        url = f"{URL_REDEMPTIONS}/accept"
+        return self._redemption_action("accept", red_ids)
+
+    def reject_redemptions(self, red_ids: list):
+        """Rechaza los canjes; Kick devuelve los puntos al espectador."""
+        return self._redemption_action("reject", red_ids)
+
+    def _redemption_action(self, action: str, red_ids: list):
+        """Devuelve la respuesta HTTP (o None si no hubo conexión) para que quien llama decida si reintentar."""
+        if not red_ids: return None
+        url = f"{URL_REDEMPTIONS}/{action}"
         payload = {"ids": red_ids}
-        self._make_request("POST", url, json_data=payload)
\ No newline at end of file
+        return self._make_request("POST", url, json_data=payload)
\ No newline at end of file
@@ -86,8 +86,8 @@ class SettingsService:
         try:
             # 🔴 EL FIX CLAVE: Cerramos la conexión activa de SQLite para liberar el archivo.
             # Esto evita el PermissionError en Windows.
-            if hasattr(self.db, 'conn_handler') and hasattr(self.db.conn_handler, 'conn'):
-                self.db.conn_handler.conn.close()
+            if hasattr(self.db, 'conn_handler'):
+                self.db.conn_handler.close()
             
             # Reemplazamos el archivo físico
             shutil.copy2(backup_file_path, dest_path)
@@ -20,7 +20,7 @@ class TriggerService:
         self.db = db_handler
         self.server = server_worker
         self.scraper = shared_scraper if shared_scraper else cloudscraper.create_scraper()
-        self.rewards_api = RewardsService(self.scraper)      
+        self.rewards_api = RewardsService(db_handler, self.scraper)      
         self.VIDEO_EXTS = {'.mp4', '.webm'}
         self.AUDIO_EXTS = {'.mp3', '.wav', '.ogg'}
 
@@ -307,7 +307,13 @@ class TriggerService:
             return 0
         
     def preview_media(self, filename: str, ftype: str, config: Dict):
-        file_url = f"http://127.0.0.1:8081/media/{quote(filename)}"
+        file_url = self.server.media_url(filename)
+        if not file_url:
+            try:
+                st = os.stat(config.get("path") or "")
+                file_url = f"http://127.0.0.1:8081/media/{quote(filename)}?v={st.st_mtime_ns:x}-{st.st_size:x}"
+            except OSError:
+                file_url = f"http://127.0.0.1:8081/media/{quote(filename)}"
         try:
             duration = int(float(config.get("dur", 0) or 0))
             scale = float(config.get("scale", 1.0) or 1.0)
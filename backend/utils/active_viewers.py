@@ -0,0 +1,51 @@
+# backend/utils/active_viewers.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+class ActiveViewerTracker:
+    """
+    Conjunto en memoria de espectadores activos con ventana deslizante.
+    Las entradas se mantienen ordenadas por última actividad, así que expirar
+    cuesta O(expirados) y listar cuesta O(activos), nunca O(usuarios históricos).
+    """
+    def __init__(self, window_seconds: float = 600, clock=time.monotonic):
+        self.window = window_seconds
+        self._clock = clock
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, username: str):
+        user = username.lower()
+        with self._lock:
+            self._seen[user] = self._clock()
+            self._seen.move_to_end(user)
+
+    def seed(self, users_with_age: Iterable[Tuple[str, float]]):
+        """Carga usuarios vistos antes del arranque: [(username, segundos_desde_visto)]."""
+        now = self._clock()
+        with self._lock:
+            # Del más reciente al más antiguo, empujando al frente: el más viejo queda primero
+            for user, age in sorted(users_with_age, key=lambda x: x[1]):
+                if age < self.window and user.lower() not in self._seen:
+                    self._seen[user.lower()] = now - age
+                    self._seen.move_to_end(user.lower(), last=False)
+
+    def active(self) -> List[str]:
+        with self._lock:
+            self._expire()
+            return list(self._seen)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._seen)
+
+    def _expire(self):
+        limit = self._clock() - self.window
+        while self._seen:
+            user, ts = next(iter(self._seen.items()))
+            if ts >= limit: break
+            self._seen.popitem(last=False)
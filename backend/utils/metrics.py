@@ -0,0 +1,213 @@
+# backend/utils/metrics.py
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Buckets por defecto (segundos): de 0.5 ms a 10 s, útiles para latencias de red, DB y audio
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# =========================================================================
+# REGIÓN 1: TIPOS DE MÉTRICA
+# =========================================================================
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._fn: Optional[Callable] = None
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def set_function(self, fn: Optional[Callable]):
+        """
+        Valor calculado al leer (profundidad de una cola, clientes conectados...).
+        fn() devuelve un número o, con etiquetas, un dict {(valor_etiqueta, ...): número}.
+        """
+        self._fn = fn
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception as e:
+                print(f"[METRICS_ERROR] {self.name}: {e}")
+                return {}
+            return value if isinstance(value, dict) else {(): value}
+        with self._lock:
+            return dict(self._values)
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # etiqueta -> [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Context manager que observa la duración del bloque."""
+        return _Timer(self, labels)
+
+    def series(self) -> Dict[Tuple[str, ...], Tuple[list, float, int]]:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+
+    def quantile(self, q: float, **labels) -> float:
+        """Estimación por buckets (cota superior del bucket donde cae el percentil)."""
+        series = self.series().get(self._key(labels))
+        if not series or not series[2]: return 0.0
+        counts, _, total = series
+        target, running = q * total, 0
+        for i, count in enumerate(counts):
+            running += count
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+# =========================================================================
+# REGIÓN 2: REGISTRO Y EXPORTACIÓN
+# =========================================================================
+class MetricsRegistry:
+    """
+    Registro en proceso de contadores, gauges e histogramas.
+    Los módulos declaran sus métricas al importarse (get-or-create por nombre) y
+    el servidor del overlay las expone en /metrics (texto Prometheus) y /health (JSON).
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    @staticmethod
+    def _label_str(names, values, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+        if extra: parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            if isinstance(metric, Histogram):
+                for key, (counts, total_sum, total) in sorted(metric.series().items()):
+                    running = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                        running += count
+                        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                        lines.append(f"{metric.name}_bucket{self._label_str(metric.labels, key, le)} {running}")
+                    lines.append(f"{metric.name}_sum{self._label_str(metric.labels, key)} {total_sum}")
+                    lines.append(f"{metric.name}_count{self._label_str(metric.labels, key)} {total}")
+            else:
+                for key, value in sorted(metric.values().items()):
+                    lines.append(f"{metric.name}{self._label_str(metric.labels, key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Vista JSON: número por métrica (o por etiqueta) y, en histogramas, count/avg/p50/p99.
+        Los histogramas *_seconds se publican en ms; los demás (tamaños de lote...) tal cual.
+        """
+        data = {}
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                scale, suffix = (1000, "_ms") if metric.name.endswith("_seconds") else (1, "")
+                empty = {"count": 0, f"avg{suffix}": 0.0, f"p50{suffix}": 0.0, f"p99{suffix}": 0.0}
+                series = {}
+                for key, (_, total_sum, total) in metric.series().items():
+                    labels = dict(zip(metric.labels, key))
+                    series[",".join(key) or "all"] = {
+                        "count": total, f"avg{suffix}": round(total_sum / total * scale, 3) if total else 0.0,
+                        f"p50{suffix}": _finite(metric.quantile(0.50, **labels), scale),
+                        f"p99{suffix}": _finite(metric.quantile(0.99, **labels), scale),
+                    }
+                value = series.get("all", empty) if not metric.labels else series
+            else:
+                values = metric.values()
+                value = values.get((), 0) if not metric.labels else {",".join(k): v for k, v in values.items()}
+            data[metric.name] = value
+        return data
+
+def _finite(value: float, scale: float) -> Optional[float]:
+    """El bucket +Inf no tiene cota: en JSON se publica como null."""
+    return None if value == float("inf") else value * scale
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Registro global del proceso
+REGISTRY = MetricsRegistry()
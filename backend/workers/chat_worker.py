@@ -0,0 +1,118 @@
+# backend/workers/chat_worker.py
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from backend.utils.logger_text import LoggerText
+from backend.utils.metrics import REGISTRY
+
+CHAT_WORKER_QUEUE = REGISTRY.gauge("kickmonitor_chat_worker_queue_depth", "Mensajes en la cola del pipeline de chat")
+CHAT_WORKER_DROPPED = REGISTRY.counter("kickmonitor_chat_worker_dropped_total", "Mensajes descartados por la cola llena")
+CHAT_WORKER_LATENCY = REGISTRY.histogram("kickmonitor_chat_worker_latency_seconds", "Encolado → procesado por mensaje")
+
+class ChatProcessingWorker(QThread):
+    """
+    Hilo dedicado al pipeline de chat (antibot, puntos, comandos, TTS, overlay).
+    El bot encola lotes desde su propio hilo (conexión directa) y process_fn recibe
+    todo lo disponible como una lista; la GUI solo recibe los datos ya listos para pintar.
+    La cola es acotada: en una ráfaga se descartan los mensajes más antiguos.
+    """
+    error_signal = pyqtSignal(str)
+
+    LATENCY_WINDOW = 512
+
+    def __init__(self, process_fn: Callable[[List[tuple]], None], max_queue: int = 2000, batch_max: int = 200):
+        super().__init__()
+        self.process_fn = process_fn
+        self.batch_max = batch_max
+        self.is_running = True
+        self._queue = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+
+        # Estadísticas (solo las escribe este hilo, salvo 'dropped' y 'max_depth')
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._process_times = deque(maxlen=self.LATENCY_WINDOW)
+        CHAT_WORKER_QUEUE.set_function(self.queue_depth)
+        CHAT_WORKER_DROPPED.set_function(lambda: self.dropped)
+
+    # ==========================================
+    # ENTRADA (CUALQUIER HILO)
+    # ==========================================
+    def submit(self, user: str, content: str, badges: list, timestamp: str, channel: str = ""):
+        """Encola un mensaje; seguro para llamarse desde el hilo del bot."""
+        self.submit_batch([(user, content, badges, timestamp, channel)])
+
+    def submit_batch(self, messages: List[tuple]):
+        """Encola [(user, content, badges, timestamp, channel), ...] con una sola toma del candado."""
+        now = time.perf_counter()
+        with self._cond:
+            overflow = len(self._queue) + len(messages) - self._queue.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self._queue.extend((now, *msg) for msg in messages)
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify()
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stop(self):
+        self.is_running = False
+        with self._cond:
+            self._cond.notify_all()
+        self.quit()
+        self.wait(1500)
+
+    # ==========================================
+    # LOOP PRINCIPAL
+    # ==========================================
+    def run(self):
+        while self.is_running:
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(0.5)
+                if not self._queue:
+                    continue
+                items = [self._queue.popleft() for _ in range(min(self.batch_max, len(self._queue)))]
+
+            started = time.perf_counter()
+            try:
+                self.process_fn([item[1:] for item in items])
+            except Exception as e:
+                self.error_signal.emit(LoggerText.error(f"Chat Worker Error: {e}"))
+            finished = time.perf_counter()
+
+            self.processed += len(items)
+            self._latencies.extend(finished - item[0] for item in items)
+            for item in items:
+                CHAT_WORKER_LATENCY.observe(finished - item[0])
+            self._process_times.append((finished - started) / len(items))
+
+    # ==========================================
+    # ESTADÍSTICAS
+    # ==========================================
+    @staticmethod
+    def _percentile_ms(samples, pct: float) -> float:
+        if not samples: return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+    def stats(self) -> Dict[str, float]:
+        """Profundidad de cola y latencia por mensaje (encolado → procesado) de la ventana reciente."""
+        latencies, process_times = list(self._latencies), list(self._process_times)
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "latency_p50_ms": self._percentile_ms(latencies, 0.50),
+            "latency_p99_ms": self._percentile_ms(latencies, 0.99),
+            "process_p50_ms": self._percentile_ms(process_times, 0.50),
+            "process_p99_ms": self._percentile_ms(process_times, 0.99),
+        }
@@ -7,6 +7,8 @@ from PyQt6.QtCore import QThread, pyqtSignal
 
 KICK_API_BASE = "https://kick.com/api/v1/channels"
 DEFAULT_MONITOR_INTERVAL = 10  
+# Con los eventos push de Pusher activos, el polling solo reconcilia follows perdidos
+RECONCILE_MONITOR_INTERVAL = 120
 
 class KickApiWorker(QThread):
     """Worker efímero. Realiza una única consulta HTTP para validar."""    
@@ -38,7 +40,11 @@ class KickApiWorker(QThread):
         self.finished.emit(True, "Encontrado", slug, chat_id, real_username, followers, profile_pic)
 
 class FollowMonitorWorker(QThread):
-    """Worker persistente que detecta cambios en el contador de seguidores.""" 
+    """
+    Worker persistente que detecta cambios en el contador de seguidores.
+    Con eventos push activos actúa como reconciliación lenta: sync_count() evita repetir
+    alertas que ya llegaron por el socket.
+    """ 
     new_follower = pyqtSignal(int, int, str)
     error_signal = pyqtSignal(str)
 
@@ -64,6 +70,11 @@ class FollowMonitorWorker(QThread):
         self.quit()
         self.wait(1000)
 
+    def sync_count(self, count: int):
+        """Alinea el contador con un follow ya notificado por push."""
+        if count > self.last_count:
+            self.last_count = count
+
     def _check_followers(self):
         resp = self.scraper.get(f"{KICK_API_BASE}/{self.username}", timeout=10)
         if resp.status_code != 200: return
@@ -0,0 +1,166 @@
+# backend/workers/playback_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.utils.metrics import REGISTRY
+
+# Reproducciones simultáneas por tipo de medio (configurable con overlay_playback_limits)
+DEFAULT_LIMITS = {"video": 1, "audio": 1, "image": 1}
+# Plazos para no atascar la cola si el overlay no responde
+START_TIMEOUT_S = 10.0      # sin 'started' en este tiempo, el overlay no pudo cargar el archivo
+END_GRACE_S = 5.0           # margen sobre la duración configurada antes de liberar el hueco
+MAX_PLAYBACK_S = 120.0      # tope para vídeos/audios sin duración configurada
+IMAGE_DEFAULT_S = 5.0       # triggers_overlay.html muestra 5 s las imágenes sin duración
+
+PLAYBACK_QUEUE = REGISTRY.gauge("kickmonitor_trigger_queue_depth", "Triggers esperando turno", labels=("type",))
+PLAYBACK_PLAYING = REGISTRY.gauge("kickmonitor_trigger_playing", "Triggers reproduciéndose en el overlay", labels=("type",))
+PLAYBACK_WAIT = REGISTRY.histogram("kickmonitor_trigger_queue_wait_seconds", "Canje → envío al overlay", labels=("type",),
+                                   buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+PLAYBACK_START = REGISTRY.histogram("kickmonitor_trigger_start_seconds", "Envío → ack 'started' del overlay", labels=("type",))
+PLAYBACK_TIME = REGISTRY.histogram("kickmonitor_trigger_play_seconds", "Ack 'started' → fin de la reproducción", labels=("type",),
+                                   buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+PLAYBACK_RESULTS = REGISTRY.counter("kickmonitor_trigger_playbacks_total", "Reproducciones terminadas por resultado",
+                                    labels=("type", "result"))
+
+class PlaybackItem:
+    __slots__ = ("id", "payload", "type", "priority", "enqueued_at", "dispatched_at", "started_at", "timer")
+
+    def __init__(self, item_id: str, payload: dict, priority: int):
+        self.id = item_id
+        self.payload = payload
+        self.type = payload.get("type") or "audio"
+        self.priority = priority
+        self.enqueued_at = time.perf_counter()
+        self.dispatched_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def expected_seconds(self) -> float:
+        duration = float(self.payload.get("duration") or 0) / 1000
+        if duration > 0: return duration
+        return IMAGE_DEFAULT_S if self.type == "image" else 0.0
+
+class PlaybackScheduler:
+    """
+    Cola de reproducción de triggers; vive en el loop del servidor del overlay.
+    FIFO por tipo de medio con un límite de reproducciones simultáneas por tipo, y los canjes
+    caros (costo >= priority_cost) pasan delante de los normales. Cada item sale con un id y
+    el overlay responde 'started', 'ended' o 'error', así el siguiente arranca en cuanto termina
+    el anterior. Si nadie responde, los plazos liberan el hueco y la cola nunca se atasca.
+
+    send(frame) reparte el frame y devuelve (overlays con ack, overlays totales).
+    """
+    def __init__(self, send: Callable[[dict], Tuple[int, int]], limits: Dict[str, int] = None, priority_cost: int = 0):
+        self.send = send
+        self.limits = dict(DEFAULT_LIMITS) | (limits or {})
+        self.priority_cost = priority_cost
+        self._pending: Dict[str, list] = {media_type: [] for media_type in self.limits}
+        self._playing: Dict[str, PlaybackItem] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self.stats = {"queued": 0, "ended": 0, "errors": 0, "timeouts": 0, "unacked": 0, "skipped": 0}
+
+        PLAYBACK_QUEUE.set_function(lambda: {(t,): len(q) for t, q in self._pending.items()})
+        PLAYBACK_PLAYING.set_function(lambda: {(t,): self._playing_count(t) for t in self._pending})
+
+    # =========================================================================
+    # REGIÓN 1: ENTRADA (SOLO DESDE EL LOOP DEL SERVIDOR)
+    # =========================================================================
+    def enqueue(self, payload: dict, cost: int = 0) -> str:
+        priority = 1 if self.priority_cost > 0 and cost >= self.priority_cost else 0
+        item = PlaybackItem(str(next(self._ids)), payload, priority)
+        heapq.heappush(self._pending.setdefault(item.type, []), (-priority, next(self._seq), item))
+        self.stats["queued"] += 1
+        self._pump(item.type)
+        return item.id
+
+    def ack(self, item_id: str, status: str):
+        """Respuesta del overlay. Los acks repetidos (varias fuentes de OBS) o tardíos se ignoran."""
+        item = self._playing.get(str(item_id))
+        if item is None: return
+        if status == "started":
+            if item.started_at is not None: return
+            item.started_at = time.perf_counter()
+            PLAYBACK_START.observe(item.started_at - item.dispatched_at, type=item.type)
+            expected = item.expected_seconds()
+            self._arm(item, expected + END_GRACE_S if expected else MAX_PLAYBACK_S, "timeout")
+        elif status == "ended":
+            self._finish(item, "ended")
+        elif status == "error" and item.started_at is None:
+            # Si otra fuente ya lo está reproduciendo, el error de una sola no libera el hueco
+            self._finish(item, "error")
+
+    def set_limits(self, limits: Dict[str, int]):
+        self.limits = dict(DEFAULT_LIMITS) | limits
+        for media_type in self.limits:
+            self._pending.setdefault(media_type, [])
+            self._pump(media_type)
+
+    def clear(self):
+        """Descarta lo pendiente (lo que ya suena termina normalmente)."""
+        for queue in self._pending.values():
+            self.stats["skipped"] += len(queue)
+            queue.clear()
+
+    # =========================================================================
+    # REGIÓN 2: DESPACHO Y PLAZOS
+    # =========================================================================
+    def _playing_count(self, media_type: str) -> int:
+        return sum(1 for item in self._playing.values() if item.type == media_type)
+
+    def _pump(self, media_type: str):
+        queue = self._pending.get(media_type)
+        limit = max(1, self.limits.get(media_type, 1))
+        while queue and self._playing_count(media_type) < limit:
+            self._dispatch(heapq.heappop(queue)[2])
+
+    def _dispatch(self, item: PlaybackItem):
+        item.dispatched_at = time.perf_counter()
+        PLAYBACK_WAIT.observe(item.dispatched_at - item.enqueued_at, type=item.type)
+        self._playing[item.id] = item
+        acking, total = self.send({"action": "play_media", "id": item.id} | item.payload)
+        if not total:
+            # Sin overlay conectado: como antes, el canje se pierde y no bloquea la cola
+            self._finish(item, "skipped")
+        elif not acking:
+            # Solo overlays antiguos (sin acks): ocupamos el hueco lo que dura el medio
+            self._arm(item, item.expected_seconds() or START_TIMEOUT_S, "unacked")
+        else:
+            self._arm(item, START_TIMEOUT_S, "timeout")
+
+    def _arm(self, item: PlaybackItem, delay: float, result: str):
+        if item.timer: item.timer.cancel()
+        item.timer = asyncio.get_running_loop().call_later(delay, self._finish, item, result)
+
+    def _finish(self, item: PlaybackItem, result: str):
+        if self._playing.pop(item.id, None) is None: return
+        if item.timer: item.timer.cancel()
+        if item.started_at is not None:
+            PLAYBACK_TIME.observe(time.perf_counter() - item.started_at, type=item.type)
+        PLAYBACK_RESULTS.inc(type=item.type, result=result)
+        key = {"error": "errors", "timeout": "timeouts"}.get(result, result)
+        if key in self.stats: self.stats[key] += 1
+        self._pump(item.type)
+
+    # =========================================================================
+    # REGIÓN 3: ESTADÍSTICAS
+    # =========================================================================
+    def get_stats(self) -> dict:
+        return dict(self.stats) | {
+            "pending": {t: len(q) for t, q in self._pending.items()},
+            "playing": {t: self._playing_count(t) for t in self._pending},
+            "limits": dict(self.limits), "priority_cost": self.priority_cost,
+        }
+
+def parse_limits(value: str) -> Dict[str, int]:
+    """'video=1,audio=2' -> {'video': 1, 'audio': 2}; ignora entradas mal formadas."""
+    limits = {}
+    for part in (value or "").split(","):
+        media_type, _, limit = part.partition("=")
+        if limit.strip().isdigit():
+            limits[media_type.strip().lower()] = max(1, int(limit))
+    return limits
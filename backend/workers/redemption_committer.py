@@ -0,0 +1,215 @@
+# backend/workers/redemption_committer.py
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from backend.utils.logger_text import LoggerText
+from backend.utils.metrics import REGISTRY
+
+# Kick acepta hasta 25 IDs por llamada a /redemptions/accept|reject
+BATCH_MAX = 25
+# Espera tras el primer ID para juntar los de varios ciclos de polling en una sola llamada
+BATCH_LINGER_S = 0.3
+# Reintentos ante 429/5xx o red caída: backoff exponencial con jitter
+RETRY_BASE_S = 1.0
+RETRY_MAX_S = 30.0
+MAX_ATTEMPTS = 5
+# Tras agotar los reintentos, el polling no vuelve a encolar ese ID hasta pasado este tiempo
+RESUBMIT_COOLDOWN_S = 60.0
+ACTIONS = ("accept", "reject")
+
+COMMIT_BACKLOG = REGISTRY.gauge("kickmonitor_redemption_commit_backlog", "IDs esperando aceptar/rechazar en Kick", labels=("action",))
+COMMIT_SECONDS = REGISTRY.histogram("kickmonitor_redemption_commit_seconds", "Latencia por lote de accept/reject (incluye reintentos)",
+                                    labels=("action",))
+COMMIT_BATCH_SIZE = REGISTRY.histogram("kickmonitor_redemption_commit_batch_size", "IDs por llamada de accept/reject",
+                                       labels=("action",), buckets=(1, 2, 5, 10, 15, 20, 25))
+COMMIT_FAILURES = REGISTRY.counter("kickmonitor_redemption_commit_failures_total", "Intentos fallidos de accept/reject",
+                                   labels=("action", "reason"))
+
+class RedemptionCommitter(QThread):
+    """
+    Acepta y rechaza canjes en Kick desde su propio hilo, para que la detección nunca espere
+    a la API. Agrupa los IDs de varios ciclos (hasta BATCH_MAX por llamada) y reintenta con
+    backoff los lotes que fallan por límite de peticiones, error del servidor o red caída.
+    Si Kick rechaza un lote (4xx), se parte para no perder los IDs válidos por uno inválido.
+    Solo las aceptaciones confirmadas se resuelven en la DB: lo demás sigue a la espera y el
+    polling lo vuelve a encolar, también tras reiniciar la app.
+    """
+    log_signal = pyqtSignal(str)
+
+    def __init__(self, rewards_api, db_handler):
+        super().__init__()
+        self.rewards_api = rewards_api
+        self.db = db_handler
+        self.is_running = True
+        self._pending: Dict[str, deque] = {action: deque() for action in ACTIONS}
+        # ID -> instante desde el que se admite de nuevo (inf mientras está en cola o en vuelo)
+        self._tracked: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self.stats = {"batches": 0, "committed": 0, "retries": 0, "failed": 0}
+        COMMIT_BACKLOG.set_function(lambda: {(action,): len(queue) for action, queue in self._pending.items()})
+
+    # ==========================================
+    # ENTRADA (CUALQUIER HILO)
+    # ==========================================
+    def accept(self, red_ids: List[str]):
+        self._submit("accept", red_ids)
+
+    def reject(self, red_ids: List[str]):
+        self._submit("reject", red_ids)
+
+    def _submit(self, action: str, red_ids: List[str]):
+        """Encola los IDs; los que ya están en cola, en vuelo o en espera tras fallar se ignoran."""
+        if not red_ids: return
+        now = time.monotonic()
+        with self._cond:
+            fresh = [red_id for red_id in dict.fromkeys(red_ids) if self._tracked.get(red_id, 0.0) <= now]
+            if not fresh: return
+            for red_id in fresh:
+                self._tracked[red_id] = math.inf
+            self._pending[action].extend(fresh)
+            self._cond.notify()
+
+    def _release(self, red_ids: List[str], cooldown: float = 0.0):
+        now = time.monotonic()
+        with self._cond:
+            for red_id in red_ids:
+                if cooldown:
+                    self._tracked[red_id] = now + cooldown
+                else:
+                    self._tracked.pop(red_id, None)
+            # Los IDs cuya espera ya venció no necesitan seguir en el mapa
+            for red_id in [k for k, until in self._tracked.items() if until <= now]:
+                del self._tracked[red_id]
+
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def stop(self):
+        self.is_running = False
+        with self._cond:
+            self._cond.notify_all()
+        self.quit()
+        self.wait(1500)
+
+    # ==========================================
+    # LOOP PRINCIPAL
+    # ==========================================
+    def run(self):
+        while self.is_running:
+            with self._cond:
+                if not self.backlog():
+                    self._cond.wait(0.5)
+                if not self.backlog():
+                    continue
+                # Damos margen a que lleguen más IDs, salvo que ya haya un lote lleno
+                deadline = time.monotonic() + BATCH_LINGER_S
+                while self.is_running and max(map(len, self._pending.values())) < BATCH_MAX:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+                    self._cond.wait(remaining)
+                batches = self._take_batches()
+
+            for action, red_ids in batches:
+                self._commit(action, red_ids)
+
+        # Al cerrar: un último intento sin reintentos; lo que falle sigue a la espera en la DB
+        # y el polling lo retoma en el próximo arranque
+        with self._cond:
+            batches = self._take_batches(limit=None)
+        for action, red_ids in batches:
+            self._commit(action, red_ids, max_attempts=1)
+
+    def _take_batches(self, limit=BATCH_MAX):
+        batches = []
+        for action, queue in self._pending.items():
+            while queue:
+                count = len(queue) if limit is None else min(limit, len(queue))
+                batches.append((action, list(dict.fromkeys(queue.popleft() for _ in range(count)))))
+                if limit is not None: break
+        return batches
+
+    def _commit(self, action: str, red_ids: List[str], max_attempts: int = MAX_ATTEMPTS):
+        started = time.perf_counter()
+        COMMIT_BATCH_SIZE.observe(len(red_ids), action=action)
+        for attempt in range(1, max_attempts + 1):
+            reason = self._send(action, red_ids)
+            if reason is None:
+                self.stats["batches"] += 1
+                self.stats["committed"] += len(red_ids)
+                COMMIT_SECONDS.observe(time.perf_counter() - started, action=action)
+                self._resolve(action, red_ids)
+                return
+            COMMIT_FAILURES.inc(action=action, reason=reason)
+            if reason in ("rejected", "auth") or attempt == max_attempts:
+                break
+            self.stats["retries"] += 1
+            delay = min(RETRY_MAX_S, RETRY_BASE_S * (2 ** (attempt - 1)))
+            if not self._sleep(delay * random.uniform(0.8, 1.2)):
+                # Se está cerrando: el lote vuelve a la cola para el último intento
+                with self._cond:
+                    self._pending[action].extendleft(reversed(red_ids))
+                return
+
+        COMMIT_SECONDS.observe(time.perf_counter() - started, action=action)
+        verb = 'aceptar' if action == 'accept' else 'rechazar'
+        if reason == "rejected" and len(red_ids) > 1:
+            # Un ID inválido no debe tumbar el lote: se reintenta cada mitad por separado
+            middle = len(red_ids) // 2
+            self._commit(action, red_ids[:middle], max_attempts)
+            self._commit(action, red_ids[middle:], max_attempts)
+            return
+
+        self.stats["failed"] += len(red_ids)
+        if reason == "rejected":
+            # Kick rechaza este ID en concreto (ya resuelto o inexistente): insistir no sirve
+            self._resolve(action, red_ids)
+            self.log_signal.emit(LoggerText.error(f"Kick no permitió {verb} el canje {red_ids[0]}"))
+            return
+        # Sigue a la espera en la DB: el polling lo vuelve a encolar pasado el enfriamiento
+        self._release(red_ids, cooldown=RESUBMIT_COOLDOWN_S)
+        self.log_signal.emit(LoggerText.error(f"No se pudo {verb} {len(red_ids)} canje(s) en Kick ({reason}); se reintentará"))
+
+    def _resolve(self, action: str, red_ids: List[str]):
+        if action == "accept":
+            self.db.resolve_redemptions(red_ids)
+        self._release(red_ids)
+
+    def _send(self, action: str, red_ids: List[str]):
+        """None si Kick confirmó el lote; si no, el motivo ('network', 'rate_limit', 'server', 'auth', 'rejected')."""
+        try:
+            method = self.rewards_api.accept_redemptions if action == "accept" else self.rewards_api.reject_redemptions
+            resp = method(red_ids)
+        except Exception as e:
+            print(f"[REWARDS_ERROR] {action}: {e}")
+            resp = None
+        if resp is None: return "network"
+        if resp.status_code == 429: return "rate_limit"
+        if resp.status_code >= 500: return "server"
+        if resp.status_code in (401, 403): return "auth"
+        if resp.status_code >= 400: return "rejected"
+        self._log_partial_failures(action, resp)
+        return None
+
+    def _log_partial_failures(self, action: str, resp):
+        """Kick puede confirmar el lote y devolver algunos IDs como fallidos (ya aceptados, inexistentes...)."""
+        try:
+            failed = ((resp.json() or {}).get("data") or {}).get("failed") or []
+        except (ValueError, AttributeError):
+            return
+        if failed:
+            COMMIT_FAILURES.inc(len(failed), action=action, reason="partial")
+            if msg := LoggerText.debug(f"Kick no aplicó {action} a {len(failed)} canje(s): {failed[:3]}"):
+                self.log_signal.emit(msg)
+
+    def _sleep(self, seconds: float) -> bool:
+        """Espera interrumpible; False si el hilo se está deteniendo."""
+        end = time.monotonic() + seconds
+        while self.is_running and time.monotonic() < end:
+            time.sleep(max(0.0, min(0.1, end - time.monotonic())))
+        return self.is_running
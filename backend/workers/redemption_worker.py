@@ -7,6 +7,18 @@ from PyQt6.QtCore import QThread, pyqtSignal
 
 from backend.utils.logger_text import LoggerText
 from backend.services.rewards_service import RewardsService 
+from backend.services.kick_events import EVENT_REDEMPTION, parse_timestamp
+from backend.workers.redemption_committer import RedemptionCommitter
+from backend.utils.metrics import REGISTRY
+
+REDEMPTIONS_DETECTED = REGISTRY.counter("kickmonitor_redemptions_detected_total", "Canjes nuevos detectados por el monitor",
+                                        labels=("source",))
+REDEMPTION_POLL_SECONDS = REGISTRY.histogram("kickmonitor_redemption_poll_seconds", "Duración de cada consulta de canjes a Kick",
+                                             labels=("status",))
+REDEMPTION_POLL_ERRORS = REGISTRY.counter("kickmonitor_redemption_poll_errors_total", "Ciclos de consulta de canjes fallidos")
+
+# Poda de la tabla de canjes procesados (los más viejos que el TTL)
+PRUNE_INTERVAL_S = 3600
 
 class RedemptionWorker(QThread):
     redemption_detected = pyqtSignal(str, str, str)
@@ -17,91 +29,171 @@ class RedemptionWorker(QThread):
         self.db = db_handler
         self.is_running = True
         
-        self.rewards_api = RewardsService(shared_scraper)
+        self.rewards_api = RewardsService(db_handler, shared_scraper)
         
         # TIMERS OPTIMIZADOS
         self.normal_interval = 2.0  # Más rápido en inactividad
         self.burst_interval = 1.0   # Muy rápido cuando hay actividad reciente
+        # Con los webhooks de Kick activos, el polling solo reconcilia canjes perdidos
+        self.reconcile_interval = float(max(5, db_handler.get_int("redemption_reconcile_s", 15)))
+        self.events_active = False
         
-        self.processed_ids = set() 
-        self.first_scan = True
+        # Dedup persistente (db.claim_redemptions): tras reiniciar se retoma sin repetir ni perder canjes.
+        # Solo la primera vez se siembra con lo que ya hay en Kick, sin dispararlo.
+        self.seeding = not self.db.get_bool("redemption_store_seeded")
+        self.max_age_s = db_handler.get_int("redemption_dedup_ttl_h", 168) * 3600
+        # Opcional: rechazar (Kick reembolsa) los pendientes caducados que nunca se dispararon
+        self.refund_stale = db_handler.get_bool("redemption_refund_stale")
+        self._polled = {}
+        self._last_prune = 0.0
         
         # Ejecutor de hilos para paralelizar llamadas HTTP
         self.executor = ThreadPoolExecutor(max_workers=2)
+        # Los webhooks se procesan aquí, en orden, y no en el loop de aiohttp (el reclamo escribe en la DB)
+        self.event_executor = ThreadPoolExecutor(max_workers=1)
+        # Aceptar/rechazar en Kick va por su propio hilo, en lotes y con reintentos
+        self.committer = RedemptionCommitter(self.rewards_api, db_handler)
+        self.committer.log_signal.connect(self.log_signal)
 
     def run(self):
         self.log_signal.emit(LoggerText.system("Monitor de Puntos: Iniciado (Modo Alta Velocidad)"))
         
         cycle_count = 0
+        self.committer.start()
+        if self.db.get_bool("kick_webhook_enabled"):
+            self._subscribe_events()
         
         while self.is_running:
-            with suppress(Exception):
+            try:
                 # Usamos el ejecutor para lanzar ambas peticiones al mismo tiempo
                 # pero los 'fulfilled' solo los revisamos cada 5 ciclos para ahorrar red y evitar rate-limits
                 future_p = self.executor.submit(self._process_redemptions, "pending")
                 
-                check_fulfilled = (cycle_count % 5 == 0)
+                check_fulfilled = self.seeding or (cycle_count % 5 == 0)
                 future_f = self.executor.submit(self._process_redemptions, "fulfilled") if check_fulfilled else None
                 
                 # Esperar respuesta de pending (que es la que nos importa para disparar el trigger rápido)
                 found_p = future_p.result()
                 found_f = future_f.result() if future_f else False
                 
-                self.first_scan = False
+                if self.seeding and self._polled.get("pending") and self._polled.get("fulfilled"):
+                    self.seeding = False
+                    self.db.set("redemption_store_seeded", "1")
                 cycle_count += 1
-
-                # Dormir usando el burst o normal
+                self._prune_if_due()
+            except Exception:
+                REDEMPTION_POLL_ERRORS.inc()
+                found_p = found_f = False
+
+            # Dormir usando el burst o normal
+            if self.events_active:
+                sleep_time = self.reconcile_interval
+            else:
                 sleep_time = self.burst_interval if (found_p or found_f) else self.normal_interval
 
-                # Dormir de forma que podamos interrumpir rápidamente si self.is_running pasa a False
-                for _ in range(int(sleep_time * 10)):
-                    if not self.is_running: break
-                    time.sleep(0.1)
+            # Dormir de forma que podamos interrumpir rápidamente si self.is_running pasa a False
+            for _ in range(int(sleep_time * 10)):
+                if not self.is_running: break
+                time.sleep(0.1)
 
     def stop(self):
         self.is_running = False
         self.executor.shutdown(wait=False)
+        self.event_executor.shutdown(wait=False)
+        self.committer.stop()
         self.quit()
         self.wait(1000)
 
+    def _subscribe_events(self):
+        with suppress(Exception):
+            if self.rewards_api.subscribe_events([EVENT_REDEMPTION]):
+                self.events_active = True
+                self.log_signal.emit(LoggerText.system("Monitor de Puntos: webhooks activos, polling en modo reconciliación"))
+                return
+        self.log_signal.emit(LoggerText.error("Monitor de Puntos: no se pudo suscribir a los webhooks, se mantiene el polling"))
+
+    def _prune_if_due(self):
+        now = time.monotonic()
+        if now - self._last_prune < PRUNE_INTERVAL_S: return
+        self._last_prune = now
+        self.db.prune_redemptions()
+
+    def _is_stale(self, red: dict) -> bool:
+        """Canjes más viejos que el TTL: su ID ya pudo podarse, así que no se vuelven a disparar."""
+        redeemed_at = parse_timestamp(red.get("redeemed_at") or "")
+        return redeemed_at is not None and time.time() - redeemed_at > self.max_age_s
+
+    def ingest_event(self, event: dict):
+        """
+        Canje recibido por webhook. Se llama en el hilo del servidor (conexión directa), así que
+        solo lo encola: el reclamo en la DB y la alerta corren en event_executor.
+        """
+        self.events_active = True
+        if event["status"] == "rejected" or not self.is_running: return
+        with suppress(RuntimeError):  # ejecutor ya cerrado durante stop()
+            self.event_executor.submit(self._handle_event, event)
+
+    def _handle_event(self, event: dict):
+        """Se dispara al instante y el polling de reconciliación ya lo encuentra como procesado."""
+        if not self.is_running: return
+        if not self.db.claim_redemptions([event["id"]], awaiting_accept=event["status"] == "pending"): return
+
+        REDEMPTIONS_DETECTED.inc(source="webhook")
+        self.redemption_detected.emit(event["username"], event["title"], event["user_input"])
+        self.log_signal.emit(LoggerText.success(f"Canje detectado: {event['title']} ({event['username']})"))
+        if event["status"] == "pending":
+            self.committer.accept([event["id"]])
+
     def _process_redemptions(self, status: str) -> bool:
-        groups = self.rewards_api.get_redemptions(status)
+        with REDEMPTION_POLL_SECONDS.time(status=status):
+            groups = self.rewards_api.get_redemptions(status)
+        self._polled[status] = groups is not None
         if not groups: return False
 
         found_new = False
-        ids_to_accept = []
-
+        candidates, stale_ids = [], []
         for group in groups:
             title = group.get("reward", {}).get("title", "")
-            
             for red in group.get("redemptions", []):
-                red_id = red.get("id")
-
-                if not red_id or red_id in self.processed_ids: 
-                    continue
-                
-                self.processed_ids.add(red_id)
-                
-                if self.first_scan: 
-                    continue 
-
-                found_new = True 
-
-                user_data = red.get("user", {})
-                username = user_data.get("username") or user_data.get("slug") or "Anonimo"
-                user_input = red.get("user_input", "")
-
-                # Emitimos la señal de inmediato para que el UnifiedServer mande la alerta
-                self.redemption_detected.emit(username, title, user_input)
-                self.log_signal.emit(LoggerText.success(f"Canje detectado: {title} ({username})"))
-
-                if status == "pending":
-                    ids_to_accept.append(red_id)
-        
-        # Aceptar redenciones en Kick
-        if ids_to_accept:
-            # Si aceptar también es lento, puedes lanzarlo en background:
-            # self.executor.submit(self.rewards_api.accept_redemptions, ids_to_accept)
-            self.rewards_api.accept_redemptions(ids_to_accept)
-            
-        return found_new
\ No newline at end of file
+                if not red.get("id"): continue
+                if self._is_stale(red):
+                    stale_ids.append(str(red["id"]))
+                else:
+                    candidates.append((title, red))
+        # Un solo reclamo por consulta: la LRU responde casi todo y el resto va a SQLite en un IN (...).
+        # Los pendientes disparados quedan a la espera de aceptarse (no al sembrar: esos no se disparan).
+        new_ids = set(self.db.claim_redemptions(
+            (str(red["id"]) for _, red in candidates), awaiting_accept=status == "pending" and not self.seeding))
+        if self.seeding: return False
+
+        for title, red in candidates:
+            red_id = str(red["id"])
+            if red_id not in new_ids:
+                continue
+            new_ids.discard(red_id)
+
+            found_new = True 
+            REDEMPTIONS_DETECTED.inc(source="poll")
+
+            user_data = red.get("user", {})
+            username = user_data.get("username") or user_data.get("slug") or "Anonimo"
+            user_input = red.get("user_input", "")
+
+            # Emitimos la señal de inmediato para que el UnifiedServer mande la alerta
+            self.redemption_detected.emit(username, title, user_input)
+            self.log_signal.emit(LoggerText.success(f"Canje detectado: {title} ({username})"))
+
+        listed_ids = [str(red["id"]) for _, red in candidates] + stale_ids
+        awaiting = self.db.awaiting_redemptions(listed_ids)
+        if status == "pending":
+            # Todo lo ya disparado que sigue pendiente (nuevo, de un webhook, de un fallo o de antes
+            # de reiniciar) se vuelve a aceptar, sin repetir la alerta. Aceptar es idempotente en Kick.
+            self.committer.accept(awaiting)
+            if self.refund_stale:
+                awaiting_set = set(awaiting)
+                self.committer.reject([red_id for red_id in stale_ids if red_id not in awaiting_set])
+        else:
+            # Ya figura como completado en Kick: nada que aceptar
+            self.db.resolve_redemptions(awaiting)
+
+        return found_new
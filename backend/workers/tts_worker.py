@@ -18,6 +18,13 @@ import pygame
 
 from PyQt6.QtCore import QThread, pyqtSignal
 from backend.utils.logger_text import LoggerText
+from backend.utils.metrics import REGISTRY
+
+TTS_BACKLOG = REGISTRY.gauge("kickmonitor_tts_backlog", "Mensajes esperando ser leídos por el TTS")
+TTS_SPOKEN = REGISTRY.counter("kickmonitor_tts_spoken_total", "Mensajes leídos por el TTS", labels=("engine",))
+TTS_SPEAK_SECONDS = REGISTRY.histogram("kickmonitor_tts_speak_seconds", "Síntesis + reproducción de un mensaje", labels=("engine",),
+                                       buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0))
+TTS_ERRORS = REGISTRY.counter("kickmonitor_tts_errors_total", "Fallos del TTS (incluye caídas de Edge-TTS a voz local)")
 
 class TTSWorker(QThread):
     error_signal = pyqtSignal(str)
@@ -42,6 +49,7 @@ class TTSWorker(QThread):
 
         self.re_html = re.compile(r'<[^>]+>')
         self.re_url = re.compile(r'http\S+|www\.\S+')
+        TTS_BACKLOG.set_function(self.queue.qsize)
 
     # ==========================================
     # CONTROL Y CONFIGURACIÓN
@@ -89,11 +97,15 @@ class TTSWorker(QThread):
         while self.is_running:
             try:
                 text = self.queue.get(timeout=0.5) 
-                self._speak(text)
+                engine = self.engine_type
+                with TTS_SPEAK_SECONDS.time(engine=engine):
+                    self._speak(text)
+                TTS_SPOKEN.inc(engine=engine)
                 self.queue.task_done()
             except queue.Empty:
                 continue
             except Exception as e:
+                TTS_ERRORS.inc()
                 self.error_signal.emit(LoggerText.error(f"TTS Error: {e}"))
 
         self._cleanup_loop()
@@ -145,6 +157,7 @@ class TTSWorker(QThread):
                 time.sleep(0.05)
                 
         except Exception as e:
+            TTS_ERRORS.inc()
             self.error_signal.emit(LoggerText.error(f"Edge-TTS falló, usando voz local: {e}"))
             self._speak_pyttsx3(text)
             
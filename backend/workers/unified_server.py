@@ -1,27 +1,110 @@
 # backend/workers/unified_server.py
 
 import sys
+import json
 import asyncio
 import logging
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, Set
+from typing import Dict, Optional, Set
 
+import aiohttp
 from aiohttp import web
 from PyQt6.QtCore import QThread, pyqtSignal
 
-from backend.core.db_controller import DBHandler
 from backend.utils.logger_text import LoggerText 
+from backend.services.media_manifest import MediaManifest
+from backend.services.kick_events import KickEventVerifier, EVENT_REDEMPTION, URL_PUBLIC_KEY, parse_redemption
+from backend.workers.playback_scheduler import PlaybackScheduler, parse_limits
+from backend.utils.metrics import REGISTRY
 
 # ==========================================
 # 1. CONSTANTES & CONFIGURACIÓN
 # ==========================================
 SERVER_PORT = 8081
 CHUNK_SIZE = 1024 * 1024
+# Las URLs de /media con ?v=<mtime>-<tamaño> cambian si cambia el archivo: se cachean un año.
+# Sin versión (overlays antiguos, vista previa) se revalida siempre con ETag/Last-Modified.
+MEDIA_CACHE_CONTROL = "public, max-age=31536000"
+UNVERSIONED_MEDIA_CACHE_CONTROL = "no-cache"
+# /media/h/<hash>: el contenido nunca cambia para una misma URL
+HASHED_MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_DEBOUNCE_S = 0.5
+# Receptor de webhooks de Kick (se expone con un túnel HTTPS hacia este puerto)
+WEBHOOK_PATH = "/webhooks/kick"
+
+# Historial ya serializado que recibe un overlay al (re)conectarse
+CHAT_HISTORY_SIZE = 50
+ALERT_HISTORY_SIZE = 10
+
+# Cola de salida por cliente: un OBS lento no frena al resto de la sala
+CLIENT_QUEUE_MAX = 256
+SLOW_CLIENT_POLICIES = ("drop_oldest", "disconnect")
+ROOMS = ("triggers", "chat", "alerts")
+
+# Ventana de agrupado del chat: los overlays con ?proto=batch reciben un frame 'batch' por ventana
+CHAT_BATCH_MS = 50
+
+# Métricas del propio servidor (el resto de módulos registran las suyas al importarse)
+OVERLAY_CLIENTS = REGISTRY.gauge("kickmonitor_overlay_clients", "Overlays de OBS conectados", labels=("room",))
+OVERLAY_QUEUED = REGISTRY.gauge("kickmonitor_overlay_queued_frames", "Frames esperando en las colas de salida", labels=("room",))
+OVERLAY_FRAMES = REGISTRY.counter("kickmonitor_overlay_frames_total", "Frames encolados hacia los overlays", labels=("room",))
+OVERLAY_DROPPED = REGISTRY.counter("kickmonitor_overlay_dropped_total", "Frames descartados por clientes lentos", labels=("room",))
+OVERLAY_DISCONNECTED = REGISTRY.counter("kickmonitor_overlay_disconnected_total", "Clientes cerrados por lentos", labels=("room",))
+OVERLAY_BROADCAST = REGISTRY.histogram("kickmonitor_overlay_broadcast_seconds", "Serialización + reparto de una difusión en el loop",
+                                       labels=("room",), buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+
+KICK_EVENTS = REGISTRY.counter("kickmonitor_kick_events_total", "Webhooks de Kick recibidos por resultado", labels=("result",))
 
 LOG_MODULES_TO_SILENCE = ['aiohttp.access', 'aiohttp.server', 'comtypes', 'kickpython']
 for lib in LOG_MODULES_TO_SILENCE:
     logging.getLogger(lib).setLevel(logging.WARNING)
 
+class OverlayClient:
+    """
+    Un WebSocket conectado: cola acotada de frames ya serializados y una tarea escritora propia.
+    Si la cola se llena, se descarta el frame más antiguo o se desconecta al cliente según la política.
+    """
+    def __init__(self, ws: web.WebSocketResponse, room: str, max_queue: int, policy: str):
+        self.ws = ws
+        self.room = room
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.queue = deque()
+        self.dropped = 0
+        self.sent = 0
+        # El overlay entiende frames {"type": "batch"} (chat_overlay.html con ?proto=batch)
+        self.batch = False
+        # El overlay confirma las reproducciones (triggers_overlay.html con ?proto=ack)
+        self.acks = False
+        self._wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def push(self, frame: str) -> bool:
+        """Encola un frame. Devuelve False si el cliente debe desconectarse por lento."""
+        if len(self.queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(frame)
+        self._wakeup.set()
+        return True
+
+    async def writer(self):
+        try:
+            while not self.ws.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                await self.ws.send_str(self.queue.popleft())
+                self.sent += 1
+        except (ConnectionError, RuntimeError):
+            pass  # El socket se cerró a mitad de envío; el handler lo da de baja
+
 class UnifiedOverlayWorker(QThread):
     """
     Servidor Web unificado (aiohttp). 
@@ -29,10 +112,12 @@ class UnifiedOverlayWorker(QThread):
     """    
     log_signal = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
+    # Canje recibido por webhook: {"id", "status", "username", "title", "user_input"}
+    redemption_event = pyqtSignal(dict)
 
-    def __init__(self):
+    def __init__(self, db_handler):
         super().__init__()
-        self.db = DBHandler()        
+        self.db = db_handler
         self.loop: Optional[asyncio.AbstractEventLoop] = None
         self.runner: Optional[web.AppRunner] = None
         self.site: Optional[web.TCPSite] = None        
@@ -43,7 +128,65 @@ class UnifiedOverlayWorker(QThread):
         self.ws_alerts: Set[web.WebSocketResponse] = set()        
         
         self.latest_chat_config = {}
+        # Filtro de canal por conexión de chat (?channel=slug | all; vacío = canal principal)
+        self.chat_filters = {}
+
+        # Cola y escritor por cliente; métricas acumuladas por sala
+        self.clients: Dict[web.WebSocketResponse, OverlayClient] = {}
+        self.client_queue_max = self.db.get_int("overlay_client_queue", CLIENT_QUEUE_MAX)
+        policy = self.db.get("overlay_slow_policy", "drop_oldest")
+        self.slow_client_policy = policy if policy in SLOW_CLIENT_POLICIES else "drop_oldest"
+        self.room_stats = {room: {"frames": 0, "dropped": 0, "disconnected": 0} for room in ROOMS}
+        self._rooms = {id(self.ws_triggers): "triggers", id(self.ws_chat): "chat", id(self.ws_alerts): "alerts"}
+        self._register_metrics()
+
+        # Mensajes de chat pendientes de la ventana actual (se llenan desde el hilo del chat worker)
+        self._chat_lock = threading.Lock()
+        self._chat_pending = []
+        self._chat_main_channel = ""
+        self._chat_flush_scheduled = False
+        self.chat_batch_window = max(0, self.db.get_int("overlay_chat_batch_ms", CHAT_BATCH_MS)) / 1000
+
+        # Anillos de historial (solo los toca el loop del servidor): (canal, payload JSON) y alertas JSON
+        self.chat_history = deque(maxlen=CHAT_HISTORY_SIZE)
+        self.alert_history = deque(maxlen=ALERT_HISTORY_SIZE)
+
+        # Índice filename -> ruta de /media; se invalida cuando cambia la tabla triggers
+        self._media_index: Optional[Dict[str, Path]] = None
+        self._media_generation = 0
+        # Manifiesto con hashes de la multimedia activa (precarga del overlay y URLs inmutables)
+        self.media_manifest = MediaManifest(self.db)
+        self._manifest_task: Optional[asyncio.Task] = None
+        self._manifest_dirty = False
+        self.db.subscribe_triggers(self._invalidate_media_index)
+
+        # Cola de reproducción de triggers: un medio por tipo a la vez, los canjes caros primero
+        self.playback = PlaybackScheduler(self._send_playback, parse_limits(self.db.get("overlay_playback_limits", "")),
+                                          self.db.get_int("overlay_priority_cost", 0))
+
+        # Webhooks firmados de Kick; la clave local solo se usa con el emisor de pruebas
+        self.event_verifier = KickEventVerifier(self.db.get("kick_webhook_public_key"))
+        self._unavailable_logged = False
+
         self.is_active = self.db.get_bool("overlay_enabled")
+        self.db.subscribe_settings(self._on_setting_changed, keys={
+            "overlay_enabled", "overlay_chat_batch_ms", "overlay_playback_limits", "overlay_priority_cost",
+            "kick_webhook_public_key"})
+
+    def _on_setting_changed(self, key: str, value: str):
+        if key == "overlay_chat_batch_ms":
+            self.chat_batch_window = max(0, int(value)) / 1000 if str(value).isdigit() else CHAT_BATCH_MS / 1000
+            return
+        if key == "overlay_playback_limits":
+            if self.loop: self.loop.call_soon_threadsafe(self.playback.set_limits, parse_limits(value))
+            return
+        if key == "overlay_priority_cost":
+            self.playback.priority_cost = int(value) if str(value).isdigit() else 0
+            return
+        if key == "kick_webhook_public_key":
+            self.event_verifier.load_key(value)
+            return
+        self.is_active = value == "1"
 
     # =========================================================================
     # REGIÓN 2: CICLO DE VIDA DEL SERVIDOR (THREAD RUN)
@@ -72,6 +215,8 @@ class UnifiedOverlayWorker(QThread):
         self.site = web.TCPSite(self.runner, '127.0.0.1', SERVER_PORT)
         await self.site.start()
         self.log_signal.emit(LoggerText.success(f"Overlay Unificado Online: http://127.0.0.1:{SERVER_PORT}"))
+        # Calcula los hashes en segundo plano para que el primer canje ya use URLs inmutables
+        self._schedule_manifest_refresh()
 
     def stop(self):
         if self.loop and self.loop.is_running():
@@ -105,7 +250,16 @@ class UnifiedOverlayWorker(QThread):
         app.router.add_get('/ws/alerts', self.ws_alerts_handler)        
         
         # Archivos Dinámicos y Estáticos
+        app.router.add_get('/manifest.json', self.handle_media_manifest)
+        app.router.add_get('/media/h/{name}', self.handle_hashed_media)
         app.router.add_get('/media/{filename}', self.handle_media_request)       
+
+        # Eventos de Kick (canjes de puntos)
+        app.router.add_post(WEBHOOK_PATH, self.handle_kick_event)
+
+        # Observabilidad: texto Prometheus y estado en JSON
+        app.router.add_get('/metrics', self.handle_metrics)
+        app.router.add_get('/health', self.handle_health)
         assets_path = self._get_asset_path("") 
         if assets_path.exists():
             app.router.add_static('/assets', path=str(assets_path))
@@ -121,59 +275,248 @@ class UnifiedOverlayWorker(QThread):
     async def handle_alerts(self, request): return await self._serve_html("alerts_overlay.html")
 
     async def handle_media_request(self, request):
+        """
+        Sirve el archivo de un trigger. FileResponse responde ETag/Last-Modified, 304 condicionales
+        y rangos (vídeos con seek). Con ?v= el Cache-Control largo evita releer el disco en cada
+        reproducción; sin versión, no-cache obliga a revalidar y un archivo reemplazado se ve al instante.
+        """
         filename = request.match_info['filename']
-        config = self.db.get_all_triggers().get(filename)
-        if not config or "path" not in config:
+        full_path = self._get_media_index().get(filename)
+        if full_path is None:
             return web.Response(status=404, text="Archivo no registrado.")
         
-        full_path = Path(config["path"]).resolve()
         if full_path.is_file():
-            return web.FileResponse(full_path, chunk_size=CHUNK_SIZE)
+            cache_control = MEDIA_CACHE_CONTROL if request.query.get("v") else UNVERSIONED_MEDIA_CACHE_CONTROL
+            return web.FileResponse(full_path, chunk_size=CHUNK_SIZE, headers={"Cache-Control": cache_control})
         return web.Response(status=404, text="Archivo no encontrado.")
 
+    async def handle_kick_event(self, request):
+        """
+        Webhook de Kick. Responde enseguida (Kick reintenta si tarda) y despacha los canjes
+        por redemption_event; una reentrega del mismo mensaje se confirma sin volver a dispararse.
+        """
+        body = await request.read()
+        if not self.event_verifier.available:
+            KICK_EVENTS.inc(result="unavailable")
+            if not self._unavailable_logged:
+                self._unavailable_logged = True
+                self.log_signal.emit(LoggerText.error("Webhooks de Kick: instala 'cryptography' para verificar las firmas."))
+            return web.Response(status=503, text="Verificación de firmas no disponible.")
+        if not self.event_verifier.has_key and not await self._load_event_key():
+            KICK_EVENTS.inc(result="unavailable")
+            return web.Response(status=503, text="Clave pública de Kick no disponible.")
+
+        error = self.event_verifier.verify(request.headers, body)
+        if error == "duplicado":
+            KICK_EVENTS.inc(result="duplicate")
+            return web.Response(status=200)
+        if error:
+            KICK_EVENTS.inc(result="rejected")
+            if msg := LoggerText.debug(f"Webhook de Kick rechazado: {error}"): self.log_signal.emit(msg)
+            return web.Response(status=401, text=error)
+
+        if request.headers.get("Kick-Event-Type") == EVENT_REDEMPTION:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                KICK_EVENTS.inc(result="rejected")
+                return web.Response(status=400, text="JSON inválido.")
+            redemption = parse_redemption(data) if isinstance(data, dict) else None
+            if redemption: self.redemption_event.emit(redemption)
+        KICK_EVENTS.inc(result="accepted")
+        return web.Response(status=200)
+
+    async def _load_event_key(self) -> bool:
+        """Descarga la clave pública con la que Kick firma los webhooks (no requiere token)."""
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+                async with session.get(URL_PUBLIC_KEY) as resp:
+                    data = await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.log_signal.emit(LoggerText.error(f"No se pudo obtener la clave pública de Kick: {e}"))
+            return False
+        return self.event_verifier.load_key(((data or {}).get("data") or {}).get("public_key", ""))
+
+    async def handle_metrics(self, request):
+        return web.Response(text=REGISTRY.render_prometheus(), headers={
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8", "Cache-Control": "no-cache"})
+
+    async def handle_health(self, request):
+        return web.json_response({
+            "status": "ok",
+            "uptime_s": round(time.time() - REGISTRY.started_at, 1),
+            "overlay_active": self.is_active,
+            "rooms": self.get_broadcast_stats(),
+            "playback": self.playback.get_stats(),
+            "metrics": REGISTRY.snapshot(),
+        }, headers={"Cache-Control": "no-cache"})
+
+    async def handle_media_manifest(self, request):
+        manifest = await self.loop.run_in_executor(None, self.media_manifest.get)
+        return web.json_response(manifest, headers={"Cache-Control": "no-cache"})
+
+    async def handle_hashed_media(self, request):
+        digest = request.match_info['name'].split(".", 1)[0]
+        path = self.media_manifest.path_for(digest)
+        if path is None:
+            if self.media_manifest.needs_rebuild: self._schedule_manifest_refresh()
+            return web.Response(status=404, text="Archivo no registrado o modificado.")
+        return web.FileResponse(path, chunk_size=CHUNK_SIZE, headers={"Cache-Control": HASHED_MEDIA_CACHE_CONTROL})
+
+    def media_url(self, filename: str) -> Optional[str]:
+        """URL absoluta con hash para un trigger activo, o None si el manifiesto aún no lo incluye."""
+        path = self.media_manifest.url_for(filename)
+        if path is None and self.media_manifest.needs_rebuild and self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._schedule_manifest_refresh)
+        return f"http://127.0.0.1:{SERVER_PORT}{path}" if path else None
+
+    def _get_media_index(self) -> Dict[str, Path]:
+        index = self._media_index
+        if index is None:
+            generation = self._media_generation
+            index = {name: Path(path).resolve() for name, path in self.db.get_trigger_media_paths().items()}
+            # Si hubo un cambio mientras leíamos, no guardamos un índice ya viejo
+            if generation == self._media_generation:
+                self._media_index = index
+        return index
+
+    def _invalidate_media_index(self):
+        """Se llama desde el hilo que modificó triggers; la próxima petición reconstruye el índice."""
+        self._media_generation += 1
+        self._media_index = None
+        self.media_manifest.invalidate()
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._schedule_manifest_refresh)
+
+    def _schedule_manifest_refresh(self):
+        """Agrupa ráfagas de cambios (sincronización con Kick) en una sola reconstrucción."""
+        self._manifest_dirty = True
+        if self._manifest_task and not self._manifest_task.done(): return
+        self._manifest_task = self.loop.create_task(self._refresh_manifest())
+
+    async def _refresh_manifest(self):
+        while self._manifest_dirty:
+            self._manifest_dirty = False
+            await asyncio.sleep(MANIFEST_DEBOUNCE_S)
+            try:
+                manifest = await self.loop.run_in_executor(None, self.media_manifest.get)
+            except Exception as e:
+                self.log_signal.emit(LoggerText.error(f"Error generando el manifiesto multimedia: {e}"))
+                return
+            # Los overlays conectados vuelven a pedir /manifest.json y precargan lo nuevo
+            await self._broadcast(self.ws_triggers, {"action": "manifest_updated", "version": manifest["version"]})
+
     # =========================================================================
     # REGIÓN 4: HANDLERS DE WEBSOCKETS (SEPARADOS POR SALA)
     # =========================================================================
     async def ws_triggers_handler(self, request):
         ws = web.WebSocketResponse()
         await ws.prepare(request)
-        self.ws_triggers.add(ws)
+        client = self._attach(ws, "triggers", self.ws_triggers)
+        client.acks = request.query.get("proto", "") == "ack"
         try:
             async for msg in ws:
-                if msg.type == web.WSMsgType.ERROR:
+                if msg.type == web.WSMsgType.TEXT:
+                    self._handle_trigger_ack(msg.data)
+                elif msg.type == web.WSMsgType.ERROR:
                     self.log_signal.emit(LoggerText.error(f'WS Triggers Error: {ws.exception()}'))
         finally:
-            self.ws_triggers.discard(ws)
+            self._detach(ws)
         return ws
 
+    def _handle_trigger_ack(self, raw: str):
+        """{"action": "ack", "id": ..., "status": "started" | "ended" | "error"}"""
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return
+        if isinstance(data, dict) and data.get("action") == "ack":
+            self.playback.ack(data.get("id"), data.get("status"))
+
     async def ws_chat_handler(self, request):
         ws = web.WebSocketResponse()
         await ws.prepare(request)
-        self.ws_chat.add(ws)
+        self.chat_filters[ws] = request.query.get("channel", "").strip().lower()
+        client = self._attach(ws, "chat", self.ws_chat)
+        client.batch = request.query.get("proto", "") == "batch"
         if self.latest_chat_config:
-            await ws.send_json({"type": "update_chat_styles", "payload": self.latest_chat_config})
+            client.push(json.dumps({"type": "update_chat_styles", "payload": self.latest_chat_config}))
+        self._send_chat_history(client, self.chat_filters[ws])
         try:
             async for msg in ws: pass
         finally:
-            self.ws_chat.discard(ws)
+            self._detach(ws)
+            self.chat_filters.pop(ws, None)
         return ws
 
     async def ws_alerts_handler(self, request):
         ws = web.WebSocketResponse()
         await ws.prepare(request)
-        self.ws_alerts.add(ws)
+        client = self._attach(ws, "alerts", self.ws_alerts)
+        if self.alert_history:
+            client.push('{"type": "history", "alerts": [' + ",".join(self.alert_history) + ']}')
         try:
             async for msg in ws: pass
         finally:
-            self.ws_alerts.discard(ws)
+            self._detach(ws)
         return ws
 
+    def _attach(self, ws: web.WebSocketResponse, room: str, target_set: Set[web.WebSocketResponse]) -> OverlayClient:
+        client = OverlayClient(ws, room, self.client_queue_max, self.slow_client_policy)
+        client.task = self.loop.create_task(client.writer())
+        self.clients[ws] = client
+        target_set.add(ws)
+        return client
+
+    def _detach(self, ws: web.WebSocketResponse):
+        for target_set in (self.ws_triggers, self.ws_chat, self.ws_alerts):
+            target_set.discard(ws)
+        client = self.clients.pop(ws, None)
+        if client and client.task and not client.task.done():
+            client.task.cancel()
+
     async def _broadcast(self, target_set: Set[web.WebSocketResponse], data: dict):
+        """Serializa una sola vez y reparte el frame a la cola de cada cliente (sin esperar a nadie)."""
         if not target_set: return
-        await asyncio.gather(
-            *(ws.send_json(data) for ws in target_set if not ws.closed),
-            return_exceptions=True
-        )
+        with OVERLAY_BROADCAST.time(room=self._rooms.get(id(target_set), "")):
+            self._fan_out(target_set, json.dumps(data))
+
+    def _fan_out(self, targets, frame: str):
+        for ws in list(targets):
+            client = self.clients.get(ws)
+            if client is None or ws.closed: continue
+            stats = self.room_stats[client.room]
+            stats["frames"] += 1
+            dropped = client.dropped
+            if not client.push(frame):
+                # Política "disconnect": el cliente no da abasto, se cierra y OBS reconecta
+                stats["disconnected"] += 1
+                stats["dropped"] += len(client.queue) + 1
+                self._detach(ws)
+                self.loop.create_task(ws.close(code=1008, message=b"Slow consumer"))
+                continue
+            stats["dropped"] += client.dropped - dropped
+
+    def get_broadcast_stats(self) -> dict:
+        """Por sala: clientes, frames en cola (total y máximo), frames difundidos, descartados y desconexiones."""
+        clients = list(self.clients.values())
+        stats = {}
+        for room in ROOMS:
+            lengths = [len(c.queue) for c in clients if c.room == room]
+            stats[room] = dict(self.room_stats[room]) | {
+                "clients": len(lengths), "queued": sum(lengths), "max_queue": max(lengths, default=0)
+            }
+        return stats
+
+    def _register_metrics(self):
+        """Los valores por sala se leen de room_stats y de las colas al pedir /metrics."""
+        def per_room(field):
+            return lambda: {(room,): stats[field] for room, stats in self.get_broadcast_stats().items()}
+        OVERLAY_CLIENTS.set_function(per_room("clients"))
+        OVERLAY_QUEUED.set_function(per_room("queued"))
+        OVERLAY_FRAMES.set_function(per_room("frames"))
+        OVERLAY_DROPPED.set_function(per_room("dropped"))
+        OVERLAY_DISCONNECTED.set_function(per_room("disconnected"))
 
     # =========================================================================
     # REGIÓN 5: API PÚBLICA DE DIFUSIÓN (LLAMADAS DESDE EL CONTROLLER)
@@ -188,14 +531,111 @@ class UnifiedOverlayWorker(QThread):
         data = {"action": action} | (payload or {})
         asyncio.run_coroutine_threadsafe(self._broadcast(self.ws_triggers, data), self.loop)
 
+    def play_media(self, payload: dict, cost: int = 0):
+        """Encola un trigger en el planificador; se envía cuando hay hueco para su tipo de medio."""
+        if not self.is_active or not self.loop: return
+        self.loop.call_soon_threadsafe(self.playback.enqueue, payload, cost)
+
+    def _send_playback(self, data: dict):
+        """Reparte play_media a la sala de triggers; devuelve (overlays con ack, overlays totales)."""
+        targets = [ws for ws in self.ws_triggers if not ws.closed and ws in self.clients]
+        if targets:
+            with OVERLAY_BROADCAST.time(room="triggers"):
+                self._fan_out(targets, json.dumps(data))
+        return sum(1 for ws in targets if self.clients[ws].acks), len(targets)
+
     # --- CHAT ---
     def send_chat_message_to_overlay(self, sender, content, badges=None, user_color=None, timestamp=""):
-        if not self.loop: return
-        payload = {
-            "type": "new_message",
-            "payload": {"sender": sender, "content": content, "badges": badges or [], "color": user_color, "timestamp": timestamp}
-        }
-        asyncio.run_coroutine_threadsafe(self._broadcast(self.ws_chat, payload), self.loop)
+        self.send_chat_batch_to_overlay([{"sender": sender, "content": content, "badges": badges,
+                                          "user_color": user_color, "timestamp": timestamp}])
+
+    def send_chat_batch_to_overlay(self, messages: list):
+        """
+        Acumula mensajes en la ventana de agrupado; el primero de cada ventana programa el volcado,
+        así que hay un solo salto al loop del servidor por ventana y no por mensaje.
+        """
+        if not self.loop or not messages: return
+        main_channel = (self.db.get("kick_username") or "").lower()
+        payloads = [
+            {"type": "new_message",
+             "payload": {"sender": m["sender"], "content": m["content"], "badges": m.get("badges") or [],
+                         "color": m.get("user_color"), "timestamp": m.get("timestamp", ""),
+                         "channel": m.get("channel") or main_channel}}
+            for m in messages
+        ]
+        with self._chat_lock:
+            self._chat_pending.extend(payloads)
+            self._chat_main_channel = main_channel
+            if self._chat_flush_scheduled: return
+            self._chat_flush_scheduled = True
+        self.loop.call_soon_threadsafe(self.loop.call_later, self.chat_batch_window, self._flush_chat)
+
+    def _flush_chat(self):
+        with self._chat_lock:
+            payloads, self._chat_pending = self._chat_pending, []
+            main_channel = self._chat_main_channel
+            self._chat_flush_scheduled = False
+        self._broadcast_chat(payloads, main_channel)
+
+    def _broadcast_chat(self, payloads: list, main_channel: str):
+        """
+        Entrega cada mensaje solo a los overlays cuyo filtro de canal coincide: un frame 'batch'
+        por filtro para los overlays que lo soportan y un frame por mensaje para los antiguos.
+        Cada mensaje se serializa una sola vez; los frames se arman concatenando esos JSON,
+        que también quedan en el historial para los overlays que se conecten después.
+        """
+        if not payloads: return
+        with OVERLAY_BROADCAST.time(room="chat"):
+            self._broadcast_chat_frames(payloads, main_channel)
+
+    def _broadcast_chat_frames(self, payloads: list, main_channel: str):
+        messages = [(data["payload"]["channel"], json.dumps(data["payload"])) for data in payloads]
+        self.chat_history.extend(messages)
+        if not self.ws_chat: return
+
+        selected, batch_frames, single_frames = {}, {}, {}
+        for ws in list(self.ws_chat):
+            client = self.clients.get(ws)
+            if client is None: continue
+            chat_filter = self.chat_filters.get(ws, "")
+            if chat_filter not in selected:
+                selected[chat_filter] = [i for i, (channel, _) in enumerate(messages) if self._chat_matches(chat_filter, channel, main_channel)]
+            indexes = selected[chat_filter]
+            if not indexes: continue
+
+            if client.batch:
+                if chat_filter not in batch_frames:
+                    batch_frames[chat_filter] = self._chat_batch_frame(messages[i][1] for i in indexes)
+                self._fan_out([ws], batch_frames[chat_filter])
+            else:
+                for i in indexes:
+                    if i not in single_frames:
+                        single_frames[i] = self._chat_single_frame(messages[i][1])
+                    self._fan_out([ws], single_frames[i])
+
+    def _send_chat_history(self, client: OverlayClient, chat_filter: str):
+        """El overlay recién conectado recibe los últimos mensajes de su canal sin pasar por el controller."""
+        main_channel = self._chat_main_channel or (self.db.get("kick_username") or "").lower()
+        history = [msg for channel, msg in self.chat_history if self._chat_matches(chat_filter, channel, main_channel)]
+        if not history: return
+        if client.batch:
+            client.push(self._chat_batch_frame(history, history=True))
+        else:
+            for msg in history:
+                client.push(self._chat_single_frame(msg))
+
+    @staticmethod
+    def _chat_matches(chat_filter: str, channel: str, main_channel: str) -> bool:
+        return chat_filter in ("all", channel) or (not chat_filter and channel == main_channel)
+
+    @staticmethod
+    def _chat_batch_frame(serialized_messages, history: bool = False) -> str:
+        head = '{"type": "batch", "history": true, "messages": [' if history else '{"type": "batch", "messages": ['
+        return head + ",".join(serialized_messages) + "]}"
+
+    @staticmethod
+    def _chat_single_frame(serialized_message: str) -> str:
+        return '{"type": "new_message", "payload": ' + serialized_message + "}"
 
     def update_chat_styles(self, style_dict):
         if not self.loop: return
@@ -212,9 +652,15 @@ class UnifiedOverlayWorker(QThread):
             "type": "new_alert",
             "payload": {"alert_type": alert_type, "title": title, "message": message, "color": color, 
                         "image_url": image_url, "sound_url": sound_url, "duration": duration, 
-                        "layout_style": layout_style, "animation": animation}
+                        "layout_style": layout_style, "animation": animation, "sent_at": int(time.time() * 1000)}
         }
-        asyncio.run_coroutine_threadsafe(self._broadcast(self.ws_alerts, payload), self.loop)
+        asyncio.run_coroutine_threadsafe(self._broadcast_alert(payload), self.loop)
+
+    async def _broadcast_alert(self, data: dict):
+        with OVERLAY_BROADCAST.time(room="alerts"):
+            self.alert_history.append(json.dumps(data["payload"]))
+            if self.ws_alerts:
+                self._fan_out(self.ws_alerts, '{"type": "new_alert", "payload": ' + self.alert_history[-1] + "}")
     # --- Triggers, Chat y Alertas comparten el mismo método de broadcast pero con sets de WebSockets separados. ---
     def _get_asset_path(self, filename: str) -> Path:
         if hasattr(sys, '_MEIPASS'): 
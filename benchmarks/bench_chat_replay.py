@@ -0,0 +1,399 @@
+# benchmarks/bench_chat_replay.py
+"""
+Carga de chat de extremo a extremo: un servidor Pusher falso (local, sin red) reproduce
+eventos App\\Events\\ChatMessageEvent hacia KickChatManager al ritmo indicado y se mide
+la latencia desde que el socket recibe el mensaje hasta que el UnifiedOverlayWorker lo
+difunde (cliente /ws/chat) y hasta que la GUI recibe la fila (señal en el hilo principal).
+También cuenta los COMMIT del escritor SQLite y la profundidad máxima de las colas.
+
+El pipeline del ChatProcessingWorker replica el camino caliente de
+MainController.process_chat_batch (antibot, puntos, comandos, color, overlay) sin TTS
+ni Spotify, para poder correr sin esas dependencias.
+
+Uso:  python -m benchmarks.bench_chat_replay [--rates 100 1000 5000] [--seconds 5]
+                                             [--users 2000] [--replay grabacion.jsonl]
+
+--replay acepta un JSONL con frames de Pusher ({"event", "channel", "data"}) o con el
+'data' ya decodificado; solo se usan los ChatMessageEvent y se reproducen en bucle.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal, pyqtSlot
+
+from backend.core.db_controller import DBHandler
+from backend.core.kick.chat_manager import KickChatManager
+from backend.handlers.antibot_handler import AntibotHandler
+from backend.handlers.chat_handler import ChatHandler
+from backend.services.commands_service import CommandsService
+from backend.workers import unified_server
+from backend.workers.chat_worker import ChatProcessingWorker
+from backend.workers.unified_server import UnifiedOverlayWorker
+
+STREAMER = "benchstreamer"
+CHATROOM_ID = 424242
+LEDGER_FLUSH_MS = 500
+IDLE_TIMEOUT_S = 3.0
+
+# =========================================================================
+# CARGA: MENSAJES SINTÉTICOS O GRABADOS
+# =========================================================================
+def _synthetic_messages(n_users: int):
+    """Mezcla parecida a un chat real: texto, emotes, comandos y algunos suscriptores."""
+    texts = ["hola a todos", "jajaja", "[emote:37226:KEKW] [emote:37226:KEKW]", "que buena jugada",
+             "!puntos", "!color azul", "gg", "alguien sabe la canción?", "[emote:39261:catJAM]", "F"]
+    messages = []
+    for i in range(max(1, n_users)):
+        badges = [{"type": "subscriber", "text": "Subscriber"}] if i % 7 == 0 else []
+        messages.append({"content": random.choice(texts),
+                         "sender": {"username": f"viewer{i}", "identity": {"badges": badges}}})
+    return messages
+
+def _load_replay(path: str):
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            obj = json.loads(line)
+            if "event" in obj:
+                if obj["event"] != "App\\Events\\ChatMessageEvent": continue
+                obj = json.loads(obj.get("data") or "{}")
+            if obj.get("content") and obj.get("sender"):
+                messages.append(obj)
+    return messages
+
+def _build_frames(templates, total: int):
+    """Frames ya serializados; el contenido lleva '#<seq> ' delante para seguir cada mensaje."""
+    frames = []
+    for seq in range(total):
+        data = dict(templates[seq % len(templates)])
+        data["content"] = f"#{seq} {data['content']}"
+        frames.append(json.dumps({"event": "App\\Events\\ChatMessageEvent",
+                                  "channel": f"chatrooms.{CHATROOM_ID}.v2", "data": json.dumps(data)}))
+    return frames
+
+def _seq_of(content: str) -> int:
+    return int(content.split(" ", 1)[0].lstrip("#"))
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# =========================================================================
+# SERVIDOR PUSHER FALSO Y CLIENTE DEL OVERLAY (HILO DEL ARNÉS)
+# =========================================================================
+class Harness:
+    """Loop asyncio propio: sirve el Pusher falso y escucha /ws/chat del overlay."""
+    def __init__(self, frames, rate: int, overlay_port: int):
+        self.frames = frames
+        self.rate = rate
+        self.overlay_port = overlay_port
+        self.pusher_port = _free_port()
+        self.loop = asyncio.new_event_loop()
+        self.overlay_seen = {}
+        self.sent = 0
+        self.send_started = 0.0
+        self.send_finished = 0.0
+        self.done_sending = threading.Event()
+        self.ready = threading.Event()
+        self._runner = None
+        self._client = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.ready.wait(10)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(10)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/app/{key}", self._pusher_handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.pusher_port).start()
+
+        self._client = aiohttp.ClientSession()
+        ws = await self._client.ws_connect(f"http://127.0.0.1:{self.overlay_port}/ws/chat?proto=batch")
+        self.loop.create_task(self._overlay_reader(ws))
+
+    async def _shutdown(self):
+        if self._client: await self._client.close()
+        if self._runner: await self._runner.cleanup()
+
+    async def _overlay_reader(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT: continue
+            now = time.perf_counter()
+            data = json.loads(msg.data)
+            if data.get("type") == "batch":
+                for payload in data["messages"]:
+                    self.overlay_seen[_seq_of(payload["content"])] = now
+            elif data.get("type") == "new_message":
+                self.overlay_seen[_seq_of(data["payload"]["content"])] = now
+
+    async def _pusher_handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"event": "pusher:connection_established",
+                            "data": json.dumps({"socket_id": "1.1", "activity_timeout": 120})})
+        replay = None
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT: continue
+            data = json.loads(msg.data)
+            if data.get("event") == "pusher:ping":
+                await ws.send_json({"event": "pusher:pong", "data": {}})
+            elif data.get("event") == "pusher:subscribe":
+                channel = data["data"]["channel"]
+                await ws.send_json({"event": "pusher_internal:subscription_succeeded", "channel": channel, "data": "{}"})
+                if channel.startswith("chatrooms.") and replay is None:
+                    replay = self.loop.create_task(self._replay(ws))
+        if replay: replay.cancel()
+        return ws
+
+    async def _replay(self, ws):
+        """Envía los frames a ritmo constante, en ráfagas cada ~2 ms para no depender del timer."""
+        self.send_started = time.perf_counter()
+        total = len(self.frames)
+        while self.sent < total:
+            due = min(total, int((time.perf_counter() - self.send_started) * self.rate) + 1)
+            while self.sent < due:
+                await ws.send_str(self.frames[self.sent])
+                self.sent += 1
+            await asyncio.sleep(0.002)
+        self.send_finished = time.perf_counter()
+        self.done_sending.set()
+
+# =========================================================================
+# BOT: KickChatManager REAL CON MARCA DE RECEPCIÓN
+# =========================================================================
+class TimedChatManager(KickChatManager):
+    """Anota el instante de recepción de cada mensaje justo tras decodificar el frame."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = {}
+
+    def _parse_message(self, chat_data, channel=""):
+        self.received[_seq_of(chat_data.get("content", "#-1"))] = time.perf_counter()
+        super()._parse_message(chat_data, channel)
+
+class BotThread(threading.Thread):
+    def __init__(self, pusher_port: int, batch_callback, latency_ms: int, batch_max: int):
+        super().__init__(daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.pusher_port = pusher_port
+        self.batch_callback = batch_callback
+        self.latency_ms = latency_ms
+        self.batch_max = batch_max
+        self.manager = None
+        self.ready = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _start(self):
+        self.session = aiohttp.ClientSession()
+        self.manager = TimedChatManager(self.session, self.loop, lambda msg: None, self.batch_callback,
+                                        batch_latency_ms=self.latency_ms, batch_max=self.batch_max)
+        self.manager.pusher_url = f"http://127.0.0.1:{self.pusher_port}/app/bench?protocol=7"
+        await self.manager.connect(CHATROOM_ID, STREAMER)
+
+    def stop(self):
+        async def _close():
+            await self.manager.disconnect()
+            await self.session.close()
+        asyncio.run_coroutine_threadsafe(_close(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(10)
+
+# =========================================================================
+# PIPELINE (HILO DEL CHAT WORKER) Y RECEPTOR DE LA GUI (HILO PRINCIPAL)
+# =========================================================================
+class BenchPipeline(QObject):
+    """Mismo recorrido que MainController.process_chat_batch, sin TTS ni música."""
+    chat_batch_signal = pyqtSignal(list)
+
+    def __init__(self, db, overlay):
+        super().__init__()
+        self.db = db
+        self.overlay = overlay
+        self.antibot = AntibotHandler(db)
+        self.chat_handler = ChatHandler(db)
+        self.cmd_service = CommandsService(db)
+        self.overlay_sent = 0
+
+    def process_chat_batch(self, messages):
+        ui_rows, overlay_msgs = [], []
+        for user, content, badges, timestamp, channel in messages:
+            msg_lower = content.split(" ", 1)[-1].strip().lower()
+            if self.antibot.check_user(user, lambda u: None, lambda m: None):
+                continue
+            ui_rows.append((timestamp, user, self.chat_handler.format_for_ui(content), ""))
+            self.chat_handler.process_points(user, msg_lower, badges)
+
+            if not self.chat_handler.is_bot(user) and not self.chat_handler.should_ignore_user(user):
+                trigger = msg_lower.split(" ", 1)[0]
+                if msg_lower.startswith("!") and (self.cmd_service.can_execute(trigger, user)[1] or trigger == "!puntos"):
+                    continue
+                if trigger == "!color":
+                    self.db.set_user_color(user, "#1E90FF")
+                    continue
+
+            user_color = self.db.get_user_color(user)
+            if not user_color:
+                user_color = "#{:06x}".format(random.randint(0, 0xFFFFFF))
+                self.db.set_user_color(user, user_color)
+            overlay_msgs.append({"sender": user, "content": content, "badges": badges,
+                                 "user_color": user_color, "timestamp": timestamp, "channel": channel})
+
+        if ui_rows:
+            self.chat_batch_signal.emit(ui_rows)
+        if overlay_msgs:
+            self.overlay_sent += len(overlay_msgs)
+            self.overlay.send_chat_batch_to_overlay(overlay_msgs)
+
+class UiSink(QObject):
+    """Vive en el hilo principal: la señal llega encolada igual que a MainWindow.append_chat_messages."""
+    def __init__(self):
+        super().__init__()
+        self.seen = {}
+
+    @pyqtSlot(list)
+    def on_rows(self, rows):
+        now = time.perf_counter()
+        for row in rows:
+            self.seen[_seq_of(row[2])] = now
+
+# =========================================================================
+# EJECUCIÓN DE UNA TASA
+# =========================================================================
+def _percentiles_ms(received: dict, arrived: dict):
+    samples = sorted((arrived[s] - received[s]) * 1000 for s in arrived if s in received)
+    if not samples: return 0.0, 0.0
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+def run_rate(app, templates, rate: int, seconds: float, args) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kickmonitor_chat_bench_"), f"bench_{rate}.db")
+    db = DBHandler(db_path)
+    db.set("kick_username", STREAMER)
+
+    commits = [0]
+    def _trace(sql):
+        if sql.strip().upper().startswith("COMMIT"): commits[0] += 1
+    db.conn_handler.conn.set_trace_callback(_trace)
+
+    unified_server.SERVER_PORT = _free_port()
+    overlay = UnifiedOverlayWorker(db)
+    overlay.start()
+    while overlay.site is None: time.sleep(0.01)
+
+    pipeline = BenchPipeline(db, overlay)
+    sink = UiSink()
+    pipeline.chat_batch_signal.connect(sink.on_rows)
+    worker = ChatProcessingWorker(pipeline.process_chat_batch)
+    worker.start()
+
+    ledger_timer = QTimer()
+    ledger_timer.timeout.connect(db.flush_economy)
+    ledger_timer.start(LEDGER_FLUSH_MS)
+
+    harness = Harness(_build_frames(templates, int(rate * seconds)), rate, unified_server.SERVER_PORT)
+    harness.start()
+    commits[0] = 0
+    bot = BotThread(harness.pusher_port, worker.submit_batch, args.batch_latency_ms, args.batch_max)
+    bot.start()
+    bot.ready.wait(10)
+
+    # El hilo principal hace de GUI: procesa señales y muestrea las colas
+    max_bot_queue = 0
+    last_progress, last_count = time.perf_counter(), -1
+    while True:
+        app.processEvents()
+        max_bot_queue = max(max_bot_queue, bot.manager.message_queue.qsize())
+        count = len(sink.seen) + len(harness.overlay_seen)
+        now = time.perf_counter()
+        if count != last_count:
+            last_progress, last_count = now, count
+        finished = harness.done_sending.is_set() and len(sink.seen) + worker.dropped >= harness.sent \
+            and len(harness.overlay_seen) >= pipeline.overlay_sent
+        if finished or now - last_progress > IDLE_TIMEOUT_S:
+            break
+        time.sleep(0.001)
+
+    ledger_timer.stop()
+    db.flush_economy()
+    bot.stop()
+    harness.stop()
+    worker.stop()
+    overlay.stop()
+    db.close()
+
+    received = bot.manager.received
+    send_time = (harness.send_finished or time.perf_counter()) - harness.send_started
+    overlay_p50, overlay_p99 = _percentiles_ms(received, harness.overlay_seen)
+    ui_p50, ui_p99 = _percentiles_ms(received, sink.seen)
+    return {
+        "rate": rate, "achieved": harness.sent / send_time if send_time > 0 else 0.0,
+        "sent": harness.sent, "received": len(received), "ui": len(sink.seen), "overlay": len(harness.overlay_seen),
+        "dropped": worker.dropped, "overlay_p50": overlay_p50, "overlay_p99": overlay_p99,
+        "ui_p50": ui_p50, "ui_p99": ui_p99, "commits": commits[0],
+        "max_worker_q": worker.max_depth, "max_bot_q": max_bot_queue,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--replay", default="", help="JSONL con frames o payloads de ChatMessageEvent")
+    parser.add_argument("--batch-latency-ms", type=int, default=25)
+    parser.add_argument("--batch-max", type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(7)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QCoreApplication.instance() or QCoreApplication([])
+    templates = _load_replay(args.replay) if args.replay else _synthetic_messages(args.users)
+    if not templates:
+        raise SystemExit(f"[BENCH_ERROR] {args.replay} no contiene ChatMessageEvent")
+
+    results = [run_rate(app, templates, rate, args.seconds, args) for rate in args.rates]
+
+    origin = os.path.basename(args.replay) if args.replay else f"{args.users:,} usuarios sintéticos"
+    print(f"Replay de chat: {origin}, {args.seconds:g}s por tasa, lote {args.batch_latency_ms} ms / {args.batch_max}")
+    print(f"{'msg/s':>7}{'real':>8}{'enviados':>10}{'GUI':>8}{'overlay':>9}{'desc.':>7}"
+          f"{'overlay p50/p99 ms':>21}{'GUI p50/p99 ms':>18}{'COMMIT':>8}{'cola chat':>11}{'cola bot':>10}")
+    for r in results:
+        print(f"{r['rate']:>7}{r['achieved']:>8.0f}{r['sent']:>10}{r['ui']:>8}{r['overlay']:>9}{r['dropped']:>7}"
+              f"{r['overlay_p50']:>12.1f}/{r['overlay_p99']:<8.1f}{r['ui_p50']:>9.1f}/{r['ui_p99']:<8.1f}"
+              f"{r['commits']:>8}{r['max_worker_q']:>11}{r['max_bot_q']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_db_indexes.py
+"""
+Benchmark de consultas de economía/triggers con 100k espectadores, antes y después
+de la migración de índices (backend/database/migrations.py).
+
+Uso:  python -m benchmarks.bench_db_indexes [--users 100000] [--triggers 5000] [--runs 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.core.db_controller import DBHandler
+from backend.database.migrations import run_migrations, _create_indexes
+
+QUERIES = [
+    ("add_points_periodic", "UPDATE data_users SET points = points + 20 WHERE last_seen >= datetime('now', '-10 minutes') AND is_paused = 0", ()),
+    ("get_all_users_points", "SELECT username, points, last_seen, is_paused, is_muted, role, color FROM data_users ORDER BY points DESC", ()),
+    ("top_100_points", "SELECT username, points FROM data_users ORDER BY points DESC LIMIT 100", ()),
+    ("delete_triggers_by_filename", "DELETE FROM triggers WHERE filename = ?", ("clip_2500.mp4",)),
+    ("update_active_state", "UPDATE triggers SET is_active = 0 WHERE filename = ?", ("clip_4000.mp4",)),
+]
+
+def _populate(conn, n_users: int, n_triggers: int, active: int):
+    now = datetime.now(timezone.utc)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    users = []
+    for i in range(n_users):
+        # Unos pocos activos en la ventana de 10 min, el resto vistos hace días
+        age = timedelta(minutes=random.randint(0, 9)) if i < active else timedelta(days=random.randint(1, 365))
+        users.append((f"viewer_{i}", random.randint(0, 500000), (now - age).strftime(fmt)))
+    conn.executemany("INSERT INTO data_users (username, points, last_seen) VALUES (?, ?, ?)", users)
+    conn.executemany(
+        "INSERT INTO triggers (command, filename, type, path) VALUES (?, ?, 'video', '')",
+        [(f"!reward_{i}", f"clip_{i}.mp4") for i in range(n_triggers)]
+    )
+    conn.commit()
+
+def _measure(conn, runs: int) -> dict:
+    results = {}
+    for name, sql, params in QUERIES:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+            conn.rollback()  # Las escrituras no se aplican: cada corrida ve los mismos datos
+        results[name] = statistics.median(samples)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--triggers", type=int, default=5_000)
+    parser.add_argument("--active", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(7)
+    path = os.path.join(tempfile.mkdtemp(prefix="kickmonitor_bench_"), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for table, schema in DBHandler.TABLE_SCHEMAS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({schema})")
+    _populate(conn, args.users, args.triggers, args.active)
+
+    before = _measure(conn, args.runs)
+    _create_indexes(conn.cursor()); conn.commit()
+    after = _measure(conn, args.runs)
+    version = run_migrations(conn)
+
+    print(f"{args.users:,} usuarios, {args.triggers:,} triggers, {args.active} activos (mediana de {args.runs} corridas, schema v{version})")
+    print(f"{'consulta':<30}{'sin índice':>12}{'con índice':>12}{'speedup':>10}")
+    for name, _, _ in QUERIES:
+        b, a = before[name], after[name]
+        print(f"{name:<30}{b:>10.2f}ms{a:>10.2f}ms{b / a if a else 0:>9.1f}x")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
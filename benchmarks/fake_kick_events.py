@@ -0,0 +1,126 @@
+# benchmarks/fake_kick_events.py
+"""
+Emisor local de webhooks de Kick: firma eventos channel.reward.redemption.updated como lo
+hace Kick (RSA PKCS#1 v1.5 + SHA-256 sobre "<message_id>.<timestamp>.<body>") y los envía
+al receptor del UnifiedOverlayWorker, para probar canjes sin túnel ni cuenta real.
+
+Uso:
+  1) python -m benchmarks.fake_kick_events keygen --key kick_test_key.pem [--db kick_data.db]
+     Genera el par de claves y guarda la pública en kick_webhook_public_key (con la app cerrada,
+     o pégala en la configuración: el servidor la recarga al cambiar el ajuste).
+  2) python -m benchmarks.fake_kick_events send --key kick_test_key.pem --reward "Susto"
+                                           [--user tester] [--input ""] [--count 1] [--rate 5]
+                                           [--status pending] [--replay] [--bad-signature]
+
+--replay reenvía el mismo message id (debe contarse como duplicado) y --bad-signature firma
+con otra clave (debe responder 401). Requiere el paquete 'cryptography'.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+import aiohttp
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from backend.services.kick_events import EVENT_REDEMPTION
+
+DEFAULT_URL = "http://127.0.0.1:8081/webhooks/kick"
+
+def keygen(args):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(args.key, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    public_pem = key.public_key().public_bytes(serialization.Encoding.PEM,
+                                               serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    if args.db:
+        from backend.core.db_controller import DBHandler
+        DBHandler(args.db).set("kick_webhook_public_key", public_pem)
+        print(f"Clave pública guardada en {args.db} (kick_webhook_public_key)")
+    print(public_pem)
+
+def build_event(args, index: int) -> dict:
+    return {
+        "id": uuid.uuid4().hex.upper()[:26],
+        "user_input": args.input,
+        "status": args.status,
+        "redeemed_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "reward": {"id": "TEST-REWARD", "title": args.reward, "cost": args.cost, "description": "Evento de prueba"},
+        "redeemer": {"user_id": 1000 + index, "username": f"{args.user}{index or ''}", "is_verified": False},
+        "broadcaster": {"user_id": 1, "username": "kickmonitor", "is_verified": False},
+    }
+
+def sign(key, message_id: str, timestamp: str, body: bytes) -> str:
+    signature = key.sign(f"{message_id}.{timestamp}.".encode() + body, padding.PKCS1v15(), hashes.SHA256())
+    return base64.b64encode(signature).decode()
+
+async def send(args):
+    with open(args.key, "rb") as f:
+        key = serialization.load_pem_private_key(f.read(), password=None)
+    if args.bad_signature:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    latencies, statuses = [], {}
+    async with aiohttp.ClientSession() as session:
+        message_id = None
+        for index in range(args.count):
+            body = json.dumps(build_event(args, index)).encode()
+            if not (args.replay and message_id):
+                message_id = uuid.uuid4().hex
+            timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            headers = {
+                "Content-Type": "application/json",
+                "Kick-Event-Message-Id": message_id,
+                "Kick-Event-Subscription-Id": "TEST-SUBSCRIPTION",
+                "Kick-Event-Message-Timestamp": timestamp,
+                "Kick-Event-Signature": sign(key, message_id, timestamp, body),
+                "Kick-Event-Type": EVENT_REDEMPTION,
+                "Kick-Event-Version": "1",
+            }
+            started = time.perf_counter()
+            async with session.post(args.url, data=body, headers=headers) as resp:
+                await resp.read()
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            if args.rate > 0 and index + 1 < args.count:
+                await asyncio.sleep(1 / args.rate)
+
+    latencies.sort()
+    print(f"Enviados: {args.count}  respuestas: {statuses}")
+    print(f"Latencia HTTP p50 {latencies[len(latencies) // 2]:.1f} ms  máx {latencies[-1]:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_keygen = sub.add_parser("keygen")
+    p_keygen.add_argument("--key", default="kick_test_key.pem")
+    p_keygen.add_argument("--db", default="", help="Base de datos donde guardar la clave pública")
+
+    p_send = sub.add_parser("send")
+    p_send.add_argument("--key", default="kick_test_key.pem")
+    p_send.add_argument("--url", default=DEFAULT_URL)
+    p_send.add_argument("--reward", required=True)
+    p_send.add_argument("--cost", type=int, default=100)
+    p_send.add_argument("--user", default="tester")
+    p_send.add_argument("--input", default="")
+    p_send.add_argument("--status", default="pending", choices=["pending", "accepted", "rejected"])
+    p_send.add_argument("--count", type=int, default=1)
+    p_send.add_argument("--rate", type=float, default=5.0, help="Eventos por segundo (0 = sin pausa)")
+    p_send.add_argument("--replay", action="store_true", help="Reutiliza el mismo message id")
+    p_send.add_argument("--bad-signature", action="store_true", help="Firma con una clave distinta")
+
+    args = parser.parse_args()
+    if args.command == "keygen":
+        keygen(args)
+    else:
+        asyncio.run(send(args))
+
+if __name__ == "__main__":
+    main()
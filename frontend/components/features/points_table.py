@@ -0,0 +1,263 @@
+# frontend/components/features/points_table.py
+
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, QRect, pyqtSignal
+from PyQt6.QtGui import QColor, QPen, QBrush, QPixmap
+
+from frontend.theme import THEME_DARK, asset_url
+from frontend.utils import get_icon, get_icon_colored
+
+ROLE_SVGS = {
+    "broadcaster": "video.svg",
+    "moderator": "shield.svg",
+    "vip": "star.svg",
+    "subscriber": "heart.svg",
+    "bot": "bot.svg",
+    "user": "user.svg"
+}
+
+ROLE_COLORS = {
+    "broadcaster": "#FF4500",
+    "moderator": "#53fc18",
+    "vip": "#FF69B4",
+    "subscriber": "#FFD700",
+    "bot": "#00FFFF",
+    "user": "#FFFFFF"
+}
+
+# =========================================================================
+# MODELO: PÁGINAS DE data_users LEÍDAS BAJO DEMANDA
+# =========================================================================
+class PointsTableModel(QAbstractTableModel):
+    """
+    Modelo virtual de la tabla de usuarios. Búsqueda, filtro, orden y paginación
+    se resuelven en SQL; la vista solo pide las filas que va a pintar (fetchMore)
+    y los refrescos releen solo la primera página: si el orden no cambió se repintan las filas
+    modificadas; si cambió, se reinicia el modelo.
+    """
+    HEADERS = ["Usuario", "Color", "Puntos", "Visto", "Pausar", "Silenciar", "Acción"]
+    COL_USER, COL_COLOR, COL_POINTS, COL_SEEN, COL_PAUSE, COL_MUTE, COL_ACTION = range(7)
+    SORT_KEYS = {0: "username", 1: "color", 2: "points", 3: "last_seen", 4: "is_paused", 5: "is_muted"}
+    CHUNK = 200
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.search_text = ""
+        self.filter_mode = "Todos"
+        self.order_by = "points"
+        self.descending = True
+        self._rows = []
+        self._total = 0
+        self._icons = {}
+
+    # --- Consultas -------------------------------------------------------
+    def _query(self, limit, offset):
+        rows = self.service.get_users_page(self.search_text, self.filter_mode, self.order_by, self.descending, limit, offset)
+        return [self._normalize(r) for r in rows]
+
+    @staticmethod
+    def _normalize(row):
+        user, points, last_seen, is_paused, is_muted, role, chat_color = tuple(row)
+        clean_role = str(role).lower().strip() if role else "user"
+        if clean_role == "bot":
+            is_paused, is_muted = True, True
+        return (user, points or 0, str(last_seen or "").split(".")[0], bool(is_paused), bool(is_muted), clean_role, chat_color or "")
+
+    def reload(self):
+        """Reinicia desde la primera página (cambio de búsqueda, filtro u orden)."""
+        self.beginResetModel()
+        self._total = self.service.count_users(self.search_text, self.filter_mode)
+        self._rows = self._query(self.CHUNK, 0)
+        self.endResetModel()
+
+    def refresh(self):
+        """Relee la primera página (no todo lo cargado) y aplica los cambios sin mover la vista."""
+        self._total = self.service.count_users(self.search_text, self.filter_mode)
+        fresh = self._query(self.CHUNK, 0)
+        head = self._rows[:self.CHUNK]
+        old_keys = [r[0] for r in head]
+        new_keys = [r[0] for r in fresh]
+        shared = min(len(head), len(fresh))
+
+        # Cambió el orden (o hay altas/bajas en medio, o por encima de la página): reinicio completo
+        if old_keys[:shared] != new_keys[:shared] or (len(self._rows) > self.CHUNK and len(fresh) < self.CHUNK):
+            return self.reload()
+        # Altas o bajas al final de lo cargado, que aquí cabe entero en la primera página
+        if len(fresh) != len(head):
+            if len(fresh) < len(head):
+                self.beginRemoveRows(QModelIndex(), shared, len(head) - 1)
+                del self._rows[shared:]
+                self.endRemoveRows()
+            else:
+                self.beginInsertRows(QModelIndex(), shared, len(fresh) - 1)
+                self._rows.extend(fresh[shared:])
+                self.endInsertRows()
+
+        last_col = self.columnCount() - 1
+        for row in range(shared):
+            if self._rows[row] != fresh[row]:
+                self._rows[row] = fresh[row]
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
+
+    def set_query(self, search_text=None, filter_mode=None):
+        if search_text is not None: self.search_text = search_text.lower().strip()
+        if filter_mode is not None: self.filter_mode = filter_mode
+        self.reload()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid(): return
+        more = self._query(self.CHUNK, len(self._rows))
+        if not more:
+            self._total = len(self._rows)
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(more) - 1)
+        self._rows.extend(more)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        key = self.SORT_KEYS.get(column)
+        if not key: return
+        self.order_by = key
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    # --- Interfaz Qt -----------------------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def username_at(self, row):
+        return self._rows[row][0] if 0 <= row < len(self._rows) else None
+
+    def is_bot(self, row):
+        return self._rows[row][5] == "bot"
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        if index.column() in (self.COL_PAUSE, self.COL_MUTE) and self.is_bot(index.row()):
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        user, points, last_seen, is_paused, is_muted, clean_role, chat_color = self._rows[index.row()]
+        col = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == self.COL_USER: return user
+            if col == self.COL_POINTS: return f"{points:,}"
+            if col == self.COL_SEEN: return last_seen
+            return None
+        if role == Qt.ItemDataRole.UserRole:
+            if col == self.COL_COLOR: return chat_color
+            if col == self.COL_PAUSE: return is_paused
+            if col == self.COL_MUTE: return is_muted
+            return None
+        if role == Qt.ItemDataRole.DecorationRole and col == self.COL_USER:
+            svg_name = ROLE_SVGS.get(clean_role, "user.svg")
+            if svg_name not in self._icons:
+                self._icons[svg_name] = get_icon(svg_name)
+            return self._icons[svg_name]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if col == self.COL_USER: return QColor(ROLE_COLORS.get(clean_role, "#FFFFFF"))
+            if col == self.COL_POINTS: return QColor(Qt.GlobalColor.green)
+            if col == self.COL_SEEN: return QColor(Qt.GlobalColor.gray)
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if col == self.COL_USER: return Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if col == self.COL_PAUSE: return "Pausar obtención de puntos"
+            if col == self.COL_MUTE: return "Silenciar en TTS"
+        return None
+
+    def update_flag(self, row, column, value):
+        """Refleja en memoria un cambio hecho por la UI sin esperar al siguiente refresco."""
+        pos = {self.COL_PAUSE: 3, self.COL_MUTE: 4}[column]
+        data = list(self._rows[row])
+        data[pos] = bool(value)
+        self._rows[row] = tuple(data)
+        idx = self.index(row, column)
+        self.dataChanged.emit(idx, idx)
+
+# =========================================================================
+# DELEGADOS: SE PINTAN EN LUGAR DE CREAR UN WIDGET POR CELDA
+# =========================================================================
+class ColorDotDelegate(QStyledItemDelegate):
+    """Círculo con el color de chat del usuario."""
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        color = index.data(Qt.ItemDataRole.UserRole)
+        rect = QRect(0, 0, 16, 16)
+        rect.moveCenter(option.rect.center())
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor("#555555"), 1))
+        painter.setBrush(QBrush(QColor(color)) if color else Qt.BrushStyle.NoBrush)
+        painter.drawEllipse(rect)
+        painter.restore()
+
+class ClickableIconDelegate(QStyledItemDelegate):
+    """Base para celdas que se comportan como botón: emite clicked(fila) al soltar el ratón."""
+    clicked = pyqtSignal(int)
+    ICON_SIZE = 21
+
+    def _pixmap(self, index, option) -> QPixmap:
+        raise NotImplementedError
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        pix = self._pixmap(index, option)
+        if pix is None or pix.isNull(): return
+        rect = QRect(0, 0, self.ICON_SIZE, self.ICON_SIZE)
+        rect.moveCenter(option.rect.center())
+        painter.save()
+        if not (index.flags() & Qt.ItemFlag.ItemIsEnabled):
+            painter.setOpacity(0.4)
+        painter.drawPixmap(rect, pix)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if not (index.flags() & Qt.ItemFlag.ItemIsEnabled):
+            return False
+        if event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            rect = QRect(0, 0, self.ICON_SIZE + 8, self.ICON_SIZE + 8)
+            rect.moveCenter(option.rect.center())
+            if rect.contains(event.position().toPoint()):
+                self.clicked.emit(index.row())
+                return True
+        return False
+
+class SwitchDelegate(ClickableIconDelegate):
+    """Interruptor on/off equivalente a create_switch_widget, pintado a partir de los mismos SVG."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._on = get_icon_colored("switch-on.svg", THEME_DARK['NeonGreen_Main'], size=self.ICON_SIZE).pixmap(self.ICON_SIZE, self.ICON_SIZE)
+        self._off = QPixmap(asset_url("switch-off.svg"))
+
+    def _pixmap(self, index, option):
+        return self._on if index.data(Qt.ItemDataRole.UserRole) else self._off
+
+class TrashDelegate(ClickableIconDelegate):
+    """Botón de eliminar; se tiñe de rojo al pasar el ratón."""
+    ICON_SIZE = 18
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._normal = get_icon("trash.svg").pixmap(18, 18)
+        self._hover = get_icon_colored("trash.svg", "#ff453a", size=18).pixmap(18, 18)
+
+    def _pixmap(self, index, option):
+        return self._hover if option.state & QStyle.StateFlag.State_MouseOver else self._normal
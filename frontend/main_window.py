@@ -119,7 +119,7 @@ class MainWindow(QMainWindow):
         
         # Conexiones Core Controller -> Interfaz
         self.controller.log_signal.connect(self.on_log_received)
-        self.controller.chat_signal.connect(self.append_chat_message)
+        self.controller.chat_batch_signal.connect(self.append_chat_messages)
         self.controller.status_signal.connect(self.ui_chat.lbl_status.setText)
         self.controller.connection_changed.connect(self.ui_home.update_connection_state)
         self.controller.toast_signal.connect(self.show_toast)
@@ -146,26 +146,35 @@ class MainWindow(QMainWindow):
         elif "❌" in text: 
             self.ui_chat.lbl_status.setText("Error")
 
-    def append_chat_message(self, timestamp, real_user, display_content):       
+    def append_chat_message(self, timestamp, real_user, display_content, channel=""):       
+        self.append_chat_messages([(timestamp, real_user, display_content, channel)])
+
+    def append_chat_messages(self, rows):
+        """Pinta un lote [(timestamp, usuario, contenido, canal)] con un solo append y un solo scroll."""
         fmt_pref = self.controller.db.get("time_fmt", "Sistema")
         now = datetime.now()
-        
-        final_time = timestamp
-        if "12-hour" in fmt_pref: final_time = now.strftime("%I:%M %p")
-        elif "24-hour" in fmt_pref: final_time = now.strftime("%H:%M")
-
-        current_streamer = self.controller.db.get("kick_username", "")
-        is_streamer = current_streamer and real_user.lower() == current_streamer.lower()
-        c_user = "#FFD700" if is_streamer else "#00E701"
-            
-        html = f"""
-        <div style="line-height: 150%; margin-bottom: 6px;">
-            <span style="color:#666; font-size: 12px;">[{final_time}] </span>
-            <span style="color:{c_user}; font-weight: 700; padding-left: 4px;">{real_user}: </span>
-            <span style="color:#DDD; padding-left: 4px;">{display_content}</span>
-        </div>
-        """
-        self.ui_chat.txt.append(html)
+        current_streamer = self.controller.db.get("kick_username", "").lower()
+
+        blocks = []
+        for timestamp, real_user, display_content, channel in rows:
+            final_time = timestamp
+            if "12-hour" in fmt_pref: final_time = now.strftime("%I:%M %p")
+            elif "24-hour" in fmt_pref: final_time = now.strftime("%H:%M")
+
+            is_streamer = current_streamer and real_user.lower() == current_streamer
+            c_user = "#FFD700" if is_streamer else "#00E701"
+            # Mensajes de canales adicionales (modo multicanal) llevan su etiqueta
+            tag = f'<span style="color:#29b6f6; font-size: 12px;">#{channel} </span>' if channel else ""
+                
+            blocks.append(f"""
+            <div style="line-height: 150%; margin-bottom: 6px;">
+                <span style="color:#666; font-size: 12px;">[{final_time}] </span>{tag}
+                <span style="color:{c_user}; font-weight: 700; padding-left: 4px;">{real_user}: </span>
+                <span style="color:#DDD; padding-left: 4px;">{display_content}</span>
+            </div>
+            """)
+
+        self.ui_chat.txt.append("".join(blocks))
         sb = self.ui_chat.txt.verticalScrollBar()
         sb.setValue(sb.maximum())
 
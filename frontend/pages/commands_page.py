@@ -208,6 +208,13 @@ class CommandsPage(QWidget):
             new_co = modal.cost_result
             original = modal.original_trigger 
 
+            # Antes de tocar nada: un alias o trigger de otro comando no se puede reutilizar
+            conflicts = self.service.find_conflicts(new_trig, new_al, original)
+            if conflicts:
+                used = ", ".join(f"{name} ({owner})" for name, owner in conflicts)
+                ToastNotification(self, "Error", f"Ya en uso por otro comando: {used}", "status_error").show_toast()
+                return
+
             if original and original != new_trig:
                 self.service.delete_command(original)
             
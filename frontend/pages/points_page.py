@@ -1,10 +1,8 @@
 # frontend/pages/points_page.py
 
-from PyQt6.QtGui import QColor
-
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QTableWidget, QTableWidgetItem, QHeaderView, 
+    QTableView, QHeaderView, 
     QPushButton, QAbstractItemView, 
     QLineEdit, QComboBox, QFrame, QFileDialog,
     QScrollArea, QSizePolicy, QSpinBox
@@ -13,7 +11,10 @@ from PyQt6.QtCore import Qt, QTimer
 
 from frontend.components.core.factories import (
     create_icon_btn, create_nav_btn, 
-    create_page_header, create_styled_input, create_switch_widget
+    create_page_header, create_styled_input
+)
+from frontend.components.features.points_table import (
+    PointsTableModel, ColorDotDelegate, SwitchDelegate, TrashDelegate
 )
 from frontend.theme import LAYOUT, THEME_DARK, STYLES
 from frontend.utils import get_icon, get_icon_colored
@@ -159,25 +160,39 @@ class PointsPage(QWidget):
         h_bar.addWidget(self.combo_filter)
         
         # Botón refresh desde factory
-        btn_refresh = create_icon_btn("refresh-cw.svg", self.load_table_data, tooltip="Recargar")
+        btn_refresh = create_icon_btn("refresh-cw.svg", self.refresh_table_data, tooltip="Recargar")
         h_bar.addWidget(btn_refresh)
 
         l.addWidget(bar)
 
-        # Tabla
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["Usuario", "Color", "Puntos", "Visto", "Pausar", "Silenciar", "Acción"])
+        # Tabla virtual: el modelo pagina en SQL y los delegados pintan cada celda
+        self.model = PointsTableModel(self.service, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setStyleSheet(STYLES["table_clean"])
         
         self.table.setShowGrid(False)
         self.table.setAlternatingRowColors(False)
         self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.table.verticalHeader().setDefaultSectionSize(50)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
         self.table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setMouseTracking(True)
         self.table.setMinimumHeight(400) 
+
+        self.color_delegate = ColorDotDelegate(self.table)
+        self.pause_delegate = SwitchDelegate(self.table)
+        self.mute_delegate = SwitchDelegate(self.table)
+        self.delete_delegate = TrashDelegate(self.table)
+        self.pause_delegate.clicked.connect(self._handle_toggle_pause)
+        self.mute_delegate.clicked.connect(self._handle_toggle_mute)
+        self.delete_delegate.clicked.connect(lambda row: self._handle_delete_user(self.model.username_at(row)))
+        self.table.setItemDelegateForColumn(PointsTableModel.COL_COLOR, self.color_delegate)
+        self.table.setItemDelegateForColumn(PointsTableModel.COL_PAUSE, self.pause_delegate)
+        self.table.setItemDelegateForColumn(PointsTableModel.COL_MUTE, self.mute_delegate)
+        self.table.setItemDelegateForColumn(PointsTableModel.COL_ACTION, self.delete_delegate)
         
         h = self.table.horizontalHeader()
         h.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
@@ -188,6 +203,10 @@ class PointsPage(QWidget):
         h.setSectionResizeMode(5, QHeaderView.ResizeMode.Fixed); self.table.setColumnWidth(5, 80) # Silenciar
         h.setSectionResizeMode(6, QHeaderView.ResizeMode.Fixed); self.table.setColumnWidth(6, 70) # Acción
 
+        # Ordenar por cabecera se traduce en ORDER BY (sin ordenar en Python)
+        h.setSortIndicator(PointsTableModel.COL_POINTS, Qt.SortOrder.DescendingOrder)
+        self.table.setSortingEnabled(True)
+
         l.addWidget(self.table)
         
         return card
@@ -196,132 +215,16 @@ class PointsPage(QWidget):
     # LOGICA DE DATOS
     # ==========================================
     def load_table_data(self):
-        scroll_val = self.table.verticalScrollBar().value()
-        self.table.setRowCount(0)
-        
-        role_svgs = { 
-            "broadcaster": "video.svg",
-            "moderator": "shield.svg",
-            "vip": "star.svg",
-            "subscriber": "heart.svg",
-            "bot": "bot.svg", 
-            "user": "user.svg" 
-        }
-
-        role_colors = {
-            "broadcaster": "#FF4500",
-            "moderator": "#53fc18",
-            "vip": "#FF69B4",
-            "subscriber": "#FFD700",
-            "bot": "#00FFFF",
-            "user": "#FFFFFF"
-        }
-
-        users = self.service.get_users_data() 
-        MAX_ROWS = 100 # LÍMITE DE PROTECCIÓN
-        current_rows = 0
-
-        # OJO: Desempaquetamos los 7 valores (incluyendo 'color' de nuestra modificación anterior)
-        for idx, (user, points, last_seen, is_paused, is_muted, role, chat_color) in enumerate(users):
-            
-            # 1. PRIMERO: Limpiamos el rol y forzamos el estado si es bot
-            clean_role = str(role).lower().strip() if role else "user"
-            if clean_role == "bot":
-                is_paused = True
-                is_muted = True
-                
-            # 2. SEGUNDO: Aplicamos los filtros basándonos en el estado real/forzado
-            if self.search_text and self.search_text not in user.lower(): continue
-            if self.filter_mode == "Pausados" and not is_paused: continue
-            if self.filter_mode == "Silenciados" and not is_muted: continue
-            
-            # PROTECCIÓN: Si ya cargó 100 usuarios, detenemos el loop para no congelar la PC
-            if current_rows >= MAX_ROWS:
-                break
-                
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            current_rows += 1
-            
-            # Obtenemos su icono y color para la UI
-            svg_name = role_svgs.get(clean_role, "user.svg")
-            user_text_color = role_colors.get(clean_role, "#FFFFFF")
-            
-            if clean_role == "bot":
-                is_paused = True
-                is_muted = True
-            
-            # 1. Usuario (Columna 0)
-            item_user = QTableWidgetItem(user)
-            item_user.setIcon(get_icon(svg_name))
-            item_user.setForeground(QColor(user_text_color))
-            item_user.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-            
-            # 2. Indicador de Color del Chat (Columna 1)
-            w_color = QWidget()
-            l_color = QHBoxLayout(w_color)
-            l_color.setContentsMargins(0, 0, 0, 0)
-            l_color.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            circle = QLabel()
-            circle.setFixedSize(16, 16)
-            
-            valid_color = chat_color if chat_color else "transparent"
-            circle.setStyleSheet(f"background-color: {valid_color}; border-radius: 8px; border: 1px solid #555;")
-            l_color.addWidget(circle)
-            
-            # 3. Puntos (Columna 2)
-            item_points = QTableWidgetItem(f"{points:,}")
-            item_points.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_points.setForeground(Qt.GlobalColor.green)
-            
-            # 4. Visto (Columna 3)
-            t_str = str(last_seen).split(".")[0]
-            item_time = QTableWidgetItem(t_str)
-            item_time.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_time.setForeground(Qt.GlobalColor.gray)
-            
-            # 5. Switch Pause (Columna 4)
-            w_pause = create_switch_widget(
-                checked=is_paused, 
-                func=lambda chk, u=user: self._handle_toggle_pause(u, chk), 
-                tooltip="Pausar obtención de puntos"
-            )
-            
-            # 6. Switch Mute (Columna 5)
-            w_mute = create_switch_widget(
-                checked=is_muted, 
-                func=lambda chk, u=user: self._handle_toggle_mute(u, chk), 
-                tooltip="Silenciar en TTS"
-            )
-
-            if clean_role == "bot":
-                w_pause.setEnabled(False)
-                w_mute.setEnabled(False)
-            
-            # 7. Botón Eliminar (Columna 6)
-            btn_del = create_icon_btn(
-                "trash.svg", 
-                lambda _, u=user: self._handle_delete_user(u), 
-                color_hover="#ff453a"
-            )
-            w_del = QWidget(); w_del.setStyleSheet("background: transparent;")
-            l_del = QHBoxLayout(w_del); l_del.setContentsMargins(0,0,0,0); l_del.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            l_del.addWidget(btn_del)
-            
-            # Insertamos todo en la tabla
-            self.table.setItem(row, 0, item_user)
-            self.table.setCellWidget(row, 1, w_color)
-            self.table.setItem(row, 2, item_points)
-            self.table.setItem(row, 3, item_time)
-            self.table.setCellWidget(row, 4, w_pause)
-            self.table.setCellWidget(row, 5, w_mute)
-            self.table.setCellWidget(row, 6, w_del)
+        """Recarga completa desde la primera página (búsqueda, filtro, importación)."""
+        self.model.set_query(self.search_text, self.filter_mode)
 
-        self.table.verticalScrollBar().setValue(scroll_val)
+    def refresh_table_data(self):
+        """Refresco incremental: solo se tocan las filas que cambiaron."""
+        self.model.refresh()
 
     def _auto_refresh(self):
         if not self.inp_search.hasFocus() and not self.inp_manual_user.hasFocus():
-            self.load_table_data()
+            self.refresh_table_data()
 
     def _handle_manual_update(self):
         user = self.inp_manual_user.text().strip()
@@ -334,7 +237,7 @@ class PointsPage(QWidget):
         new_total = self.service.add_manual_points(user, qty)
         ToastNotification(self, "Puntos", f"{user}: {qty:+} pts (Total: {new_total})", "status_success").show_toast()
         self.inp_manual_user.clear()
-        self.load_table_data()
+        self.refresh_table_data()
 
     def _handle_search_changed(self, text):
         self.search_text = text.lower().strip()
@@ -344,19 +247,23 @@ class PointsPage(QWidget):
         self.filter_mode = self.combo_filter.currentText()
         self.load_table_data()
 
-    def _handle_toggle_pause(self, user, checked):
+    def _handle_toggle_pause(self, row):
+        user, checked = self.model.username_at(row), not self.model.index(row, PointsTableModel.COL_PAUSE).data(Qt.ItemDataRole.UserRole)
         self.service.toggle_pause(user, checked)
+        self.model.update_flag(row, PointsTableModel.COL_PAUSE, checked)
         ToastNotification(self, "Estado", f"{user} {'pausado' if checked else 'anudado'}", "info").show_toast()
 
-    def _handle_toggle_mute(self, user, checked):
+    def _handle_toggle_mute(self, row):
+        user, checked = self.model.username_at(row), not self.model.index(row, PointsTableModel.COL_MUTE).data(Qt.ItemDataRole.UserRole)
         self.service.toggle_mute(user, checked)
+        self.model.update_flag(row, PointsTableModel.COL_MUTE, checked)
         msg = "Silenciado 🔇" if checked else "Escuchando 🔊"
         ToastNotification(self, "Voz", f"{user} {msg}", "info").show_toast()
 
     def _handle_delete_user(self, user):
         if ModalConfirm(self, "Eliminar", f"¿Estás seguro de eliminar a {user}? Se perderán sus puntos.").exec():
             if self.service.delete_user(user):
-                self.load_table_data()
+                self.refresh_table_data()
                 ToastNotification(self, "Eliminado", "Usuario eliminado correctamente.", "status_success").show_toast()
 
     def _handle_export_csv(self):
@@ -292,15 +292,15 @@ STYLES = {
         QListWidget::item:selected {{ background: {c.Black_N4}; }}
     """,
     "table_clean": f"""
-        QTableWidget {{
+        QTableView {{
             background-color: {c.Black_N2}; gridline-color: {c.Black_N4}; outline: none; border: none;
         }}
         QHeaderView::section {{
             background-color: {c.Black_N3}; color: {c.Gray_N1}; border: none;
             padding: 8px; font-weight: bold; text-transform: uppercase; font-size: 12px;
         }}
-        QTableWidget::item {{ padding: 6px; border-bottom: 1px solid {c.Black_N4}; }}
-        QTableWidget::item:selected {{ background-color: {c.White_N2}; color: {c.NeonGreen_Main}; }}
+        QTableView::item {{ padding: 6px; border-bottom: 1px solid {c.Black_N4}; }}
+        QTableView::item:selected {{ background-color: {c.White_N2}; color: {c.NeonGreen_Main}; }}
     """,
     
     # --- COMPLEX WIDGETS ---